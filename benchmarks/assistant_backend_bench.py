@@ -0,0 +1,153 @@
+"""Assistants threads versus Chat Completions with a local conversation store.
+
+Usage: python -m benchmarks.assistant_backend_bench [--turns 20] [--reset-every 0] [--token-budget 3000]
+                                                    [--json results.json]
+
+Runs the same scripted conversation through both assistant backends,
+StreamingManager (Assistants API: thread, message and streamed run) and
+ChatCompletionsManager (one streamed completion per turn), against the
+local fake provider server from benchmarks.fake_servers. Replies are not
+spoken, so only the assistant requests are measured. With --reset-every N
+the Assistants thread is discarded every N turns, as the inactivity reset
+does, so those turns include creating a new thread.
+
+Reports API round trips per turn, time to first token and time to the
+whole reply for each backend.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from benchmarks.e2e_bench import SCRIPTS, distribution
+from benchmarks.fake_servers import FakeLatency, FakeProviderServer, FakeScript
+from benchmarks.trace_summary import load_records
+from heddy.application_event import ApplicationEvent, ApplicationEventType, ProcessingStatus
+
+
+def build_backends(provider, args):
+    import openai
+    from heddy.ai_backend.assistant_manager import ThreadManager, StreamingManager
+    from heddy.ai_backend.chat_completions import ChatCompletionsManager, ConversationStore
+    from heddy.functions2call import ToolRegistry
+    from heddy.transport import HTTPTransport
+
+    transport = HTTPTransport()
+    openai_client = openai.OpenAI(api_key="benchmark", base_url=f"{provider.url}/v1",
+                                  http_client=transport.httpx_client())
+    # The fake server never calls tools; an empty registry keeps both requests the same size
+    tool_registry = ToolRegistry()
+    thread_manager = ThreadManager(openai_client)
+    assistants = StreamingManager(
+        thread_manager,
+        None,
+        assistant_id="asst_benchmark",
+        transport=transport,
+        tool_registry=tool_registry
+    )
+    chat = ChatCompletionsManager(
+        openai_client,
+        model="fake",
+        conversation=ConversationStore(token_budget=args.token_budget),
+        transport=transport,
+        tool_registry=tool_registry
+    )
+    return {"assistants": assistants, "chat": chat}, thread_manager
+
+
+def run_backend(name, backend, args, script, metrics, tracer, on_turn=None):
+    """Runs the scripted turns through one backend; returns its per-turn results and turn ids."""
+    metrics.reset()
+    results = []
+    turn_ids = []
+    # Spans opened on this thread, like the time to first token, belong to this backend's turns
+    tracer.bind(name)
+    for index in range(args.turns):
+        transcript, reply = SCRIPTS[index % len(SCRIPTS)]
+        script.transcript, script.reply = transcript, reply
+        if on_turn is not None:
+            on_turn(index)
+        turn_ids.append(tracer.start_turn(name))
+        started_at = time.perf_counter()
+        event = backend.handle_streaming_interaction(
+            ApplicationEvent(ApplicationEventType.AI_INTERACT, request=transcript)
+        )
+        elapsed = time.perf_counter() - started_at
+        tracer.end_turn(name)
+        results.append({"ok": event.status == ProcessingStatus.SUCCESS, "reply": elapsed})
+    round_trips = metrics.snapshot()["samples"].get("assistant.round_trips", [])
+    for result, count in zip(results, round_trips):
+        result["round_trips"] = count
+    return results, set(turn_ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--reset-every", type=int, default=0,
+                        help="start a new Assistants thread every N turns (0: keep one thread)")
+    parser.add_argument("--token-budget", type=int, default=3000, help="history budget of the conversation store")
+    for field, default in vars(FakeLatency()).items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=float, default=default,
+                            help=f"fake provider latency in seconds (default {default})")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    from heddy.metrics import metrics
+    from heddy.tracing import tracer
+
+    trace_file = os.path.join(tempfile.mkdtemp(prefix="heddy-bench-"), "traces.jsonl")
+    tracer.configure(trace_file, max_bytes=0)
+    latency = FakeLatency(**{field: getattr(args, field) for field in vars(FakeLatency())})
+    script = FakeScript()
+    provider = FakeProviderServer(latency, script).start()
+    backends, thread_manager = build_backends(provider, args)
+
+    def reset_thread(index):
+        if args.reset_every and index and index % args.reset_every == 0:
+            thread_manager.reset_thread()
+
+    runs = {}
+    try:
+        for name, backend in backends.items():
+            runs[name] = run_backend(name, backend, args, script, metrics, tracer,
+                                     on_turn=reset_thread if name == "assistants" else None)
+    finally:
+        thread_manager.close()
+        provider.stop()
+
+    records = load_records(trace_file)
+    rows = {}
+    for name, (results, turn_ids) in runs.items():
+        first_token = [record["duration"] for record in records
+                       if record["turn"] in turn_ids and record["name"] == "assistant.time_to_first_token"]
+        rows[name] = {
+            "turns": len(results),
+            "errors": sum(not result["ok"] for result in results),
+            "round_trips": distribution([result.get("round_trips", 0) for result in results]),
+            "time_to_first_token": distribution(first_token),
+            "reply": distribution([result["reply"] for result in results]),
+        }
+
+    print(f"\n{'backend':11} {'turns':>6} {'errors':>6} {'round trips':>12} {'max':>4} "
+          f"{'first token p50':>16} {'p95':>8} {'reply p50':>10} {'p95':>8}")
+    for name, row in rows.items():
+        round_trips = sum(result.get("round_trips", 0) for result in runs[name][0]) / max(1, row["turns"])
+        first_token = row["time_to_first_token"]
+        reply_time = row["reply"]
+        print(f"{name:11} {row['turns']:6d} {row['errors']:6d} {round_trips:12.2f} "
+              f"{row['round_trips'].get('max', 0):4d} "
+              f"{first_token.get('p50', 0) * 1000:13.0f} ms {first_token.get('p95', 0) * 1000:5.0f} ms "
+              f"{reply_time.get('p50', 0) * 1000:7.0f} ms {reply_time.get('p95', 0) * 1000:5.0f} ms")
+    conversation = backends["chat"].conversation.stats()
+    print(f"\nConversation store: {conversation}")
+
+    if args.json:
+        with open(args.json, "w") as results_file:
+            json.dump({"backends": rows, "conversation": conversation, "options": vars(args)},
+                      results_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
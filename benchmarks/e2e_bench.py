@@ -0,0 +1,408 @@
+"""Offline end-to-end turn benchmark against local fake provider servers.
+
+Usage: python -m benchmarks.e2e_bench [--turns 20] [--fixtures "fixtures/*.wav"] [--speed 1.0]
+                                      [--endpointing] [--no-streaming-stt] [--json results.json]
+
+Runs MainController with the real STT, assistant and TTS code paths pointed
+at the servers in benchmarks.fake_servers. Recorded WAV fixtures (16 kHz,
+16-bit mono) are fed through a stand-in microphone hub instead of a
+microphone, keywords come from a script instead of PocketSphinx, and
+synthesized audio goes to a null sink. Each fixture may have a sidecar JSON
+file with "speech_end" (seconds), "transcript" and "reply"; without
+--fixtures, synthetic speech-like fixtures are generated.
+
+Reports end-of-speech to first-audio latency and the per-stage
+p50/p95/p99 from the turn traces.
+"""
+import argparse
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+import wave
+from queue import Queue, Empty
+
+import numpy as np
+
+from benchmarks.fake_servers import FakeLatency, FakeProviderServer, FakeRealtimeServer, FakeScript
+from benchmarks.trace_summary import load_records, percentile, summarize
+from heddy.application_event import ApplicationEvent, ApplicationEventType, ProcessingStatus
+from heddy.io.microphone_hub import MicrophoneHub
+
+SAMPLE_RATE = 16000
+CHUNK_FRAMES = 1024
+
+SCRIPTS = [
+    ("What is the weather like today?",
+     "It is sunny with a light breeze. Expect a high of twenty two degrees this afternoon."),
+    ("Set a timer for ten minutes.",
+     "Sure. Your timer for ten minutes starts now."),
+    ("Tell me a fun fact about octopuses.",
+     "Octopuses have three hearts and blue blood. Two hearts pump blood to the gills, and one to the rest of the body."),
+    ("How do I say thank you in Japanese?",
+     "You say arigato. For extra politeness, say arigato gozaimasu."),
+]
+
+
+class Fixture:
+    def __init__(self, name, pcm, speech_end, transcript, reply):
+        self.name = name
+        self.pcm = pcm
+        self.speech_end = speech_end
+        self.transcript = transcript
+        self.reply = reply
+
+    @property
+    def duration(self):
+        return len(self.pcm) / 2 / SAMPLE_RATE
+
+
+def load_fixtures(pattern):
+    fixtures = []
+    for index, path in enumerate(sorted(glob.glob(pattern))):
+        with wave.open(path, "rb") as wf:
+            if wf.getframerate() != SAMPLE_RATE or wf.getsampwidth() != 2 or wf.getnchannels() != 1:
+                raise SystemExit(f"{path}: expected 16 kHz 16-bit mono audio")
+            pcm = wf.readframes(wf.getnframes())
+        labels = {}
+        label_path = os.path.splitext(path)[0] + ".json"
+        if os.path.exists(label_path):
+            with open(label_path) as label_file:
+                labels = json.load(label_file)
+        transcript, reply = SCRIPTS[index % len(SCRIPTS)]
+        fixtures.append(Fixture(
+            os.path.basename(path),
+            pcm,
+            labels.get("speech_end", len(pcm) / 2 / SAMPLE_RATE),
+            labels.get("transcript", transcript),
+            labels.get("reply", reply)
+        ))
+    if not fixtures:
+        raise SystemExit(f"No fixtures match {pattern}")
+    return fixtures
+
+
+def generate_fixtures(count, seed=0):
+    """Synthesizes speech-like fixtures: voiced harmonics with a syllable envelope between silences."""
+    rng = np.random.default_rng(seed)
+    fixtures = []
+    for index in range(count):
+        lead, speech, trail = 0.3, rng.uniform(1.5, 3.0), 1.5
+        t = np.arange(int(speech * SAMPLE_RATE)) / SAMPLE_RATE
+        f0 = rng.uniform(110, 220)
+        voiced = sum(np.sin(2 * np.pi * f0 * harmonic * t) / harmonic for harmonic in range(1, 6))
+        envelope = 0.5 + 0.5 * np.sin(2 * np.pi * rng.uniform(3, 5) * t) ** 2
+        signal = np.concatenate([
+            np.zeros(int(lead * SAMPLE_RATE)),
+            0.25 * voiced * envelope,
+            np.zeros(int(trail * SAMPLE_RATE)),
+        ])
+        signal += rng.normal(0, 0.002, len(signal))
+        pcm = (np.clip(signal, -1, 1) * 32767).astype(np.int16).tobytes()
+        transcript, reply = SCRIPTS[index % len(SCRIPTS)]
+        fixtures.append(Fixture(f"synthetic-{index}", pcm, lead + speech, transcript, reply))
+    return fixtures
+
+
+class WavMicrophone(MicrophoneHub):
+    """MicrophoneHub fed from fixture audio at real-time pace (scaled by ``speed``) instead of a device."""
+
+    def __init__(self, speed=1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.speed = speed
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    def feed(self, pcm):
+        frame_bytes = self.frames_per_buffer * 2
+        frame_seconds = self.frames_per_buffer / self.rate / self.speed
+        deadline = time.perf_counter()
+        for start in range(0, len(pcm), frame_bytes):
+            deadline += frame_seconds
+            time.sleep(max(0.0, deadline - time.perf_counter()))
+            self.publish(pcm[start:start + frame_bytes])
+
+
+class ScriptedWordDetector:
+    """Replaces the keyword spotter: says the wake word, feeds the fixture, then ends the recording.
+
+    The recording ends with "reply" once the whole fixture has been fed, or,
+    with an endpointer, when the controller pushes the end of utterance.
+    """
+
+    def __init__(self, microphone, fixtures, script, use_endpointer=False):
+        self.microphone = microphone
+        self.fixtures = list(fixtures)
+        self.script = script
+        self.use_endpointer = use_endpointer
+        self.queue = Queue()
+        self.turn = -1
+        self.recording = False
+        self.feeder = None
+        self.suspended = False
+        self.turns = []
+
+    @property
+    def finished(self):
+        return not self.recording and self.turn + 1 >= len(self.fixtures)
+
+    def listen(self, event: ApplicationEvent):
+        if self.recording:
+            word = self._wait_for_stop()
+        else:
+            word = self._start_turn()
+        event.result = word
+        event.status = ProcessingStatus.SUCCESS
+        return event
+
+    def _start_turn(self):
+        if self.feeder is not None:
+            self.feeder.join()
+        self.turn += 1
+        fixture = self.fixtures[self.turn]
+        self.script.transcript = fixture.transcript
+        self.script.reply = fixture.reply
+        self.recording = True
+        return "computer"
+
+    def _wait_for_stop(self):
+        fixture = self.fixtures[self.turn]
+        turn = {"fixture": fixture.name}
+        self.turns.append(turn)
+        self.feeder = threading.Thread(target=self._feed, args=(fixture,), daemon=True)
+        turn["feed_started_at"] = time.perf_counter()
+        turn["speech_end_at"] = turn["feed_started_at"] + fixture.speech_end / self.microphone.speed
+        self.feeder.start()
+        timeout = fixture.duration / self.microphone.speed + 5.0
+        try:
+            word = self.queue.get(timeout=timeout)
+        except Empty:
+            word = "reply"
+        turn["stopped_at"] = time.perf_counter()
+        self.recording = False
+        return word
+
+    def _feed(self, fixture):
+        self.microphone.feed(fixture.pcm)
+        if not self.use_endpointer:
+            self.queue.put("reply")
+
+    def clear(self):
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.suspended = True
+
+    def push(self, word):
+        self.queue.put(word)
+
+    def resume(self):
+        self.suspended = False
+
+
+class NullAudioPlayer:
+    """Audio sink that consumes synthesized audio without a sound device.
+
+    It records when the first chunk of each clip arrives. With
+    ``bytes_per_second`` set it also waits as long as the audio would take to
+    play, so playback and synthesis overlap as they do on a speaker.
+    """
+
+    def __init__(self, bytes_per_second=None):
+        self.bytes_per_second = bytes_per_second
+        self.clip_starts = []
+        self.lock = threading.Lock()
+
+    def play_sound(self, file_path, block=False):
+        pass
+
+    def play_audio(self, audio):
+        chunks = [audio] if isinstance(audio, (bytes, bytearray)) else audio
+        started = False
+        deadline = None
+        for chunk in chunks:
+            if not started:
+                started = True
+                with self.lock:
+                    self.clip_starts.append(time.perf_counter())
+                deadline = time.perf_counter()
+            if self.bytes_per_second:
+                deadline += len(chunk) / self.bytes_per_second
+                time.sleep(max(0.0, deadline - time.perf_counter()))
+
+    def play(self, event: ApplicationEvent):
+        self.play_audio(event.request)
+        return ApplicationEvent(
+            type=ApplicationEventType.PLAY,
+            status=ProcessingStatus.SUCCESS
+        )
+
+    def first_audio_after(self, timestamp):
+        with self.lock:
+            starts = [start for start in self.clip_starts if start >= timestamp]
+        return min(starts) if starts else None
+
+
+def build_controller(args, provider, realtime, fixtures, script):
+    import openai
+    from heddy.ai_backend.assistant_manager import ThreadManager, StreamingManager
+    from heddy.io.audio_recorder import recorder
+    from heddy.io.vad import Endpointer
+    from heddy.main_controller import MainController
+    from heddy.speech_to_text.assemblyai_transcriber import AssemblyAITranscriber
+    from heddy.speech_to_text.streaming_transcriber import AssemblyAIStreamingTranscriber
+    from heddy.speech_to_text.stt_manager import STTManager
+    from heddy.text_to_speech.eleven_labs import ElevenLabsManager
+    from heddy.text_to_speech.speech_pipeline import SpeechPipeline
+    from heddy.text_to_speech.text_to_speach_manager import TTSManager
+    from heddy.transport import HTTPTransport, ConnectionPrewarmer
+    from heddy.vision_module import VisionModule
+    from benchmarks.fake_servers import OUTPUT_FORMAT_RATES
+
+    transport = HTTPTransport()
+    openai_client = openai.OpenAI(api_key="benchmark", base_url=f"{provider.url}/v1",
+                                  http_client=transport.httpx_client())
+    eleven_labs_manager = ElevenLabsManager(api_key="benchmark", transport=transport, base_url=provider.url)
+    player = NullAudioPlayer(
+        OUTPUT_FORMAT_RATES.get(eleven_labs_manager.output_format) if args.realtime_playback else None
+    )
+    speech_pipeline = SpeechPipeline(eleven_labs_manager, player)
+    thread_manager = ThreadManager(openai_client)
+    streaming_manager = StreamingManager(
+        thread_manager,
+        eleven_labs_manager,
+        assistant_id="asst_benchmark",
+        speech_pipeline=speech_pipeline,
+        transport=transport
+    )
+    microphone = WavMicrophone(speed=args.speed, frames_per_buffer=CHUNK_FRAMES)
+    microphone.start()
+    recorder.hub = microphone
+    recorder.output_filename = None
+    detector = ScriptedWordDetector(microphone, fixtures, script, use_endpointer=args.endpointing)
+    prewarmer = None
+    if args.prewarm:
+        prewarmer = ConnectionPrewarmer(transport, urls=[eleven_labs_manager.url],
+                                        openai_clients=[openai_client])
+    controller = MainController(
+        assistant=streaming_manager,
+        transcriber=STTManager(
+            transcriber=AssemblyAITranscriber(api_key="benchmark", base_url=provider.url),
+            streaming_transcriber=AssemblyAIStreamingTranscriber(
+                api_key="benchmark", url=realtime.url
+            ) if realtime is not None else None
+        ),
+        synthesizer=TTSManager(eleven_labs_manager),
+        audio_player=player,
+        vision_module=VisionModule(openai_api_key="benchmark", transport=transport, base_url=f"{provider.url}/v1"),
+        word_detector=detector,
+        endpointer=Endpointer() if args.endpointing else None,
+        prewarmer=prewarmer
+    )
+    return controller, detector, player, transport, thread_manager
+
+
+def run_turns(controller, detector):
+    """Same loop as MainController.run, stopping when the scripted turns are done."""
+    current_event = ApplicationEvent(ApplicationEventType.START)
+    while current_event.type != ApplicationEventType.EXIT:
+        if current_event.type == ApplicationEventType.LISTEN and detector.finished:
+            break
+        result = controller.process_event(current_event)
+        current_event = controller.process_result(result)
+
+
+def distribution(values):
+    values = sorted(values)
+    if not values:
+        return {}
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": values[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--fixtures", help="glob of WAV fixtures; synthetic speech is generated if omitted")
+    parser.add_argument("--speed", type=float, default=1.0, help="feed fixtures faster than real time")
+    parser.add_argument("--endpointing", action="store_true", help="end recordings with the VAD endpointer")
+    parser.add_argument("--no-streaming-stt", action="store_true", help="upload recordings instead of streaming")
+    parser.add_argument("--prewarm", action="store_true", help="pre-warm connections on the wake word")
+    parser.add_argument("--realtime-playback", action="store_true", help="make the null sink take as long as playback")
+    for field, default in vars(FakeLatency()).items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=float, default=default,
+                            help=f"fake provider latency in seconds (default {default})")
+    parser.add_argument("--trace-file", help="keep the turn traces here instead of a temporary file")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    latency = FakeLatency(**{field: getattr(args, field) for field in vars(FakeLatency())})
+    script = FakeScript()
+    fixtures = load_fixtures(args.fixtures) if args.fixtures else generate_fixtures(len(SCRIPTS))
+    fixtures = [fixtures[index % len(fixtures)] for index in range(args.turns)]
+
+    from heddy.tracing import tracer
+
+    trace_file = args.trace_file or os.path.join(tempfile.mkdtemp(prefix="heddy-bench-"), "traces.jsonl")
+    tracer.configure(trace_file, max_bytes=0)
+    provider = FakeProviderServer(latency, script).start()
+    realtime = None if args.no_streaming_stt else FakeRealtimeServer(latency, script).start()
+    controller, detector, player, transport, thread_manager = build_controller(
+        args, provider, realtime, fixtures, script
+    )
+    started_at = time.perf_counter()
+    try:
+        run_turns(controller, detector)
+    finally:
+        if thread_manager.reset_timer is not None:
+            thread_manager.reset_timer.cancel()
+        provider.stop()
+        if realtime is not None:
+            realtime.stop()
+    elapsed = time.perf_counter() - started_at
+
+    speech_end_to_audio = []
+    stop_to_audio = []
+    for turn in detector.turns:
+        first_audio = player.first_audio_after(turn["stopped_at"])
+        if first_audio is None:
+            continue
+        speech_end_to_audio.append(first_audio - turn["speech_end_at"])
+        stop_to_audio.append(first_audio - turn["stopped_at"])
+    stages = summarize(load_records(trace_file))
+
+    print(f"\n{len(detector.turns)} turns in {elapsed:.1f} s")
+    print(f"{'latency':36} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    rows = [("end of speech -> first audio", distribution(speech_end_to_audio)),
+            ("stop recording -> first audio", distribution(stop_to_audio))]
+    rows += [(name, {"count": count, "p50": p50, "p95": p95, "p99": p99, "max": maximum})
+             for name, count, p50, p95, p99, maximum in stages]
+    for name, stats in rows:
+        if stats:
+            print(f"{name:36} {stats['count']:6d} {stats['p50'] * 1000:9.1f} {stats['p95'] * 1000:9.1f} "
+                  f"{stats['p99'] * 1000:9.1f} {stats['max'] * 1000:9.1f}")
+    print(f"\nConnections: {transport.stats()}")
+
+    if args.json:
+        with open(args.json, "w") as results_file:
+            json.dump({
+                "turns": len(detector.turns),
+                "elapsed": elapsed,
+                "latency": dict(rows),
+                "connections": transport.stats(),
+                "options": vars(args),
+            }, results_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
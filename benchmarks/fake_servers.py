@@ -0,0 +1,421 @@
+"""Local stand-ins for the OpenAI, AssemblyAI and ElevenLabs APIs.
+
+``FakeProviderServer`` serves the REST endpoints heddy uses (Assistants
+threads, messages and streamed runs, streamed and vision chat completions,
+AssemblyAI upload and transcript, ElevenLabs streaming TTS) over keep-alive
+HTTP/1.1.
+``FakeRealtimeServer`` emulates the AssemblyAI realtime websocket. Both
+answer from a shared ``FakeScript`` holding the transcript and the reply of
+the current turn, and wait according to ``FakeLatency`` so provider timing
+can be varied without network access or API keys.
+"""
+import base64
+import itertools
+import json
+import math
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Bytes per second of audio for the ElevenLabs output formats
+OUTPUT_FORMAT_RATES = {
+    "mp3_44100_128": 16000,
+    "mp3_44100_64": 8000,
+    "pcm_16000": 32000,
+    "pcm_22050": 44100,
+    "pcm_24000": 48000,
+    "pcm_44100": 88200,
+}
+
+
+@dataclass
+class FakeLatency:
+    """Seconds each fake endpoint waits; the defaults approximate the hosted services."""
+    api: float = 0.05                  # thread and message creation
+    stt: float = 0.3                   # upload transcription, request to completed transcript
+    stt_final: float = 0.15            # realtime, terminate_session to FinalTranscript
+    llm_first_token: float = 0.5
+    llm_token_interval: float = 0.03
+    tts_first_byte: float = 0.25
+    tts_chunk_interval: float = 0.05
+    tts_seconds_per_char: float = 0.06  # length of the synthesized audio
+    vision: float = 1.0
+
+
+@dataclass
+class FakeScript:
+    """What the fake services answer for the current turn."""
+    transcript: str = "What is the weather like today?"
+    reply: str = "It is sunny with a light breeze. Expect a high of twenty two degrees this afternoon."
+    image_description: str = "A desk with a laptop and a cup of coffee."
+    # When set, a streamed completion first calls this tool, then replies once its result is sent
+    tool_call: str = ""
+    tool_arguments: str = "{}"
+
+
+def now():
+    return int(time.time())
+
+
+class FakeProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def latency(self) -> FakeLatency:
+        return self.server.latency
+
+    @property
+    def script(self) -> FakeScript:
+        return self.server.script
+
+    def read_body(self):
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            body = bytearray()
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    return bytes(body)
+                body += self.rfile.read(size)
+                self.rfile.readline()
+        length = int(self.headers.get("Content-Length", 0))
+        return self.rfile.read(length) if length else b""
+
+    def read_json(self):
+        body = self.read_body()
+        if not body or not self.headers.get("Content-Type", "").startswith("application/json"):
+            return {}
+        return json.loads(body)
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def start_chunked(self, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def end_chunked(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def do_HEAD(self):
+        self.server.requests.append(("HEAD", urlparse(self.path).path))
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        self.server.requests.append(("GET", path))
+        match = re.fullmatch(r"/v2/transcript/([^/]+)", path)
+        if match:
+            return self.send_json(self.transcript_payload(match.group(1)))
+        if path == "/v1/models":
+            # Used by connection pre-warming of the OpenAI client
+            time.sleep(self.latency.api)
+            return self.send_json({"object": "list", "data": [{"id": "fake", "object": "model", "created": now(),
+                                                               "owned_by": "benchmark"}]})
+        self.send_json({"error": f"Unknown endpoint {path}"}, status=404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        path = url.path
+        self.server.requests.append(("POST", path))
+        if path == "/v2/upload":
+            self.read_body()
+            return self.send_json({"upload_url": f"http://{self.headers['Host']}/uploads/{uuid.uuid4().hex}"})
+        if path == "/v2/transcript":
+            self.read_json()
+            time.sleep(self.latency.stt)
+            return self.send_json(self.transcript_payload(uuid.uuid4().hex))
+        if path == "/v1/threads":
+            self.read_json()
+            time.sleep(self.latency.api)
+            return self.send_json(self.thread_payload(self.server.new_id("thread")))
+        if path == "/v1/threads/runs":
+            self.read_json()
+            return self.stream_run(self.server.new_id("thread"), created=True)
+        match = re.fullmatch(r"/v1/threads/([^/]+)/messages", path)
+        if match:
+            request = self.read_json()
+            time.sleep(self.latency.api)
+            return self.send_json(self.message_payload(
+                self.server.new_id("msg"), match.group(1), request.get("content", ""), role="user"
+            ))
+        match = re.fullmatch(r"/v1/threads/([^/]+)/runs", path)
+        if match:
+            self.read_json()
+            return self.stream_run(match.group(1))
+        if path == "/v1/chat/completions":
+            request = self.read_json()
+            if request.get("stream"):
+                return self.stream_completion(request)
+            time.sleep(self.latency.vision)
+            return self.send_json({
+                "id": self.server.new_id("chatcmpl"),
+                "object": "chat.completion",
+                "created": now(),
+                "model": "fake",
+                "choices": [{
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": self.script.image_description},
+                }],
+            })
+        match = re.fullmatch(r"/v1/text-to-speech/([^/]+)/stream", path)
+        if match:
+            request = self.read_json()
+            output_format = parse_qs(url.query).get("output_format", ["mp3_44100_128"])[0]
+            return self.stream_speech(request.get("text", ""), output_format)
+        self.read_body()
+        self.send_json({"error": f"Unknown endpoint {path}"}, status=404)
+
+    def transcript_payload(self, transcript_id):
+        return {
+            "id": transcript_id,
+            "status": "completed",
+            "audio_url": "https://example.invalid/audio.wav",
+            "text": self.script.transcript,
+            "words": [],
+            "error": None,
+        }
+
+    def thread_payload(self, thread_id):
+        return {"id": thread_id, "object": "thread", "created_at": now(), "metadata": {}, "tool_resources": {}}
+
+    def message_payload(self, message_id, thread_id, text, role="assistant", run_id=None, status="completed"):
+        return {
+            "id": message_id,
+            "object": "thread.message",
+            "created_at": now(),
+            "thread_id": thread_id,
+            "run_id": run_id,
+            "assistant_id": "asst_fake" if role == "assistant" else None,
+            "role": role,
+            "status": status,
+            "content": [{"type": "text", "text": {"value": text, "annotations": []}}] if text else [],
+            "attachments": [],
+            "metadata": {},
+        }
+
+    def run_payload(self, run_id, thread_id, status):
+        return {
+            "id": run_id,
+            "object": "thread.run",
+            "created_at": now(),
+            "thread_id": thread_id,
+            "assistant_id": "asst_fake",
+            "status": status,
+            "model": "fake",
+            "instructions": "",
+            "tools": [],
+            "metadata": {},
+            "parallel_tool_calls": True,
+        }
+
+    def send_event(self, event, data):
+        payload = data if isinstance(data, str) else json.dumps(data)
+        self.write_chunk(f"event: {event}\ndata: {payload}\n\n".encode("utf-8"))
+
+    def stream_run(self, thread_id, created=False):
+        """Streams an Assistants run whose reply is the scripted text, token by token."""
+        run_id = self.server.new_id("run")
+        message_id = self.server.new_id("msg")
+        self.start_chunked("text/event-stream")
+        if created:
+            self.send_event("thread.created", self.thread_payload(thread_id))
+        self.send_event("thread.run.created", self.run_payload(run_id, thread_id, "queued"))
+        self.send_event("thread.run.in_progress", self.run_payload(run_id, thread_id, "in_progress"))
+        time.sleep(self.latency.llm_first_token)
+        self.send_event("thread.message.created",
+                        self.message_payload(message_id, thread_id, "", run_id=run_id, status="in_progress"))
+        for index, token in enumerate(re.findall(r"\S+\s*", self.script.reply)):
+            if index:
+                time.sleep(self.latency.llm_token_interval)
+            self.send_event("thread.message.delta", {
+                "id": message_id,
+                "object": "thread.message.delta",
+                "delta": {"content": [{"index": 0, "type": "text", "text": {"value": token, "annotations": []}}]},
+            })
+        self.send_event("thread.message.completed",
+                        self.message_payload(message_id, thread_id, self.script.reply, run_id=run_id))
+        self.send_event("thread.run.completed", self.run_payload(run_id, thread_id, "completed"))
+        self.send_event("done", "[DONE]")
+        self.end_chunked()
+
+    def stream_completion(self, request):
+        """Streams a chat completion whose reply is the scripted text, token by token.
+
+        With a scripted tool call, a request that does not end with the tool
+        result is answered with the call instead, its arguments in fragments.
+        """
+        completion_id = self.server.new_id("chatcmpl")
+
+        def chunk(delta, finish_reason=None):
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": now(),
+                "model": "fake",
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+
+        self.start_chunked("text/event-stream")
+        time.sleep(self.latency.llm_first_token)
+        messages = request.get("messages") or [{}]
+        if self.script.tool_call and messages[-1].get("role") != "tool":
+            arguments = self.script.tool_arguments
+            fragments = [arguments[:len(arguments) // 2], arguments[len(arguments) // 2:]]
+            call = {"index": 0, "id": self.server.new_id("call"), "type": "function",
+                    "function": {"name": self.script.tool_call, "arguments": ""}}
+            self.write_chunk(f"data: {json.dumps(chunk({'role': 'assistant', 'tool_calls': [call]}))}\n\n".encode("utf-8"))
+            for fragment in fragments:
+                time.sleep(self.latency.llm_token_interval)
+                delta = {"tool_calls": [{"index": 0, "function": {"arguments": fragment}}]}
+                self.write_chunk(f"data: {json.dumps(chunk(delta))}\n\n".encode("utf-8"))
+            self.write_chunk(f"data: {json.dumps(chunk({}, 'tool_calls'))}\n\n".encode("utf-8"))
+            self.write_chunk(b"data: [DONE]\n\n")
+            return self.end_chunked()
+        for index, token in enumerate(re.findall(r"\S+\s*", self.script.reply)):
+            if index:
+                time.sleep(self.latency.llm_token_interval)
+            delta = {"role": "assistant", "content": token} if index == 0 else {"content": token}
+            self.write_chunk(f"data: {json.dumps(chunk(delta))}\n\n".encode("utf-8"))
+        self.write_chunk(f"data: {json.dumps(chunk({}, 'stop'))}\n\n".encode("utf-8"))
+        self.write_chunk(b"data: [DONE]\n\n")
+        self.end_chunked()
+
+    def tone(self, rate):
+        """One second of a quiet 200 Hz tone as 16-bit PCM, cached per sample rate."""
+        tone = self.server.tones.get(rate)
+        if tone is None:
+            tone = self.server.tones[rate] = b"".join(
+                int(3000 * math.sin(2 * math.pi * 200 * index / rate)).to_bytes(2, "little", signed=True)
+                for index in range(rate)
+            )
+        return tone
+
+    def stream_speech(self, text, output_format):
+        """Streams audio as long as the text would take to speak, in timed chunks.
+
+        PCM formats get a quiet tone; compressed formats get the configured
+        encoded audio for that codec, or silence bytes when there is none.
+        """
+        bytes_per_second = OUTPUT_FORMAT_RATES.get(output_format, 16000)
+        size = int(len(text) * self.latency.tts_seconds_per_char * bytes_per_second) & ~1
+        codec = output_format.split("_")[0]
+        if codec == "pcm":
+            tone = self.tone(bytes_per_second // 2)
+            audio = (tone * (size // len(tone) + 1))[:size]
+        elif codec in self.server.speech_audio:
+            encoded = self.server.speech_audio[codec]
+            audio = (encoded * (size // len(encoded) + 1))[:size]
+        else:
+            audio = bytes(size)
+        self.start_chunked("audio/pcm" if codec == "pcm" else f"audio/{codec}")
+        time.sleep(self.latency.tts_first_byte)
+        for start in range(0, len(audio), 4096):
+            if start:
+                time.sleep(self.latency.tts_chunk_interval)
+            self.write_chunk(audio[start:start + 4096])
+        self.end_chunked()
+
+
+class FakeProviderServer:
+    """Threaded HTTP server emulating the provider REST APIs on a local port."""
+
+    def __init__(self, latency=None, script=None, host="127.0.0.1", port=0, speech_audio=None):
+        self.server = ThreadingHTTPServer((host, port), FakeProviderHandler)
+        self.server.daemon_threads = True
+        self.server.latency = latency or FakeLatency()
+        self.server.script = script or FakeScript()
+        # Encoded audio served for compressed output formats, by codec (e.g. {"mp3": b"..."})
+        self.server.speech_audio = speech_audio or {}
+        self.server.tones = {}
+        # (method, path) of every API request, to count round trips
+        self.server.requests = []
+        ids = itertools.count(1)
+        self.server.new_id = lambda prefix: f"{prefix}_{next(ids)}"
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self):
+        return self.server.requests
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class FakeRealtimeServer:
+    """Websocket server speaking the AssemblyAI realtime protocol.
+
+    Partial transcripts grow with the amount of audio received; the scripted
+    transcript is sent as the final transcript when the client terminates.
+    """
+
+    def __init__(self, latency=None, script=None, host="127.0.0.1", port=0, sample_rate=16000):
+        from websockets.sync.server import serve
+
+        self.latency = latency or FakeLatency()
+        self.script = script or FakeScript()
+        self.sample_rate = sample_rate
+        self.server = serve(self.handle, host, port)
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.socket.getsockname()[:2]
+        return f"ws://{host}:{port}/v2/realtime/ws"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+    def handle(self, websocket):
+        websocket.send(json.dumps({"message_type": "SessionBegins", "session_id": uuid.uuid4().hex}))
+        words = self.script.transcript.split()
+        received = 0
+        for message in websocket:
+            data = json.loads(message)
+            if data.get("terminate_session"):
+                time.sleep(self.latency.stt_final)
+                websocket.send(json.dumps({"message_type": "FinalTranscript", "text": self.script.transcript}))
+                websocket.send(json.dumps({"message_type": "SessionTerminated"}))
+                return
+            received += len(base64.b64decode(data.get("audio_data", "")))
+            # Reveal roughly three words per second of audio
+            heard = int(received / (self.sample_rate * 2) * 3)
+            websocket.send(json.dumps({"message_type": "PartialTranscript", "text": " ".join(words[:heard])}))
@@ -0,0 +1,235 @@
+"""Load generator for the multi-session server: N concurrent simulated devices.
+
+Usage: python -m benchmarks.load_generator [--clients 1,2,4,8,16] [--turns 5] [--max-active-turns 8]
+                                           [--url ws://host:8765] [--endpointing] [--json results.json]
+
+Each simulated client connects to the session server, says the wake word,
+streams a speech fixture at real-time pace (scaled by --speed), ends the
+recording with "reply" (or lets the server's endpointer do it) and reads
+the reply audio, then thinks for --think seconds before the next turn.
+Clients start at random offsets within the first --ramp seconds.
+
+Without --url, a server is started in-process against the local fake
+provider servers from benchmarks.fake_servers. The report shows, for each
+number of clients, the end of speech to first reply audio latency, the
+time to the whole reply, the time turns waited for a processing slot and
+the turn throughput.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from queue import Queue, Empty
+
+from benchmarks.e2e_bench import CHUNK_FRAMES, SAMPLE_RATE, SCRIPTS, distribution, generate_fixtures
+from benchmarks.fake_servers import FakeLatency, FakeProviderServer, FakeRealtimeServer, FakeScript
+
+
+class SimulatedClient:
+    """One device: streams fixtures to the server and times the replies."""
+
+    def __init__(self, url, fixtures, turns, speed=1.0, think=1.0, endpointing=False, timeout=30.0):
+        self.url = url
+        self.fixtures = fixtures
+        self.turns = turns
+        self.speed = speed
+        self.think = think
+        self.endpointing = endpointing
+        self.timeout = timeout
+        self.messages = Queue()
+        self.results = []
+        self.errors = []
+
+    def run(self, start_delay=0.0):
+        from websockets.sync.client import connect
+
+        time.sleep(start_delay)
+        try:
+            with connect(self.url, max_size=None) as websocket:
+                receiver = threading.Thread(target=self._receive, args=(websocket,), daemon=True)
+                receiver.start()
+                for turn in range(self.turns):
+                    self.run_turn(websocket, self.fixtures[turn % len(self.fixtures)])
+                    time.sleep(self.think)
+        except Exception as e:
+            self.errors.append(str(e))
+
+    def _receive(self, websocket):
+        try:
+            for message in websocket:
+                self.messages.put((time.perf_counter(), message))
+        except Exception:
+            pass
+
+    def run_turn(self, websocket, fixture):
+        websocket.send(json.dumps({"type": "word", "word": "computer"}))
+        frame_bytes = CHUNK_FRAMES * 2
+        frame_seconds = CHUNK_FRAMES / SAMPLE_RATE / self.speed
+        started_at = deadline = time.perf_counter()
+        for start in range(0, len(fixture.pcm), frame_bytes):
+            deadline += frame_seconds
+            time.sleep(max(0.0, deadline - time.perf_counter()))
+            websocket.send(fixture.pcm[start:start + frame_bytes])
+        if self.endpointing:
+            speech_end_at = started_at + fixture.speech_end / self.speed
+        else:
+            websocket.send(json.dumps({"type": "word", "word": "reply"}))
+            speech_end_at = time.perf_counter()
+
+        first_audio_at = None
+        give_up_at = time.perf_counter() + self.timeout
+        while True:
+            try:
+                received_at, message = self.messages.get(timeout=max(0.0, give_up_at - time.perf_counter()))
+            except Empty:
+                self.errors.append("turn timed out")
+                return
+            if isinstance(message, bytes):
+                if first_audio_at is None and received_at >= speech_end_at:
+                    first_audio_at = received_at
+                continue
+            event = json.loads(message)
+            if event["type"] == "error":
+                self.errors.append(event["error"])
+                return
+            if event["type"] == "turn_end" and received_at >= speech_end_at:
+                self.results.append({
+                    "first_audio": first_audio_at - speech_end_at if first_audio_at is not None else None,
+                    "reply": received_at - speech_end_at,
+                })
+                return
+
+
+def start_local_server(args, latency, script):
+    import openai
+    from heddy.server.server import SessionServer, SharedResources
+    from heddy.speech_to_text.assemblyai_transcriber import AssemblyAITranscriber
+    from heddy.text_to_speech.eleven_labs import ElevenLabsManager
+    from heddy.transport import HTTPTransport
+
+    provider = FakeProviderServer(latency, script).start()
+    realtime = None if args.no_streaming_stt else FakeRealtimeServer(latency, script).start()
+    transport = HTTPTransport(pool_maxsize=args.max_active_turns)
+    eleven_labs_manager = ElevenLabsManager(api_key="benchmark", transport=transport, base_url=provider.url,
+                                            output_format="pcm_16000")
+    resources = SharedResources(
+        transport=transport,
+        openai_client=openai.OpenAI(api_key="benchmark", base_url=f"{provider.url}/v1",
+                                    http_client=transport.httpx_client()),
+        eleven_labs_manager=eleven_labs_manager,
+        synthesizer=eleven_labs_manager,
+        transcriber=AssemblyAITranscriber(api_key="benchmark", base_url=provider.url),
+        assistant_id="asst_benchmark",
+        streaming_stt=realtime is not None,
+        streaming_stt_url=realtime.url if realtime is not None else None,
+        assemblyai_api_key="benchmark",
+        endpointing=args.endpointing,
+        max_active_turns=args.max_active_turns
+    )
+    server = SessionServer(resources, port=0, max_sessions=max(args.clients) + 1).start()
+    return server, [provider, realtime]
+
+
+def run_round(url, clients, args, fixtures, metrics):
+    rng = random.Random(clients)
+    simulated = [
+        SimulatedClient(url, fixtures[index % len(fixtures):] + fixtures[:index % len(fixtures)], args.turns,
+                        speed=args.speed, think=args.think, endpointing=args.endpointing)
+        for index in range(clients)
+    ]
+    metrics.reset()
+    started_at = time.perf_counter()
+    threads = [
+        threading.Thread(target=client.run, args=(rng.uniform(0, args.ramp),), daemon=True)
+        for client in simulated
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started_at
+
+    results = [result for client in simulated for result in client.results]
+    slot_waits = metrics.snapshot()["samples"].get("server.slot_wait", [])
+    return {
+        "clients": clients,
+        "turns": len(results),
+        "errors": [error for client in simulated for error in client.errors],
+        "elapsed": elapsed,
+        "first_audio": distribution([result["first_audio"] for result in results if result["first_audio"] is not None]),
+        "reply": distribution([result["reply"] for result in results]),
+        "slot_wait": distribution(slot_waits),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", default="1,2,4,8,16", help="comma-separated numbers of concurrent clients")
+    parser.add_argument("--turns", type=int, default=5, help="turns per client")
+    parser.add_argument("--think", type=float, default=1.0, help="seconds between a reply and the next turn")
+    parser.add_argument("--ramp", type=float, default=2.0, help="clients start within this many seconds")
+    parser.add_argument("--speed", type=float, default=1.0, help="stream fixtures faster than real time")
+    parser.add_argument("--url", help="load an already running session server instead of a local one")
+    parser.add_argument("--max-active-turns", type=int, default=8, help="slots of the local server")
+    parser.add_argument("--endpointing", action="store_true", help="let the server end recordings on silence")
+    parser.add_argument("--no-streaming-stt", action="store_true", help="upload recordings instead of streaming")
+    for field, default in vars(FakeLatency()).items():
+        parser.add_argument(f"--{field.replace('_', '-')}", type=float, default=default,
+                            help=f"fake provider latency in seconds (default {default})")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+    args.clients = [int(count) for count in args.clients.split(",")]
+
+    from heddy.metrics import metrics
+
+    latency = FakeLatency(**{field: getattr(args, field) for field in vars(FakeLatency())})
+    transcript, reply = SCRIPTS[0]
+    script = FakeScript(transcript=transcript, reply=reply)
+    fixtures = generate_fixtures(len(SCRIPTS))
+    server = None
+    fakes = []
+    url = args.url
+    if url is None:
+        server, fakes = start_local_server(args, latency, script)
+        url = server.url
+
+    rounds = []
+    server_stats = None
+    try:
+        for clients in args.clients:
+            rounds.append(run_round(url, clients, args, fixtures, metrics))
+        if server is not None:
+            server_stats = server.stats()
+    finally:
+        if server is not None:
+            server.stop()
+        for fake in fakes:
+            if fake is not None:
+                fake.stop()
+
+    print(f"\n{'clients':>7} {'turns':>6} {'errors':>6} {'first audio p50':>16} {'p95':>8} {'p99':>8} "
+          f"{'reply p50':>10} {'slot wait p95':>14} {'turns/s':>8}")
+    for result in rounds:
+        first_audio = result["first_audio"]
+        reply_time = result["reply"]
+        slot_wait = result["slot_wait"]
+        first = (f"{first_audio['p50'] * 1000:13.0f} ms {first_audio['p95'] * 1000:5.0f} ms "
+                 f"{first_audio['p99'] * 1000:5.0f} ms") if first_audio else f"{'n/a':>16} {'':>8} {'':>8}"
+        print(f"{result['clients']:7d} {result['turns']:6d} {len(result['errors']):6d} {first} "
+              f"{reply_time.get('p50', 0) * 1000:7.0f} ms {slot_wait.get('p95', 0) * 1000:11.0f} ms "
+              f"{result['turns'] / result['elapsed']:8.2f}")
+    for result in rounds:
+        for error in sorted(set(result["errors"])):
+            print(f"{result['clients']} clients: {error}")
+    if server_stats is not None:
+        print(f"\nTimers: {server_stats['timers']}")
+        print(f"Connections: {server_stats['connections']}")
+
+    if args.json:
+        with open(args.json, "w") as results_file:
+            json.dump({"rounds": rounds, "server": server_stats, "options": vars(args)}, results_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
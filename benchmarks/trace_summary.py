@@ -0,0 +1,76 @@
+"""Per-stage latency percentiles from the turn traces.
+
+Usage: python -m benchmarks.trace_summary [~/.cache/heddy/traces.jsonl] [--last 100] [--prefix http.]
+
+Reads the trace file and its rotated backups (traces.jsonl.1, .2, ...) and
+prints count, p50, p95, p99 and max duration for every span name, plus the
+whole turn. With --last only the most recent turns are included.
+"""
+import argparse
+import glob
+import json
+import math
+import os
+
+
+def load_records(path):
+    # Rotated files hold older records: .5 is the oldest, the bare path the newest
+    backups = [name for name in glob.glob(path + ".*") if name.rsplit(".", 1)[1].isdigit()]
+    backups.sort(key=lambda name: int(name.rsplit(".", 1)[1]), reverse=True)
+    records = []
+    for name in backups + [path]:
+        if not os.path.exists(name):
+            continue
+        with open(name) as trace_file:
+            for line in trace_file:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+    return records
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(records, last=None, prefix=""):
+    if last:
+        turns = []
+        for record in records:
+            if record["turn"] not in turns:
+                turns.append(record["turn"])
+        keep = set(turns[-last:])
+        records = [record for record in records if record["turn"] in keep]
+    durations = {}
+    for record in records:
+        if record["name"].startswith(prefix) or record["type"] == "turn":
+            durations.setdefault(record["name"], []).append(record["duration"])
+    rows = []
+    for name, values in durations.items():
+        values.sort()
+        rows.append((name, len(values), percentile(values, 50), percentile(values, 95),
+                     percentile(values, 99), values[-1]))
+    # Slowest stages first, the whole turn always at the top
+    rows.sort(key=lambda row: (row[0] != "turn", -row[2]))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default="~/.cache/heddy/traces.jsonl")
+    parser.add_argument("--last", type=int, help="only include the most recent N turns")
+    parser.add_argument("--prefix", default="", help="only include spans whose name starts with this")
+    args = parser.parse_args()
+
+    records = load_records(os.path.expanduser(args.path))
+    if not records:
+        raise SystemExit(f"No traces found in {args.path}")
+    print(f"{'stage':36} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, count, p50, p95, p99, maximum in summarize(records, args.last, args.prefix):
+        print(f"{name:36} {count:6d} {p50 * 1000:9.1f} {p95 * 1000:9.1f} {p99 * 1000:9.1f} {maximum * 1000:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
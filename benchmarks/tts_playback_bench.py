@@ -0,0 +1,189 @@
+"""Compares TTS playback paths: direct PCM, in-process MP3 decoding and an external player process.
+
+Usage: python -m benchmarks.tts_playback_bench [--clips 10] [--rate 48000] [--mp3 speech.mp3]
+
+Each clip is synthesized by ElevenLabsManager against the fake provider
+server and played through one of:
+
+  pcm         raw PCM at the device rate written straight into the output engine
+  decoder     MP3 decoded in-process with miniaudio into the output engine
+  subprocess  MP3 piped into an mpv process, as elevenlabs.stream does
+
+The output engine writes to a null device at real-time pace, and mpv
+writes its decoded audio to a pipe instead of a sound card, so both
+in-process paths and the subprocess path report the time from the
+synthesis request to the first audible sample. CPU time includes child
+processes. MP3 paths need real MP3 data: pass --mp3, or have ffmpeg
+installed to encode a test tone. Paths whose tools are missing are skipped.
+"""
+import argparse
+import resource
+import shutil
+import subprocess
+import threading
+import time
+
+from benchmarks.fake_servers import FakeLatency, FakeProviderServer
+from benchmarks.trace_summary import percentile
+from heddy.io.audio_decoder import decoder_available
+from heddy.io.audio_engine import AudioOutputEngine
+from heddy.io.sound_effects_player import AudioPlayer
+from heddy.text_to_speech.eleven_labs import ElevenLabsManager, pcm_format_for_rate
+from heddy.transport import HTTPTransport
+
+TEXT = "Octopuses have three hearts and blue blood, and each arm can taste what it touches."
+
+
+class NullStream:
+    """Output stream that discards audio at real-time pace and notes the first audible buffer."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.bytes_per_second = engine.rate * engine.channels * 2
+        self.deadline = None
+
+    def write(self, data):
+        if self.engine.first_audible_at is None and data.count(0) != len(data):
+            self.engine.first_audible_at = time.perf_counter()
+        now = time.perf_counter()
+        self.deadline = max(self.deadline or now, now) + len(data) / self.bytes_per_second
+        time.sleep(max(0.0, self.deadline - time.perf_counter()))
+
+    def stop_stream(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class NullOutputEngine(AudioOutputEngine):
+    """AudioOutputEngine mixing into a NullStream instead of a sound card."""
+
+    def __init__(self, rate, **kwargs):
+        super().__init__(rate=rate, **kwargs)
+        self.first_audible_at = None
+
+    def _open_stream(self):
+        return NullStream(self)
+
+
+def encode_mp3_tone():
+    if shutil.which("ffmpeg") is None:
+        return None
+    return subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-f", "lavfi", "-i", "sine=frequency=200:duration=20",
+         "-ac", "1", "-ar", "44100", "-b:a", "128k", "-f", "mp3", "-"],
+        check=True, capture_output=True
+    ).stdout
+
+
+def play_with_subprocess(chunks):
+    """Pipes audio into mpv like elevenlabs.stream; returns when the first audible sample was decoded."""
+    process = subprocess.Popen(
+        ["mpv", "--no-cache", "--no-terminal", "--ao=pcm", "--ao-pcm-file=/dev/stdout",
+         "--ao-pcm-waveheader=no", "--", "fd://0"],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    first_audible = []
+
+    def read_output():
+        for data in iter(lambda: process.stdout.read(4096), b""):
+            if not first_audible and data.count(0) != len(data):
+                first_audible.append(time.perf_counter())
+
+    reader = threading.Thread(target=read_output, daemon=True)
+    reader.start()
+    for chunk in chunks:
+        process.stdin.write(chunk)
+        process.stdin.flush()
+    process.stdin.close()
+    process.wait()
+    reader.join()
+    return first_audible[0] if first_audible else None
+
+
+def children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_path(name, manager, play, engine, clips):
+    first_sample = []
+    cpu = []
+    started_all = time.perf_counter()
+    for _ in range(clips):
+        if engine is not None:
+            engine.first_audible_at = None
+        cpu_before = time.process_time() + children_cpu()
+        started_at = time.perf_counter()
+        result = manager(TEXT)
+        first_audible_at = play(result.audio_stream)
+        if engine is not None:
+            first_audible_at = engine.first_audible_at
+        cpu.append(time.process_time() + children_cpu() - cpu_before)
+        if first_audible_at is not None:
+            first_sample.append(first_audible_at - started_at)
+    return name, sorted(first_sample), sorted(cpu), time.perf_counter() - started_all
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clips", type=int, default=10)
+    parser.add_argument("--rate", type=int, default=48000, help="output device sample rate")
+    parser.add_argument("--mp3", help="MP3 file served as the synthesized speech for the MP3 paths")
+    parser.add_argument("--tts-first-byte", type=float, default=0.25)
+    parser.add_argument("--tts-chunk-interval", type=float, default=0.02)
+    args = parser.parse_args()
+
+    mp3 = None
+    if args.mp3:
+        with open(args.mp3, "rb") as mp3_file:
+            mp3 = mp3_file.read()
+    else:
+        mp3 = encode_mp3_tone()
+    latency = FakeLatency(tts_first_byte=args.tts_first_byte, tts_chunk_interval=args.tts_chunk_interval)
+    server = FakeProviderServer(latency, speech_audio={"mp3": mp3} if mp3 else None).start()
+    transport = HTTPTransport()
+    engine = NullOutputEngine(rate=args.rate)
+    engine.start()
+    audio_seconds = len(TEXT) * latency.tts_seconds_per_char
+
+    paths = []
+    pcm_format = pcm_format_for_rate(args.rate)
+    pcm_manager = ElevenLabsManager("benchmark", transport=transport, base_url=server.url, output_format=pcm_format)
+    pcm_player = AudioPlayer(output_engine=engine, audio_format=pcm_format)
+    paths.append((f"pcm ({pcm_format})", pcm_manager, pcm_player.play_audio, engine))
+
+    mp3_manager = ElevenLabsManager("benchmark", transport=transport, base_url=server.url,
+                                    output_format="mp3_44100_128")
+    if mp3 is None:
+        print("Skipping MP3 paths: pass --mp3 or install ffmpeg")
+    else:
+        if decoder_available():
+            decoder_player = AudioPlayer(output_engine=engine, audio_format="mp3_44100_128")
+            paths.append(("decoder (mp3, miniaudio)", mp3_manager, decoder_player.play_audio, engine))
+        else:
+            print("Skipping in-process decoder path: miniaudio is not installed")
+        if shutil.which("mpv") is not None:
+            paths.append(("subprocess (mp3, mpv)", mp3_manager, play_with_subprocess, None))
+        else:
+            print("Skipping subprocess path: mpv is not installed")
+
+    print(f"{args.clips} clips of {audio_seconds:.1f} s audio per path, device rate {args.rate} Hz\n")
+    print(f"{'path':28} {'first sample p50':>17} {'p95':>9} {'cpu ms/clip':>12} {'cpu % of audio':>15}")
+    try:
+        for name, manager, play, path_engine in paths:
+            name, first_sample, cpu, _ = run_path(name, manager, play, path_engine, args.clips)
+            cpu_median = percentile(cpu, 50)
+            if first_sample:
+                first = f"{percentile(first_sample, 50) * 1000:14.1f} ms {percentile(first_sample, 95) * 1000:6.1f} ms"
+            else:
+                first = f"{'n/a':>17} {'':>9}"
+            print(f"{name:28} {first} {cpu_median * 1000:12.1f} {cpu_median / audio_seconds * 100:14.1f}%")
+    finally:
+        engine.close()
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Offline evaluation of VAD endpointing over labelled WAV files.
+
+Usage: python -m benchmarks.vad_eval "fixtures/*.wav" [--trailing 0.5 0.8 1.2]
+
+Each WAV (16 kHz, 16-bit mono) needs a sidecar JSON file with the same name
+holding the time the speaker actually finished, e.g. {"speech_end": 3.42}.
+Files are fed in recorder-sized chunks. For every trailing-silence setting it
+reports endpoint latency after the true end of speech, false cut-offs
+(endpoint before the speaker finished) and misses (no endpoint at all).
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import wave
+
+from heddy.io.vad import Endpointer, EnergyVAD
+
+CHUNK_FRAMES = 1024
+
+
+def load_fixture(path):
+    with wave.open(path, "rb") as wf:
+        if wf.getframerate() != 16000 or wf.getsampwidth() != 2 or wf.getnchannels() != 1:
+            raise SystemExit(f"{path}: expected 16 kHz 16-bit mono audio")
+        pcm = wf.readframes(wf.getnframes())
+    with open(os.path.splitext(path)[0] + ".json") as label_file:
+        return pcm, json.load(label_file)["speech_end"]
+
+
+def find_endpoint(endpointer, pcm):
+    endpointer.reset()
+    chunk_bytes = CHUNK_FRAMES * 2
+    for start in range(0, len(pcm), chunk_bytes):
+        if endpointer.process(pcm[start:start + chunk_bytes]):
+            # The endpoint is reported when the chunk that completes it has been recorded
+            return (start + chunk_bytes) / 2 / 16000
+    return None
+
+
+def evaluate(fixtures, trailing_silence):
+    endpointer = Endpointer(EnergyVAD(), trailing_silence=trailing_silence)
+    latencies = []
+    false_cutoffs = 0
+    misses = 0
+    for pcm, speech_end in fixtures:
+        endpoint = find_endpoint(endpointer, pcm)
+        if endpoint is None:
+            misses += 1
+        elif endpoint < speech_end:
+            false_cutoffs += 1
+        else:
+            latencies.append(endpoint - speech_end)
+    return latencies, false_cutoffs, misses
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("wavs", help="glob of labelled WAV files")
+    parser.add_argument("--trailing", type=float, nargs="+", default=[0.5, 0.8, 1.2])
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(args.wavs))
+    if not paths:
+        raise SystemExit(f"No WAV files match {args.wavs}")
+    fixtures = [load_fixture(path) for path in paths]
+
+    print(f"{len(fixtures)} files")
+    print(f"{'trailing s':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}{'cut-offs':>10}{'misses':>8}")
+    for trailing_silence in args.trailing:
+        latencies, false_cutoffs, misses = evaluate(fixtures, trailing_silence)
+        if latencies:
+            latencies.sort()
+            p50 = statistics.median(latencies) * 1000
+            p95 = latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] * 1000
+            worst = latencies[-1] * 1000
+            print(f"{trailing_silence:>10.2f}{p50:>10.0f}{p95:>10.0f}{worst:>10.0f}{false_cutoffs:>10}{misses:>8}")
+        else:
+            print(f"{trailing_silence:>10.2f}{'-':>10}{'-':>10}{'-':>10}{false_cutoffs:>10}{misses:>8}")
+
+
+if __name__ == "__main__":
+    main()
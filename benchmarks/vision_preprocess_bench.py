@@ -0,0 +1,76 @@
+"""Benchmark image preprocessing settings for vision uploads.
+
+Usage: python -m benchmarks.vision_preprocess_bench [image glob] [--repeat N]
+
+Without an image glob, synthetic 1280x720 camera frames are used. For each
+setting it reports the bytes that would be uploaded (base64 included) and the
+median preprocessing time.
+"""
+import argparse
+import glob
+import statistics
+import time
+
+import cv2
+
+from heddy.image_preprocessor import ImagePreprocessor, base64_length
+from heddy.io.camera import SyntheticFrameSource
+
+SETTINGS = [
+    # (max size, format, quality)
+    (None, "png", None),
+    (1280, "jpeg", 90),
+    (1024, "jpeg", 80),
+    (1024, "webp", 80),
+    (768, "jpeg", 80),
+    (768, "jpeg", 60),
+    (768, "webp", 60),
+    (512, "jpeg", 70),
+]
+
+
+def load_images(pattern):
+    if pattern:
+        images = [image for image in (cv2.imread(path) for path in sorted(glob.glob(pattern))) if image is not None]
+        if not images:
+            raise SystemExit(f"No readable images match {pattern}")
+        return images
+    source = SyntheticFrameSource(fps=1000)
+    source.open()
+    return [source.read() for _ in range(4)]
+
+
+def run(images, repeat):
+    print(f"{'setting':<22}{'avg upload bytes':>18}{'ratio':>9}{'median encode ms':>18}")
+    baseline = None
+    for max_size, image_format, quality in SETTINGS:
+        preprocessor = ImagePreprocessor(
+            max_width=max_size or 100000,
+            max_height=max_size or 100000,
+            image_format=image_format,
+            quality=quality or 0
+        )
+        sizes = []
+        timings = []
+        for image in images:
+            for _ in range(repeat):
+                started_at = time.perf_counter()
+                encoded = preprocessor.process(image)
+                timings.append(time.perf_counter() - started_at)
+            sizes.append(base64_length(len(encoded.data)))
+        average_size = statistics.mean(sizes)
+        baseline = baseline or average_size
+        label = f"{max_size or 'full'} {image_format}" + (f" q{quality}" if quality else "")
+        print(f"{label:<22}{average_size:>18,.0f}{average_size / baseline:>9.2f}{statistics.median(timings) * 1000:>18.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="?", help="glob of sample images")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    run(load_images(args.images), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
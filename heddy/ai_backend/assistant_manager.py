@@ -3,11 +3,14 @@ from typing import Optional
 import openai
 import time
 import threading
-import requests
 import json
+from concurrent.futures import ThreadPoolExecutor
 import logging
 from heddy.application_event import ApplicationEvent, ProcessingStatus
-from heddy.state_manager import StateManager
+from heddy.metrics import metrics
+from heddy.scheduler import scheduler
+from heddy.tracing import tracer
+from heddy.transport import get_transport
 from openai.lib.streaming import AssistantEventHandler
 from openai.types.beta import Assistant, Thread
 from openai.types.beta.threads import Run, RequiredActionFunctionToolCall, TextDelta
@@ -16,8 +19,11 @@ from openai.types.beta.assistant_stream_event import (
     ThreadRunFailed, ThreadRunCancelling, ThreadRunCancelled, ThreadRunExpired, ThreadRunStepFailed,
     ThreadRunStepCancelled, ThreadRunStepDelta)
 from dataclasses import dataclass
-from heddy.io.sound_effects_player import AudioPlayer
-from heddy.vision_module import VisionModule
+from heddy.ai_backend.tool_runner import ToolRunner
+from heddy.text_to_speech.sentence_segmenter import SentenceSegmenter
+
+# Run states in which the thread does not accept new messages
+ACTIVE_RUN_STATUSES = ("queued", "in_progress", "requires_action", "cancelling")
 
 class AssistantResultStatus(Enum):
     SUCCESS = 1
@@ -61,7 +67,7 @@ class EventHandler(AssistantEventHandler):
         webhook_url = "https://hooks.zapier.com/hooks/catch/82343/19816978ac224264aa3eec6c8c911e10/"
         payload = {"text": text}
         try:
-            response = requests.post(webhook_url, json=payload)
+            response = get_transport().post(webhook_url, json=payload)
             if response.status_code == 200:
                 logging.info("Text sent successfully via Zapier.")
                 self.submit_tool_output(tool_call_id, True)
@@ -90,57 +96,91 @@ class EventHandler(AssistantEventHandler):
 
 
 
-def tool_call_zapier(arguments):
-    webhook_url = "https://hooks.zapier.com/hooks/catch/82343/19816978ac224264aa3eec6c8c911e10/"
-    
-    # Parse the arguments as JSON if it's a string
-    if isinstance(arguments, str):
-        arguments = json.loads(arguments)
-    
-    # Access the 'message' key instead of 'text'
-    text_to_send = arguments.get('message', '')  # Default to empty string if 'message' not found
-    
-    payload = {"text": text_to_send}
-    try:
-        response = requests.post(webhook_url, json=payload)
-        if response.status_code == 200:
-            return "Success!"
-        else:
-            return f"Failed with status code: {response.status_code}"
-    except Exception as e:
-        return f"Exception occurred: {str(e)}"
-    
-def retrieve_image_description(arguments):
-    # Parse the arguments as JSON if it's a string
-    if isinstance(arguments, str):
-        arguments = json.loads(arguments)
-    
-    # Access the 'message' key
-    message = arguments.get('message', '')
-    
-    # Create an instance of VisionModule and get the stored image description
-    vision_module = VisionModule()  # Assuming VisionModule is modified to not require openai_api_key during initialization
-    image_description = vision_module.get_stored_image_description()  # Get the stored description
-    
-    # Append the image description to the message
-    message += "\n\nImage Description: " + image_description
-    
-    # Return the updated message
-    return message
-    
 class ThreadManager:
-    def __init__(self, client):
+    def __init__(self, client, audio_player=None, inactivity_timeout=90, timer_scheduler=None):
         self.client = client
         self.thread_id = None
         self.interaction_in_progress = False
+        self.last_interaction_time = None
+        # The thread is reset after this many seconds without an interaction
+        self.inactivity_timeout = inactivity_timeout
+        self.timer_scheduler = timer_scheduler or scheduler
         self.reset_timer = None
+        # Once closed, the end of an interaction still in progress schedules no new reset
+        self.timer_lock = threading.Lock()
+        self.closed = False
+        # Shared player for the reset sound; a local one is created on first use if none is given
+        self.audio_player = audio_player
+        # A thread created speculatively on the wake word, ready for the next turn
+        self.spare_thread = None
+        self.spare_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="heddy-thread")
+        # API requests made on the critical path of the current turn
+        self.round_trips = 0
+        # Cancellation of an interrupted run; the thread accepts no messages until it finishes
+        self.pending_cancel = None
+
+    def prepare_thread_async(self):
+        """Creates a spare thread in the background if the next turn will need a new one."""
+        if self.thread_id is not None or self.spare_thread is not None:
+            return
+        self.spare_thread = self.spare_executor.submit(self._create_spare_thread)
+
+    def _create_spare_thread(self):
+        try:
+            thread = self.client.beta.threads.create()
+            print(f"Spare thread created: {thread.id}")
+            return thread.id
+        except Exception as e:
+            print(f"Failed to create a spare thread: {e}")
+            return None
+
+    def has_spare_thread(self):
+        return self.spare_thread is not None
+
+    def take_spare_thread(self):
+        """Returns the spare thread id, waiting for it if its creation is still in flight."""
+        if self.spare_thread is None:
+            return None
+        spare_thread, self.spare_thread = self.spare_thread, None
+        return spare_thread.result()
+
+    def start_turn(self):
+        self.round_trips = 0
+
+    def end_turn(self):
+        metrics.record_value("assistant.round_trips", self.round_trips)
+
+    def create_thread_and_run(self, assistant_id, content):
+        """Creates a thread holding the message and starts a streamed run in one request."""
+        self.round_trips += 1
+        return self.client.beta.threads.create_and_run_stream(
+            assistant_id=assistant_id,
+            thread={"messages": [{"role": "user", "content": content}]}
+        )
+
+    def create_run(self, assistant_id, content):
+        """Adds the message to the current thread and starts a streamed run in one request."""
+        self.wait_for_cancel()
+        self.round_trips += 1
+        return self.client.beta.threads.runs.create_and_stream(
+            thread_id=self.thread_id,
+            assistant_id=assistant_id,
+            additional_messages=[{"role": "user", "content": content}]
+        )
 
     def create_thread(self):
         if self.thread_id is not None and not self.interaction_in_progress:
             print(f"Using existing thread: {self.thread_id}")
             return self.thread_id
 
+        spare_thread_id = self.take_spare_thread()
+        if spare_thread_id is not None:
+            self.thread_id = spare_thread_id
+            print(f"Using spare thread: {self.thread_id}")
+            return self.thread_id
+
         try:
+            self.round_trips += 1
             thread = self.client.beta.threads.create()
             self.thread_id = thread.id
             print(f"New thread created: {self.thread_id}")
@@ -149,16 +189,45 @@ class ThreadManager:
             print(f"Failed to create a thread: {e}")
             return None
 
+    def cancel_run(self, thread_id, run_id=None):
+        """Cancels an interrupted run in the background; without a run id, the thread's latest run."""
+        self.pending_cancel = self.spare_executor.submit(self._cancel_run, thread_id, run_id)
+
+    def _cancel_run(self, thread_id, run_id, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        try:
+            if run_id is None:
+                runs = self.client.beta.threads.runs.list(thread_id=thread_id, limit=1)
+                if not runs.data or runs.data[0].status not in ACTIVE_RUN_STATUSES:
+                    return
+                run_id = runs.data[0].id
+            run = self.client.beta.threads.runs.cancel(run_id=run_id, thread_id=thread_id)
+            # Cancelling is asynchronous on the server; wait until the run has actually stopped
+            while run.status in ACTIVE_RUN_STATUSES and time.monotonic() < deadline:
+                time.sleep(0.1)
+                run = self.client.beta.threads.runs.retrieve(run_id=run_id, thread_id=thread_id)
+            print(f"Run {run_id} {run.status}")
+        except Exception as e:
+            print(f"Failed to cancel run {run_id}: {e}")
+
+    def wait_for_cancel(self):
+        if self.pending_cancel is not None:
+            pending_cancel, self.pending_cancel = self.pending_cancel, None
+            pending_cancel.result()
+
     def add_message_to_thread(self, content):
         if not self.thread_id:
             print("No thread ID set. Cannot add message.")
             return
 
+        self.wait_for_cancel()
+
         if self.interaction_in_progress:
             print("Previous interaction still in progress. Please wait.")
             return
 
         try:
+            self.round_trips += 1
             message = self.client.beta.threads.messages.create(
                 thread_id=self.thread_id,
                 role="user",
@@ -172,7 +241,7 @@ class ThreadManager:
         if not self.thread_id or not self.interaction_in_progress:
             self.create_thread()
         self.add_message_to_thread(content)
-        StateManager.last_interaction_time = time.time()  # Update the time with each interaction
+        self.last_interaction_time = time.time()  # Update the time with each interaction
         self.interaction_in_progress = True
         self.reset_last_interaction_time()
 
@@ -182,64 +251,97 @@ class ThreadManager:
         self.interaction_in_progress = False
 
     def reset_last_interaction_time(self):
-        # This method resets the last interaction time and calls reset_thread after 90 seconds
-        def reset():
-            StateManager.last_interaction_time = None
+        # Resets the last interaction time and the thread after the inactivity timeout
+        with self.timer_lock:
+            if self.closed:
+                return
+            if self.reset_timer is not None and self.reset_timer.is_alive():
+                self.reset_timer.cancel()
+            self.reset_timer = self.timer_scheduler.schedule(
+                self.inactivity_timeout, self.reset_after_inactivity, name="thread-reset"
+            )
+
+    def reset_after_inactivity(self):
+        # Runs on the shared scheduler thread, so the sound (device or network I/O) is played by a worker
+        with self.timer_lock:
+            if self.closed:
+                return
+            self.last_interaction_time = None
             self.reset_thread()  # Reset the thread once the timer completes
             print("Last interaction time reset and thread reset")
-            # Play the timer reset sound effect
-            audio_player = AudioPlayer()
-            audio_player.play_sound('timerreset.wav')  # Adjust the path as necessary
-        
-        # Cancel existing timer if it exists and is still running
-        if self.reset_timer is not None and self.reset_timer.is_alive():
-            self.reset_timer.cancel()
-        
-        # Create and start a new timer
-        self.reset_timer = threading.Timer(90, reset)
-        self.reset_timer.start()
+            self.spare_executor.submit(self.play_reset_sound)
+
+    def play_reset_sound(self):
+        # Play the timer reset sound effect
+        if self.audio_player is None:
+            from heddy.io.sound_effects_player import AudioPlayer
+            self.audio_player = AudioPlayer()
+        self.audio_player.play_sound('timerreset.wav')  # Adjust the path as necessary
 
     def end_of_interaction(self):
         # Call this method at the end of an interaction to reset the timer
         self.reset_last_interaction_time()
 
+    def close(self):
+        """Stops the reset timer and the background thread creation, e.g. when a server session ends."""
+        with self.timer_lock:
+            self.closed = True
+            if self.reset_timer is not None:
+                self.reset_timer.cancel()
+        self.spare_executor.shutdown(wait=False)
+
 
 
 
 class StreamingManager:
-    def __init__(self, thread_manager, eleven_labs_manager, assistant_id=None):
+    def __init__(
+            self,
+            thread_manager,
+            eleven_labs_manager,
+            assistant_id=None,
+            speech_pipeline=None,
+            transport=None,
+            max_tool_workers=4,
+            tool_filler="One moment.",
+            tool_registry=None,
+            tool_executor=None
+        ):
         self.thread_manager = thread_manager
+        self.transport = transport or get_transport()
         self.eleven_labs_manager = eleven_labs_manager
         self.assistant_id = assistant_id
         self.event_handler = None
+        # When set, finished sentences are spoken while the reply is still streaming
+        self.speech_pipeline = speech_pipeline
+        # Server sessions share one tool executor so tool threads stay bounded
+        self.tool_runner = ToolRunner(
+            tool_registry=tool_registry,
+            transport=self.transport,
+            tool_executor=tool_executor,
+            max_tool_workers=max_tool_workers,
+            tool_filler=tool_filler
+        )
+        self.interaction_started_at = None
+        # Barge-in: set by cancel(), which closes the current stream and cancels the current run
+        self.cancelled = threading.Event()
+        self.current_stream = None
+        self.current_run = None
 
     def set_event_handler(self, event_handler):
         self.event_handler = event_handler
     
+    def run_tool_calls(self, calls):
+        return self.tool_runner.run(calls, self.speech_pipeline)
+
     def handle_required_action(self, event):
         data = event.data
         action = data.required_action
         if action.type == "submit_tool_outputs":
-            calls = action.submit_tool_outputs.tool_calls
-            outputs = []
-            for call in calls:
-                func = call.function
-                if func.name == "send_text_message":
-                    output = tool_call_zapier(func.arguments)
-                    outputs.append({
-                        "output": output,
-                        "tool_call_id": call.id
-                    })
-                elif func.name == "send_image_description":
-                    output = retrieve_image_description(func.arguments)
-                    outputs.append({
-                        "output": output,
-                        "tool_call_id": call.id
-                    })
-                else:
-                    raise NotImplementedError(f"{func.name=}")
-            
-            return openai.beta.threads.runs.submit_tool_outputs_stream(
+            outputs = self.run_tool_calls(action.submit_tool_outputs.tool_calls)
+            if self.cancelled.is_set():
+                return None
+            self.thread_manager.round_trips += 1
+            return self.thread_manager.client.beta.threads.runs.submit_tool_outputs_stream(
                 tool_outputs=outputs,
                 run_id=data.id,
                 thread_id=data.thread_id
@@ -247,50 +349,135 @@ class StreamingManager:
         raise NotImplementedError(f"{action.type=}")
             
     
-    def handle_stream(self,):
+    def prepare(self):
+        """Called on the wake word so a thread is ready by the time the user finishes speaking."""
+        self.thread_manager.prepare_thread_async()
+
+    def clear_cancel(self):
+        """Forgets an interruption of the previous reply; called when the next turn starts."""
+        self.cancelled.clear()
+        if self.speech_pipeline is not None:
+            self.speech_pipeline.clear_cancel()
+
+    def cancel(self):
+        """Interrupts the reply in progress: drops pending speech and stops reading the stream.
+
+        The reading thread then cancels the run, see handle_stream().
+        """
+        self.cancelled.set()
+        if self.speech_pipeline is not None:
+            self.speech_pipeline.cancel()
+        stream, self.current_stream = self.current_stream, None
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception as e:
+                print(f"Failed to close the assistant stream: {e}")
+
+    def handle_stream(self, streaming_manager=None):
         text = ""
-        streaming_manager = openai.beta.threads.runs.create_and_stream(
-                thread_id=self.thread_manager.thread_id,
-                assistant_id=self.assistant_id,
-            )
+        segmenter = SentenceSegmenter()
+        # Time to first token is measured from the start of the interaction
+        first_token = tracer.span("assistant.time_to_first_token")
+        first_token.started_at = self.interaction_started_at or first_token.started_at
+        if streaming_manager is None:
+            self.thread_manager.round_trips += 1
+            streaming_manager = self.thread_manager.client.beta.threads.runs.create_and_stream(
+                    thread_id=self.thread_manager.thread_id,
+                    assistant_id=self.assistant_id,
+                )
         while True:
+            next_streaming_manager = None
             with streaming_manager as stream:
-                for event in stream:
-                    if isinstance(event, ThreadMessageDelta) and event.data.delta.content:
-                        delta = event.data.delta.content[0].text.value
-                        text +=  delta if delta is not None else ""
-                        continue
-                    if isinstance(event, ThreadRunStepDelta):
-                        continue
-                    
-                    print("Event received:", event)
-                    if isinstance(event, ThreadRunRequiresAction):
-                        streaming_manager = self.handle_required_action(event)
-                        break
-                    if isinstance(event, ThreadRunCompleted):
-                        print("\nInteraction completed.")
-                        self.thread_manager.interaction_in_progress = False
-                        self.thread_manager.end_of_interaction()
-                        return True, text
-                        # Exit the loop once the interaction is complete
-                    if isinstance(event, ThreadRunFailed):
-                        print("\nInteraction failed.")
-                        self.thread_manager.interaction_in_progress = False
-                        self.thread_manager.end_of_interaction()
-                        return False, "Generic OpenAI Error"
-                        # Exit the loop if the interaction fails
-                    # Add more event types as needed based on your application's requirements
+                self.current_stream = stream
+                try:
+                    for event in stream:
+                        if getattr(event.data, "object", None) == "thread.run":
+                            self.current_run = (event.data.thread_id, event.data.id)
+                        if self.cancelled.is_set():
+                            break
+                        if self.thread_manager.thread_id is None and getattr(event.data, "thread_id", None):
+                            # The combined create-and-run call only reveals the new thread in its events
+                            self.thread_manager.thread_id = event.data.thread_id
+                            print(f"New thread created: {self.thread_manager.thread_id}")
+                        if isinstance(event, ThreadMessageDelta) and event.data.delta.content:
+                            delta = event.data.delta.content[0].text.value
+                            first_token.end()
+                            text +=  delta if delta is not None else ""
+                            if self.speech_pipeline is not None:
+                                for sentence in segmenter.feed(delta):
+                                    self.speech_pipeline.submit(sentence)
+                            continue
+                        if isinstance(event, ThreadRunStepDelta):
+                            continue
+
+                        print("Event received:", event)
+                        if isinstance(event, ThreadRunRequiresAction):
+                            next_streaming_manager = self.handle_required_action(event)
+                            break
+                        if isinstance(event, ThreadRunCompleted):
+                            print("\nInteraction completed.")
+                            if self.speech_pipeline is not None:
+                                for sentence in segmenter.flush():
+                                    self.speech_pipeline.submit(sentence)
+                            self.finish_run()
+                            return True, text
+                            # Exit the loop once the interaction is complete
+                        if isinstance(event, ThreadRunFailed):
+                            print("\nInteraction failed.")
+                            self.finish_run()
+                            return False, "Generic OpenAI Error"
+                            # Exit the loop if the interaction fails
+                        # Add more event types as needed based on your application's requirements
+                except Exception:
+                    # cancel() closes the stream under the reading thread
+                    if not self.cancelled.is_set():
+                        raise
+            if self.cancelled.is_set():
+                print("\nInteraction interrupted.")
+                thread_id, run_id = self.current_run or (self.thread_manager.thread_id, None)
+                if thread_id is not None:
+                    self.thread_manager.cancel_run(thread_id, run_id)
+                self.finish_run()
+                return True, text
+            if next_streaming_manager is None:
+                print("\nInteraction ended without completing.")
+                self.finish_run()
+                return False, "Generic OpenAI Error"
+            streaming_manager = next_streaming_manager
+
+    def finish_run(self):
+        self.current_stream = None
+        self.current_run = None
+        self.thread_manager.interaction_in_progress = False
+        self.thread_manager.end_of_interaction()
 
     def handle_streaming_interaction(self, event: ApplicationEvent):
         if not self.assistant_id:
             print("Assistant ID is not set.")
             return
-        if not self.thread_manager.thread_id:
-            self.thread_manager.create_thread()
-        
+        self.thread_manager.start_turn()
+        self.interaction_started_at = time.perf_counter()
         content = event.request
-        self.thread_manager.add_message_to_thread(content)
-        success, text = self.handle_stream()
+        streaming_manager = None
+        if not self.thread_manager.thread_id and not self.thread_manager.has_spare_thread():
+            # No thread to reuse: create it, add the message and start the run in one request
+            streaming_manager = self.thread_manager.create_thread_and_run(self.assistant_id, content)
+        else:
+            if not self.thread_manager.thread_id:
+                self.thread_manager.create_thread()
+            # The message travels with the run request, so the spare or existing thread costs one round trip too
+            streaming_manager = self.thread_manager.create_run(self.assistant_id, content)
+        if self.speech_pipeline is None:
+            success, text = self.handle_stream(streaming_manager)
+        else:
+            self.speech_pipeline.start_reply()
+            try:
+                success, text = self.handle_stream(streaming_manager)
+            finally:
+                self.speech_pipeline.finish_reply()
+            self.speech_pipeline.wait()
+        self.thread_manager.end_turn()
 
         if not success:
             event.status = ProcessingStatus.ERROR
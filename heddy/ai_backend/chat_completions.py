@@ -0,0 +1,279 @@
+import threading
+import time
+
+import openai
+from openai.types.chat import ChatCompletionMessageToolCall
+
+from heddy.ai_backend.tool_runner import ToolRunner
+from heddy.application_event import ApplicationEvent, ProcessingStatus
+from heddy.metrics import metrics
+from heddy.text_to_speech.sentence_segmenter import SentenceSegmenter
+from heddy.tracing import tracer
+from heddy.transport import get_transport
+
+DEFAULT_INSTRUCTIONS = (
+    "You are Heddy, a helpful voice assistant. Your replies are spoken aloud, "
+    "so keep them short and conversational and avoid markdown."
+)
+
+# Rough token accounting: about four characters per token, plus the framing of each message
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+def estimate_tokens(message):
+    """Estimates the prompt tokens of one chat message without a tokenizer."""
+    size = len(message.get("content") or "")
+    for call in message.get("tool_calls") or []:
+        size += len(call["function"]["name"]) + len(call["function"]["arguments"])
+    return MESSAGE_OVERHEAD_TOKENS + size // CHARS_PER_TOKEN
+
+
+class ConversationStore:
+    """Conversation history kept locally and trimmed to a token budget.
+
+    Messages are grouped into exchanges: a user message with the assistant
+    and tool messages that answer it. When the history grows past
+    ``token_budget``, the oldest exchanges are dropped whole, so a tool call
+    is never separated from its result; the latest exchange is always kept.
+    """
+
+    def __init__(self, instructions=DEFAULT_INSTRUCTIONS, token_budget=3000):
+        self.instructions = instructions
+        self.token_budget = token_budget
+        self.lock = threading.Lock()
+        # [[tokens, [message, ...]], ...], oldest first
+        self.exchanges = []
+        self.tokens = 0
+        self.trimmed = 0
+
+    def _append(self, message, new_exchange=False):
+        tokens = estimate_tokens(message)
+        with self.lock:
+            if new_exchange or not self.exchanges:
+                self.exchanges.append([0, []])
+            exchange = self.exchanges[-1]
+            exchange[0] += tokens
+            exchange[1].append(message)
+            self.tokens += tokens
+            while self.tokens > self.token_budget and len(self.exchanges) > 1:
+                dropped, _ = self.exchanges.pop(0)
+                self.tokens -= dropped
+                self.trimmed += 1
+
+    def add_user(self, content):
+        self._append({"role": "user", "content": content}, new_exchange=True)
+
+    def add_assistant(self, content, tool_calls=None):
+        message = {"role": "assistant", "content": content}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        self._append(message)
+
+    def add_tool_result(self, tool_call_id, output):
+        self._append({"role": "tool", "tool_call_id": tool_call_id, "content": output})
+
+    def messages(self):
+        """Returns the request messages: the instructions followed by the kept history."""
+        with self.lock:
+            history = [message for _, exchange in self.exchanges for message in exchange]
+        if self.instructions:
+            return [{"role": "system", "content": self.instructions}] + history
+        return history
+
+    def clear(self):
+        with self.lock:
+            self.exchanges = []
+            self.tokens = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                "exchanges": len(self.exchanges),
+                "tokens": self.tokens,
+                "token_budget": self.token_budget,
+                "trimmed": self.trimmed,
+            }
+
+
+class ChatCompletionsManager:
+    """Assistant backend on the Chat Completions API, a drop-in for StreamingManager.
+
+    The conversation lives in a local ConversationStore instead of a server
+    side thread, so a turn is one streaming completion request carrying the
+    trimmed history and the tool definitions, plus one more per round of tool
+    calls. There is no thread to create or reset and no run to cancel.
+    """
+
+    def __init__(
+            self,
+            client,
+            model="gpt-4o",
+            conversation=None,
+            speech_pipeline=None,
+            transport=None,
+            max_tool_workers=4,
+            tool_filler="One moment.",
+            tool_registry=None,
+            tool_executor=None
+        ):
+        self.client = client
+        self.model = model
+        self.conversation = conversation or ConversationStore()
+        self.transport = transport or get_transport()
+        # When set, finished sentences are spoken while the reply is still streaming
+        self.speech_pipeline = speech_pipeline
+        # Tool calls run exactly as in the Assistants backend: concurrently, with timeouts and the filler phrase
+        self.tool_runner = ToolRunner(
+            tool_registry=tool_registry,
+            transport=self.transport,
+            tool_executor=tool_executor,
+            max_tool_workers=max_tool_workers,
+            tool_filler=tool_filler
+        )
+        self.interaction_started_at = None
+        # API requests made for the current turn
+        self.round_trips = 0
+        self.cancelled = threading.Event()
+        self.current_stream = None
+
+    def prepare(self):
+        """Nothing to create ahead of a turn; the history is already local."""
+
+    def clear_cancel(self):
+        """Forgets an interruption of the previous reply; called when the next turn starts."""
+        self.cancelled.clear()
+        if self.speech_pipeline is not None:
+            self.speech_pipeline.clear_cancel()
+
+    def cancel(self):
+        """Interrupts the reply in progress: drops pending speech and closes the stream.
+
+        Closing the connection is all it takes to stop the completion.
+        """
+        self.cancelled.set()
+        if self.speech_pipeline is not None:
+            self.speech_pipeline.cancel()
+        stream, self.current_stream = self.current_stream, None
+        if stream is not None:
+            try:
+                stream.close()
+            except Exception as e:
+                print(f"Failed to close the completion stream: {e}")
+
+    def create_stream(self):
+        self.round_trips += 1
+        request = {"model": self.model, "messages": self.conversation.messages(), "stream": True}
+        tools = self.tool_runner.tool_registry.definitions()
+        if tools:
+            request["tools"] = tools
+        return self.client.chat.completions.create(**request)
+
+    def read_stream(self, stream, segmenter, first_token):
+        """Reads one streamed completion; returns its text, tool calls by index and finish reason."""
+        content = ""
+        tool_calls = {}
+        finish_reason = None
+        try:
+            for chunk in stream:
+                if self.cancelled.is_set():
+                    break
+                if not chunk.choices:
+                    continue
+                choice = chunk.choices[0]
+                delta = choice.delta
+                if delta.content:
+                    first_token.end()
+                    content += delta.content
+                    if self.speech_pipeline is not None:
+                        for sentence in segmenter.feed(delta.content):
+                            self.speech_pipeline.submit(sentence)
+                # Tool calls arrive in fragments: the id and name first, then pieces of the arguments
+                for call in delta.tool_calls or []:
+                    entry = tool_calls.setdefault(call.index, {"id": None, "name": "", "arguments": ""})
+                    if call.id:
+                        entry["id"] = call.id
+                    if call.function is not None:
+                        entry["name"] += call.function.name or ""
+                        entry["arguments"] += call.function.arguments or ""
+                if choice.finish_reason:
+                    finish_reason = choice.finish_reason
+        except Exception:
+            # cancel() closes the stream under the reading thread
+            if not self.cancelled.is_set():
+                raise
+        finally:
+            stream.close()
+        return content, tool_calls, finish_reason
+
+    def handle_stream(self):
+        text = ""
+        segmenter = SentenceSegmenter()
+        # Time to first token is measured from the start of the interaction
+        first_token = tracer.span("assistant.time_to_first_token")
+        first_token.started_at = self.interaction_started_at or first_token.started_at
+        while True:
+            try:
+                stream = self.current_stream = self.create_stream()
+                content, tool_calls, finish_reason = self.read_stream(stream, segmenter, first_token)
+            except openai.APIError as e:
+                print(f"\nInteraction failed: {e}")
+                self.current_stream = None
+                return False, "Generic OpenAI Error"
+            self.current_stream = None
+            text += content
+
+            if self.cancelled.is_set():
+                print("\nInteraction interrupted.")
+                # Keep what was said before the interruption as context for the next turn
+                if content:
+                    self.conversation.add_assistant(content)
+                return True, text
+            if finish_reason == "tool_calls" and tool_calls:
+                calls = [
+                    ChatCompletionMessageToolCall(
+                        id=entry["id"], type="function",
+                        function={"name": entry["name"], "arguments": entry["arguments"] or "{}"}
+                    )
+                    for _, entry in sorted(tool_calls.items())
+                ]
+                self.conversation.add_assistant(content or None, tool_calls=[call.model_dump() for call in calls])
+                outputs = self.tool_runner.run(calls, self.speech_pipeline)
+                for output in outputs:
+                    self.conversation.add_tool_result(output["tool_call_id"], output["output"])
+                if self.cancelled.is_set():
+                    return True, text
+                continue
+            if finish_reason is None:
+                print("\nInteraction ended without completing.")
+                return False, "Generic OpenAI Error"
+
+            print("\nInteraction completed.")
+            if self.speech_pipeline is not None:
+                for sentence in segmenter.flush():
+                    self.speech_pipeline.submit(sentence)
+            self.conversation.add_assistant(content)
+            return True, text
+
+    def handle_streaming_interaction(self, event: ApplicationEvent):
+        self.round_trips = 0
+        self.interaction_started_at = time.perf_counter()
+        self.conversation.add_user(event.request)
+        if self.speech_pipeline is None:
+            success, text = self.handle_stream()
+        else:
+            self.speech_pipeline.start_reply()
+            try:
+                success, text = self.handle_stream()
+            finally:
+                self.speech_pipeline.finish_reply()
+            self.speech_pipeline.wait()
+        metrics.record_value("assistant.round_trips", self.round_trips)
+
+        if not success:
+            event.status = ProcessingStatus.ERROR
+            event.error = text
+        else:
+            event.status = ProcessingStatus.SUCCESS
+            event.result = text
+        return event
@@ -0,0 +1,86 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+from heddy.functions2call import default_registry, UnknownToolError
+from heddy.tracing import tracer
+from heddy.transport import get_transport
+
+
+class ToolRunner:
+    """Runs an assistant's tool calls; shared by the Assistants and Chat Completions backends.
+
+    Calls run concurrently on ``tool_executor``, which server sessions share
+    so tool threads stay bounded. Each call gets its tool's timeout, and the
+    filler phrase is spoken first when the slowest tool is expected to take
+    ``filler_threshold`` seconds or more.
+    """
+
+    def __init__(
+            self,
+            tool_registry=None,
+            transport=None,
+            tool_executor=None,
+            max_tool_workers=4,
+            tool_filler="One moment.",
+            filler_threshold=1.0
+        ):
+        self.tool_registry = tool_registry or default_registry
+        self.transport = transport or get_transport()
+        self.tool_executor = tool_executor or ThreadPoolExecutor(
+            max_workers=max_tool_workers, thread_name_prefix="heddy-tool"
+        )
+        # Spoken while slow tools run; "One moment." is pre-synthesized at startup
+        self.tool_filler = tool_filler
+        self.filler_threshold = filler_threshold
+
+    def run(self, calls, speech_pipeline=None):
+        """Runs the tool calls concurrently and returns their outputs in call order.
+
+        A call that times out, fails or names an unknown tool produces a
+        failure output instead of holding up the run.
+        """
+        started_at = time.perf_counter()
+        expected = max(self.tool_registry.expected_latency(call.function.name) for call in calls)
+        if speech_pipeline is not None and self.tool_filler and expected >= self.filler_threshold:
+            speech_pipeline.submit(self.tool_filler)
+
+        session = tracer.session
+        futures = []
+        for call in calls:
+            tool = self.tool_registry.get(call.function.name)
+            # Unknown tools are answered right away instead of racing a worker against a zero timeout
+            future = None if tool is None else self.tool_executor.submit(
+                self._call_tool, session, call.function.name, call.function.arguments
+            )
+            futures.append((call, tool, future))
+        outputs = []
+        for call, tool, future in futures:
+            name = call.function.name
+            if future is None:
+                print(f"Unknown tool requested: {name}")
+                output = f"Failure: unknown tool {name}"
+            else:
+                remaining = max(0.0, started_at + tool.timeout - time.perf_counter())
+                try:
+                    output = future.result(timeout=remaining)
+                except FutureTimeoutError:
+                    # A call still queued behind busy workers is dropped instead of running late
+                    future.cancel()
+                    print(f"Tool call {name} timed out after {tool.timeout}s")
+                    output = f"Failure: {name} timed out after {tool.timeout} seconds"
+                except UnknownToolError:
+                    print(f"Unknown tool requested: {name}")
+                    output = f"Failure: unknown tool {name}"
+                except Exception as e:
+                    print(f"Tool call {name} failed: {e}")
+                    output = f"Failure: {name} raised {e}"
+            outputs.append({
+                "output": str(output),
+                "tool_call_id": call.id
+            })
+        return outputs
+
+    def _call_tool(self, session, name, arguments):
+        # Tool threads may be shared between sessions; trace the call in the caller's turn
+        tracer.bind(session)
+        return self.tool_registry.call(name, arguments, transport=self.transport)
@@ -1,7 +1,6 @@
 from dataclasses import dataclass
 from enum import Enum
-from typing import Optional
-from traitlets import Any
+from typing import Any, Optional
 
 class ApplicationEventType(Enum):
     EXIT = -1
@@ -0,0 +1,266 @@
+import asyncio
+import json
+import threading
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable, Optional
+
+from heddy.metrics import metrics
+from heddy.tracing import tracer
+from heddy.transport import get_transport
+
+
+class UnknownToolError(KeyError):
+    pass
+
+
+@dataclass
+class Tool:
+    name: str
+    func: Callable
+    parameters: dict
+    description: str = ""
+    timeout: float = 15.0
+    cacheable: bool = False
+    ttl: float = 60.0
+    # Initial guess of how long a call takes, refined from observed latencies
+    expected_latency: float = 0.0
+    # Whether the function takes ``transport`` and ``timeout`` keywords for its HTTP requests.
+    # A sync tool that times out keeps its worker until it returns, so its requests get the
+    # tool's timeout and fail on their own instead of holding a shared worker
+    uses_transport: bool = False
+
+    @property
+    def is_async(self):
+        return asyncio.iscoroutinefunction(self.func)
+
+    def definition(self):
+        """Returns the tool in the OpenAI function-calling format."""
+        return {
+            "type": "function",
+            "function": {
+                "name": self.name,
+                "description": self.description,
+                "parameters": self.parameters,
+            },
+        }
+
+
+@dataclass
+class ToolStats:
+    calls: int = 0
+    cache_hits: int = 0
+    failures: int = 0
+    total_latency: float = 0.0
+    expected_latency: float = 0.0
+
+
+class ToolRegistry:
+    """Registry of the functions the assistant can call.
+
+    Tools declare a name, a JSON schema for their arguments, a timeout and
+    whether their results may be cached for ``ttl`` seconds. Sync and async
+    implementations are both supported; tools making HTTP requests get the
+    caller's transport and their timeout. Every call records latency and call
+    counts, and cacheable calls with identical arguments are answered from the
+    cache instead of running again.
+    """
+
+    def __init__(self):
+        self.tools = {}
+        self.stats = {}
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def register(self, name, parameters, description="", timeout=15.0, cacheable=False, ttl=60.0, expected_latency=0.0,
+                 uses_transport=False):
+        """Decorator registering a function as a tool."""
+        def decorator(func):
+            self.add(Tool(name, func, parameters, description, timeout, cacheable, ttl, expected_latency,
+                          uses_transport))
+            return func
+        return decorator
+
+    def add(self, tool: Tool):
+        with self.lock:
+            self.tools[tool.name] = tool
+            self.stats[tool.name] = ToolStats(expected_latency=tool.expected_latency)
+
+    def get(self, name) -> Optional[Tool]:
+        return self.tools.get(name)
+
+    def definitions(self):
+        return [tool.definition() for tool in self.tools.values()]
+
+    def expected_latency(self, name):
+        stats = self.stats.get(name)
+        return stats.expected_latency if stats is not None else 0.0
+
+    def _prepare(self, name, arguments, transport):
+        tool = self.tools.get(name)
+        if tool is None:
+            raise UnknownToolError(name)
+        # Parse the arguments as JSON if it's a string
+        if isinstance(arguments, str):
+            arguments = json.loads(arguments) if arguments.strip() else {}
+        cache_key = (name, json.dumps(arguments, sort_keys=True)) if tool.cacheable else None
+        func = tool.func
+        if tool.uses_transport:
+            func = partial(func, transport=transport or get_transport(), timeout=tool.timeout)
+        return tool, func, arguments, cache_key
+
+    def _cached(self, cache_key):
+        if cache_key is None:
+            return None
+        with self.lock:
+            entry = self.cache.get(cache_key)
+            if entry is None:
+                return None
+            expires_at, output = entry
+            if expires_at < time.monotonic():
+                del self.cache[cache_key]
+                return None
+            self.stats[cache_key[0]].cache_hits += 1
+        metrics.increment(f"tool.{cache_key[0]}.cache_hits")
+        return output
+
+    def _record(self, tool, cache_key, started_at, output, failed):
+        elapsed = time.perf_counter() - started_at
+        with self.lock:
+            stats = self.stats[tool.name]
+            stats.calls += 1
+            stats.total_latency += elapsed
+            stats.failures += int(failed)
+            # Exponential moving average used to predict slow calls
+            stats.expected_latency = 0.7 * stats.expected_latency + 0.3 * elapsed if stats.calls > 1 else elapsed
+            if cache_key is not None and not failed:
+                self.cache[cache_key] = (time.monotonic() + tool.ttl, output)
+        metrics.record_timing(f"tool.{tool.name}", elapsed)
+        tracer.record_span(f"tool.{tool.name}", started_at, failed=failed)
+
+    def call(self, name, arguments, transport=None) -> Any:
+        """Runs a tool from a worker thread, serving cacheable results from the cache."""
+        tool, func, arguments, cache_key = self._prepare(name, arguments, transport)
+        cached = self._cached(cache_key)
+        if cached is not None:
+            return cached
+        started_at = time.perf_counter()
+        failed = True
+        try:
+            if tool.is_async:
+                output = asyncio.run(func(arguments))
+            else:
+                output = func(arguments)
+            failed = False
+            return output
+        finally:
+            self._record(tool, cache_key, started_at, None if failed else output, failed)
+
+    async def call_async(self, name, arguments, transport=None) -> Any:
+        """Runs a tool from a coroutine, with its timeout; sync tools run in a thread."""
+        tool, func, arguments, cache_key = self._prepare(name, arguments, transport)
+        cached = self._cached(cache_key)
+        if cached is not None:
+            return cached
+        started_at = time.perf_counter()
+        failed = True
+        try:
+            if tool.is_async:
+                coroutine = func(arguments)
+            else:
+                coroutine = asyncio.to_thread(func, arguments)
+            output = await asyncio.wait_for(coroutine, tool.timeout)
+            failed = False
+            return output
+        finally:
+            self._record(tool, cache_key, started_at, None if failed else output, failed)
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                name: {
+                    "calls": stats.calls,
+                    "cache_hits": stats.cache_hits,
+                    "failures": stats.failures,
+                    "average_latency": stats.total_latency / stats.calls if stats.calls else 0.0,
+                }
+                for name, stats in self.stats.items()
+            }
+
+
+# Global instance to be used outside this script
+default_registry = ToolRegistry()
+
+MESSAGE_PARAMETERS = {
+    "type": "object",
+    "properties": {
+        "message": {"type": "string", "description": "The text of the message"},
+    },
+    "required": ["message"],
+}
+
+
+@default_registry.register(
+    "send_text_message",
+    MESSAGE_PARAMETERS,
+    description="Send a text message to the user's phone.",
+    timeout=10.0,
+    expected_latency=1.5,
+    uses_transport=True
+)
+def tool_call_zapier(arguments, transport=None, timeout=10.0):
+    webhook_url = "https://hooks.zapier.com/hooks/catch/82343/19816978ac224264aa3eec6c8c911e10/"
+
+    # Parse the arguments as JSON if it's a string
+    if isinstance(arguments, str):
+        arguments = json.loads(arguments)
+
+    # Access the 'message' key instead of 'text'
+    text_to_send = arguments.get('message', '')  # Default to empty string if 'message' not found
+
+    payload = {"text": text_to_send}
+    try:
+        response = (transport or get_transport()).post(webhook_url, json=payload, timeout=timeout)
+        if response.status_code == 200:
+            return "Success!"
+        else:
+            return f"Failed with status code: {response.status_code}"
+    except Exception as e:
+        return f"Exception occurred: {str(e)}"
+
+
+# The controller's VisionModule, whose latest snapshot description the assistant can attach
+vision_module = None
+
+
+def set_vision_module(module):
+    global vision_module
+    vision_module = module
+
+
+@default_registry.register(
+    "send_image_description",
+    MESSAGE_PARAMETERS,
+    description="Attach the description of the last snapshot to a message.",
+    timeout=5.0
+)
+def retrieve_image_description(arguments):
+    # Parse the arguments as JSON if it's a string
+    if isinstance(arguments, str):
+        arguments = json.loads(arguments)
+
+    # Access the 'message' key
+    message = arguments.get('message', '')
+
+    if vision_module is None:
+        return "Failure: no camera is available"
+    image_description = vision_module.get_stored_image_description()
+    if image_description is None:
+        return "Failure: no snapshot has been described yet"
+
+    # Append the image description to the message
+    message += "\n\nImage Description: " + image_description
+
+    # Return the updated message
+    return message
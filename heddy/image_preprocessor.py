@@ -0,0 +1,92 @@
+import base64
+import json
+from dataclasses import dataclass
+
+import cv2
+
+# Raw bytes per base64 chunk; a multiple of 3 so chunks concatenate without padding
+BASE64_CHUNK_SIZE = 3 * 16 * 1024
+
+FORMATS = {
+    "jpeg": (".jpg", "image/jpeg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", "image/webp", cv2.IMWRITE_WEBP_QUALITY),
+    "png": (".png", "image/png", None),
+}
+
+
+@dataclass
+class EncodedImage:
+    data: bytes
+    mime_type: str
+    width: int
+    height: int
+
+
+class ImagePreprocessor:
+    """Downscales captured frames and re-encodes them in a compact format before upload."""
+
+    def __init__(self, max_width=1024, max_height=1024, image_format="jpeg", quality=80):
+        if image_format not in FORMATS:
+            raise ValueError(f"Unsupported image format: {image_format}")
+        self.max_width = max_width
+        self.max_height = max_height
+        self.image_format = image_format
+        self.quality = quality
+
+    def process(self, image) -> EncodedImage:
+        """Resizes a BGR image to fit the target box and encodes it."""
+        height, width = image.shape[:2]
+        scale = min(self.max_width / width, self.max_height / height, 1.0)
+        if scale < 1.0:
+            width, height = int(width * scale), int(height * scale)
+            # INTER_AREA gives the cleanest result when shrinking
+            image = cv2.resize(image, (width, height), interpolation=cv2.INTER_AREA)
+        extension, mime_type, quality_flag = FORMATS[self.image_format]
+        params = [quality_flag, self.quality] if quality_flag is not None else []
+        ok, encoded = cv2.imencode(extension, image, params)
+        if not ok:
+            raise RuntimeError(f"Failed to encode image as {self.image_format}")
+        return EncodedImage(encoded.tobytes(), mime_type, width, height)
+
+    def process_file(self, path) -> EncodedImage:
+        image = cv2.imread(path)
+        if image is None:
+            raise RuntimeError(f"Failed to read image: {path}")
+        return self.process(image)
+
+
+def iter_base64(data, chunk_size=BASE64_CHUNK_SIZE):
+    """Yields the base64 encoding of data in chunks instead of building one large string."""
+    view = memoryview(data)
+    for start in range(0, len(view), chunk_size):
+        yield base64.b64encode(view[start:start + chunk_size])
+
+
+def base64_length(size):
+    return 4 * ((size + 2) // 3)
+
+
+class Base64JSONBody:
+    """Request body that streams a JSON payload with an embedded base64 image.
+
+    The payload is serialized with a placeholder where the image goes, and the
+    image is base64-encoded chunk by chunk while the body is being sent, so
+    neither the full base64 string nor the full JSON document is ever built.
+    Its length is known up front, so it is sent with a Content-Length header.
+    """
+
+    PLACEHOLDER = "__HEDDY_IMAGE_DATA__"
+
+    def __init__(self, payload, image_data):
+        prefix, suffix = json.dumps(payload).split(self.PLACEHOLDER)
+        self.prefix = prefix.encode("utf-8")
+        self.suffix = suffix.encode("utf-8")
+        self.image_data = image_data
+
+    def __len__(self):
+        return len(self.prefix) + base64_length(len(self.image_data)) + len(self.suffix)
+
+    def __iter__(self):
+        yield self.prefix
+        yield from iter_base64(self.image_data)
+        yield self.suffix
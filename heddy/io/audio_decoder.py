@@ -0,0 +1,60 @@
+import re
+
+
+def parse_output_format(output_format):
+    """Splits a provider output format such as ``pcm_24000`` or ``mp3_44100_128`` into (codec, sample rate)."""
+    match = re.match(r"([a-z0-9]+)_(\d+)", output_format or "")
+    if match is None:
+        return output_format, None
+    return match.group(1), int(match.group(2))
+
+
+def decoder_available():
+    """Whether compressed audio can be decoded in-process (requires the optional miniaudio package)."""
+    try:
+        import miniaudio  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def decode_stream(chunks, sample_rate, channels=1, codec="mp3", frames_to_read=1024):
+    """Decodes an iterator of compressed audio chunks into 16-bit PCM chunks while it downloads.
+
+    The decoder pulls from ``chunks`` only as fast as it needs data, so the
+    first samples are available after the first few compressed frames
+    instead of after the whole clip.
+    """
+    import miniaudio
+
+    class ChunkSource(miniaudio.StreamableSource):
+        def __init__(self):
+            self.chunks = iter(chunks)
+            self.pending = b""
+
+        def read(self, num_bytes):
+            while len(self.pending) < num_bytes:
+                chunk = next(self.chunks, None)
+                if chunk is None:
+                    break
+                self.pending += chunk
+            data, self.pending = self.pending[:num_bytes], self.pending[num_bytes:]
+            return data
+
+    source_format = {
+        "mp3": miniaudio.FileFormat.MP3,
+        "wav": miniaudio.FileFormat.WAV,
+        "flac": miniaudio.FileFormat.FLAC,
+        "vorbis": miniaudio.FileFormat.VORBIS,
+    }.get(codec, miniaudio.FileFormat.UNKNOWN)
+    stream = miniaudio.stream_any(
+        ChunkSource(),
+        source_format=source_format,
+        output_format=miniaudio.SampleFormat.SIGNED16,
+        nchannels=channels,
+        sample_rate=sample_rate,
+        frames_to_read=frames_to_read
+    )
+    for samples in stream:
+        if len(samples):
+            yield samples.tobytes()
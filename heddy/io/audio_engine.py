@@ -0,0 +1,283 @@
+import threading
+import time
+import wave
+from collections import deque
+
+import numpy as np
+
+from heddy.io.audio_recorder import SuppressStderr
+
+
+def resample(samples, source_rate, target_rate):
+    """Linearly resamples a (frames, channels) float32 array to target_rate."""
+    if source_rate == target_rate or len(samples) == 0:
+        return samples
+    target_length = int(round(len(samples) * target_rate / source_rate))
+    source_positions = np.arange(len(samples), dtype=np.float64)
+    target_positions = np.linspace(0, len(samples) - 1, target_length)
+    return np.stack(
+        [np.interp(target_positions, source_positions, samples[:, channel]) for channel in range(samples.shape[1])],
+        axis=1
+    ).astype(np.float32)
+
+
+class StreamingResampler:
+    """Linear resampler for audio arriving in chunks.
+
+    Resampling each chunk on its own restarts the interpolation grid at every
+    chunk boundary, which repeats or skips a sample there and drifts the
+    output rate. This keeps the last input frame and the output position
+    between chunks, so the output is the same as resampling the whole stream
+    at once.
+    """
+
+    def __init__(self, source_rate, target_rate):
+        self.source_rate = source_rate
+        self.target_rate = target_rate
+        self.previous = None
+        # Input frames before self.previous, and output frames produced so far
+        self.consumed = 0
+        self.produced = 0
+
+    def process(self, samples):
+        """Resamples the next (frames, channels) float32 chunk."""
+        if self.source_rate == self.target_rate or len(samples) == 0:
+            return samples
+        if self.previous is not None:
+            samples = np.concatenate([self.previous, samples])
+        last = self.consumed + len(samples) - 1
+        # Output frame k sits at input position k * source_rate / target_rate
+        count = max(0, last * self.target_rate // self.source_rate + 1 - self.produced)
+        positions = np.arange(self.produced, self.produced + count, dtype=np.float64) \
+            * self.source_rate / self.target_rate - self.consumed
+        source_positions = np.arange(len(samples), dtype=np.float64)
+        output = np.stack(
+            [np.interp(positions, source_positions, samples[:, channel]) for channel in range(samples.shape[1])],
+            axis=1
+        ).astype(np.float32)
+        self.produced += count
+        self.consumed = last
+        self.previous = samples[-1:]
+        return output
+
+
+def to_float_frames(pcm, channels, sample_width=2):
+    """Converts interleaved integer PCM into a (frames, channels) float32 array in [-1, 1]."""
+    if sample_width == 1:
+        samples = (np.frombuffer(pcm, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif sample_width == 2:
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768
+    elif sample_width == 4:
+        samples = np.frombuffer(pcm, dtype=np.int32).astype(np.float32) / 2147483648
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width}")
+    return samples[:len(samples) - len(samples) % channels].reshape(-1, channels)
+
+
+class Voice:
+    """A sound being played by the engine. Fixed voices hold all their samples up front;
+    open voices are fed incrementally with ``write`` until ``close`` is called."""
+
+    def __init__(self, samples=None):
+        self.lock = threading.Lock()
+        # Carries the interpolation state between the chunks written to an open voice
+        self.resampler = None
+        self.chunks = [samples] if samples is not None else []
+        self.offset = 0
+        self.closed = samples is not None
+        self.stopped = False
+        self.done = threading.Event()
+
+    def write(self, samples):
+        with self.lock:
+            self.chunks.append(samples)
+
+    def close(self):
+        self.closed = True
+
+    def stop(self):
+        self.stopped = True
+
+    def wait(self, timeout=None):
+        return self.done.wait(timeout)
+
+    def read_into(self, mix):
+        """Adds up to len(mix) frames to the mix buffer. Returns False once the voice has finished."""
+        if self.stopped:
+            self.done.set()
+            return False
+        written = 0
+        with self.lock:
+            while written < len(mix) and self.chunks:
+                chunk = self.chunks[0]
+                count = min(len(mix) - written, len(chunk) - self.offset)
+                mix[written:written + count] += chunk[self.offset:self.offset + count]
+                written += count
+                self.offset += count
+                if self.offset == len(chunk):
+                    self.chunks.pop(0)
+                    self.offset = 0
+            finished = self.closed and not self.chunks
+        if finished:
+            self.done.set()
+            return False
+        return True
+
+
+class AudioOutputEngine:
+    """Single always-open output stream that mixes sound effects and speech.
+
+    Effects are decoded and resampled to the device rate once at startup. A
+    dedicated thread mixes all active voices with NumPy and writes the result
+    to the stream, so callers never wait on device setup or on playback.
+    """
+
+    def __init__(self, rate=None, channels=2, frames_per_buffer=512):
+        self.pyaudio_instance = None
+        if rate is None:
+            rate = int(self._pyaudio().get_default_output_device_info()["defaultSampleRate"])
+        self.rate = rate
+        self.channels = channels
+        self.frames_per_buffer = frames_per_buffer
+        self.effects = {}
+        self.voices = []
+        self.condition = threading.Condition()
+        self.running = False
+        self.thread = None
+        self.stream = None
+        # Set while no voice is playing; used to measure how fast stop_all() takes effect
+        self.silent = threading.Event()
+        self.silent.set()
+        # (time, level in dB) of recently mixed buffers, the reference for echo gating
+        self.output_levels = deque(maxlen=256)
+        self.output_latency = 0.0
+
+    def _pyaudio(self):
+        import pyaudio
+
+        if self.pyaudio_instance is None:
+            with SuppressStderr():
+                self.pyaudio_instance = pyaudio.PyAudio()
+        return self.pyaudio_instance
+
+    def _open_stream(self):
+        import pyaudio
+
+        with SuppressStderr():
+            return self._pyaudio().open(format=pyaudio.paInt16,
+                                        channels=self.channels,
+                                        rate=self.rate,
+                                        output=True,
+                                        frames_per_buffer=self.frames_per_buffer)
+
+    def load_effect(self, file_path):
+        """Decodes a WAV file into device-rate PCM and keeps it for instant playback."""
+        with wave.open(file_path, 'rb') as wf:
+            samples = to_float_frames(wf.readframes(wf.getnframes()), wf.getnchannels(), wf.getsampwidth())
+            self.effects[file_path] = self._convert(samples, wf.getframerate())
+
+    def preload(self, file_paths):
+        for file_path in file_paths:
+            self.load_effect(file_path)
+
+    def _convert(self, samples, rate, resampler=None):
+        if samples.shape[1] != self.channels:
+            # Downmix to mono, then spread to the device channel count
+            samples = np.repeat(samples.mean(axis=1, keepdims=True), self.channels, axis=1)
+        if resampler is not None:
+            return resampler.process(samples)
+        return resample(samples, rate, self.rate)
+
+    def start(self):
+        if self.running:
+            return
+        self.stream = self._open_stream()
+        get_output_latency = getattr(self.stream, "get_output_latency", None)
+        if get_output_latency is not None:
+            self.output_latency = get_output_latency()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _add_voice(self, voice):
+        with self.condition:
+            self.silent.clear()
+            self.voices.append(voice)
+            self.condition.notify()
+        return voice
+
+    def play_effect(self, file_path, block=False):
+        """Starts a preloaded effect (loading it on first use) and returns its Voice."""
+        if file_path not in self.effects:
+            self.load_effect(file_path)
+        voice = self._add_voice(Voice(self.effects[file_path]))
+        if block:
+            voice.wait()
+        return voice
+
+    def play_pcm(self, pcm, rate, channels=1, sample_width=2, block=False):
+        """Plays a complete block of interleaved integer PCM."""
+        voice = self._add_voice(Voice(self._convert(to_float_frames(pcm, channels, sample_width), rate)))
+        if block:
+            voice.wait()
+        return voice
+
+    def open_voice(self):
+        """Returns an open Voice to be fed with ``write_pcm`` as audio arrives."""
+        return self._add_voice(Voice())
+
+    def write_pcm(self, voice, pcm, rate, channels=1, sample_width=2):
+        """Appends a chunk of interleaved integer PCM to an open voice, resampling it as one stream."""
+        if voice.resampler is None or voice.resampler.source_rate != rate:
+            voice.resampler = StreamingResampler(rate, self.rate)
+        voice.write(self._convert(to_float_frames(pcm, channels, sample_width), rate, voice.resampler))
+
+    def stop_all(self):
+        with self.condition:
+            for voice in self.voices:
+                voice.stop()
+
+    def is_active(self):
+        with self.condition:
+            return bool(self.voices)
+
+    def wait_until_silent(self, timeout=None):
+        """Blocks until the mixer has written its last buffer containing a voice."""
+        return self.silent.wait(timeout)
+
+    def output_level(self, window=0.25):
+        """Returns the loudest level in dB mixed during the last ``window`` seconds, or None if silent."""
+        since = time.perf_counter() - window
+        levels = [level for timestamp, level in list(self.output_levels) if timestamp >= since]
+        return max(levels) if levels else None
+
+    def _run(self):
+        mix = np.zeros((self.frames_per_buffer, self.channels), dtype=np.float32)
+        while self.running:
+            with self.condition:
+                while self.running and not self.voices:
+                    self.silent.set()
+                    self.condition.wait()
+                voices = list(self.voices)
+            mix.fill(0)
+            finished = [voice for voice in voices if not voice.read_into(mix)]
+            np.clip(mix, -1.0, 1.0, out=mix)
+            self.output_levels.append((time.perf_counter(), 10 * np.log10(np.mean(mix * mix) + 1e-10)))
+            self.stream.write((mix * 32767).astype(np.int16).tobytes())
+            if finished:
+                with self.condition:
+                    self.voices = [voice for voice in self.voices if voice not in finished]
+                    if not self.voices:
+                        self.silent.set()
+
+    def close(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+        if self.pyaudio_instance is not None:
+            self.pyaudio_instance.terminate()
@@ -1,8 +1,8 @@
 import os
 import sys
-import pyaudio
-import wave
 import threading
+from functools import partial
+from heddy.io.pcm_buffer import PCMBuffer
 
 # Context manager to suppress stderr
 class SuppressStderr:
@@ -15,63 +15,107 @@ class SuppressStderr:
         sys.stderr = self.original_stderr
 
 class AudioRecorder:
-    def __init__(self, output_filename="recorded_audio.wav"):
+    def __init__(self, output_filename=None, rate=16000, frames_per_buffer=1024, hub=None):
+        # The recording stays in memory; it is only written to disk when a filename is given
         self.output_filename = output_filename
+        # With a MicrophoneHub the recorder subscribes to the shared capture
+        # (including its pre-roll) instead of opening its own input stream
+        self.hub = hub
+        self.rate = rate
+        self.frames_per_buffer = frames_per_buffer
         self.is_recording = False
-        self.frames = []
+        # A new buffer per recording: the previous one may still be uploading or being read
+        self.audio = PCMBuffer(sample_rate=rate)
+        self.hub_listener = None
         self.thread = None
         self.pyaudio_instance = None
         self.stream = None
+        # Callbacks receiving every captured frame while recording is in progress,
+        # and those only receiving frames captured after it started (no pre-roll)
+        self.frame_listeners = []
+        self.live_frame_listeners = []
 
-    def _record_audio(self):
+    def _record_audio(self, audio):
         """Internal method to handle the audio recording."""
+        import pyaudio
+
         # Suppress ALSA warnings during PyAudio initialization
         with SuppressStderr():
             self.pyaudio_instance = pyaudio.PyAudio()
             self.stream = self.pyaudio_instance.open(format=pyaudio.paInt16,
                                                      channels=1,
-                                                     rate=16000,
+                                                     rate=self.rate,
                                                      input=True,
-                                                     frames_per_buffer=1024)
+                                                     frames_per_buffer=self.frames_per_buffer)
         while self.is_recording:
-            data = self.stream.read(1024, exception_on_overflow=False)
-            self.frames.append(data)
+            data = self.stream.read(self.frames_per_buffer, exception_on_overflow=False)
+            audio.append(data)
+            for listener in self.frame_listeners:
+                listener(data)
+            for listener in self.live_frame_listeners:
+                listener(data)
 
         # Stop and close the stream properly
         self.stream.stop_stream()
         self.stream.close()
         self.pyaudio_instance.terminate()
 
-        # Save the recording to a WAV file
-        with wave.open(self.output_filename, 'wb') as wf:
-            wf.setnchannels(1)
-            wf.setsampwidth(self.pyaudio_instance.get_sample_size(pyaudio.paInt16))
-            wf.setframerate(16000)
-            wf.writeframes(b''.join(self.frames))
+        if self.output_filename:
+            audio.save(self.output_filename)
+
+    def _on_hub_frame(self, audio, live, data):
+        audio.append(data)
+        for listener in self.frame_listeners:
+            listener(data)
+        if live:
+            for listener in self.live_frame_listeners:
+                listener(data)
 
-    def start_recording(self):
-        """Starts the audio recording."""
+    def start_recording(self, on_frame=None, preroll_before=None, on_live_frame=None):
+        """Starts the audio recording, optionally passing each captured frame to on_frame.
+
+        With a hub, the recording starts with its pre-roll, limited to audio
+        captured before ``preroll_before`` when given. ``on_live_frame`` only
+        receives frames captured after the recording started.
+        """
         if not self.is_recording:
             self.is_recording = True
-            self.frames = []
-            self.thread = threading.Thread(target=self._record_audio)
-            self.thread.start()
+            self.audio = audio = PCMBuffer(sample_rate=self.rate)
+            self.frame_listeners = [on_frame] if on_frame is not None else []
+            self.live_frame_listeners = [on_live_frame] if on_live_frame is not None else []
+            if self.hub is not None:
+                self.hub_listener = partial(self._on_hub_frame, audio, True)
+                self.hub.subscribe(self.hub_listener, preroll=True, preroll_before=preroll_before,
+                                   on_preroll=partial(self._on_hub_frame, audio, False))
+            else:
+                self.thread = threading.Thread(target=self._record_audio, args=(audio,))
+                self.thread.start()
             print("Recording started...")
 
     def stop_recording(self):
         """Stops the audio recording."""
         if self.is_recording:
             self.is_recording = False
-            self.thread.join()  # Wait for the recording thread to finish
+            if self.hub is not None:
+                self.hub.unsubscribe(self.hub_listener)
+                self.hub_listener = None
+                if self.output_filename:
+                    self.audio.save(self.output_filename)
+            else:
+                self.thread.join()  # Wait for the recording thread to finish
             print("Recording stopped.")
 
 # Global instance to be used outside this script
 recorder = AudioRecorder()
 
-def start_recording():
+def start_recording(on_frame=None, preroll_before=None, on_live_frame=None):
     """Function to start recording, intended to be called from elsewhere."""
-    recorder.start_recording()
+    recorder.start_recording(on_frame=on_frame, preroll_before=preroll_before, on_live_frame=on_live_frame)
 
 def stop_recording():
     """Function to stop recording, intended to be called from elsewhere."""
     recorder.stop_recording()
+
+def get_recorded_audio():
+    """Returns the last recording as an in-memory PCMBuffer."""
+    return recorder.audio
@@ -0,0 +1,176 @@
+import glob
+import threading
+import time
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+
+from heddy.metrics import metrics
+
+
+@dataclass
+class Frame:
+    image: np.ndarray
+    captured_at: float
+    sequence: int
+
+
+class FrameSource:
+    """Interface for anything that produces BGR frames for the FrameGrabber."""
+
+    def open(self):
+        pass
+
+    def read(self):
+        """Blocks until the next frame is available and returns it, or None on failure."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class V4L2FrameSource(FrameSource):
+    """Reads frames from a V4L2 camera device, keeping it open between snapshots."""
+
+    def __init__(self, device="/dev/video0", width=1280, height=720):
+        self.device = device
+        self.width = width
+        self.height = height
+        self.capture = None
+
+    def open(self):
+        self.capture = cv2.VideoCapture(self.device, cv2.CAP_V4L2)
+        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        # Keep the driver queue short so the newest frame is never stale
+        self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        if not self.capture.isOpened():
+            raise RuntimeError(f"Failed to open camera {self.device}")
+
+    def read(self):
+        ok, image = self.capture.read()
+        return image if ok else None
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
+            self.capture = None
+
+
+class FileFrameSource(FrameSource):
+    """Cycles through image files at a fixed frame rate, for machines without a camera."""
+
+    def __init__(self, pattern, fps=15):
+        self.paths = sorted(glob.glob(pattern))
+        self.interval = 1.0 / fps
+        self.images = []
+        self.index = 0
+
+    def open(self):
+        self.images = [image for image in (cv2.imread(path) for path in self.paths) if image is not None]
+        if not self.images:
+            raise RuntimeError("No readable images for the file frame source")
+
+    def read(self):
+        time.sleep(self.interval)
+        image = self.images[self.index % len(self.images)]
+        self.index += 1
+        return image
+
+
+class SyntheticFrameSource(FrameSource):
+    """Generates moving test-pattern frames at a fixed frame rate."""
+
+    def __init__(self, width=1280, height=720, fps=15):
+        self.width = width
+        self.height = height
+        self.interval = 1.0 / fps
+        self.index = 0
+        self.pattern = None
+
+    def open(self):
+        x = np.linspace(0, 255, self.width, dtype=np.float32)
+        y = np.linspace(0, 255, self.height, dtype=np.float32)
+        self.pattern = np.stack([
+            np.broadcast_to(x, (self.height, self.width)),
+            np.broadcast_to(y[:, None], (self.height, self.width)),
+            np.full((self.height, self.width), 128, dtype=np.float32),
+        ], axis=2)
+
+    def read(self):
+        time.sleep(self.interval)
+        self.index += 1
+        return ((self.pattern + self.index * 4) % 256).astype(np.uint8)
+
+
+class FrameGrabber:
+    """Keeps a frame source open on a background thread and holds the most recent frame.
+
+    Taking a snapshot is then an in-memory copy rather than a device open,
+    exposure settle and file round trip.
+    """
+
+    def __init__(self, source: FrameSource):
+        self.source = source
+        self.lock = threading.Lock()
+        self.first_frame = threading.Event()
+        self.latest = None
+        self.sequence = 0
+        self.running = False
+        self.thread = None
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            self.source.open()
+        except Exception as e:
+            print(f"Failed to open frame source: {e}")
+            self.running = False
+            self.first_frame.set()
+            return
+        while self.running:
+            image = self.source.read()
+            if image is None:
+                time.sleep(0.01)
+                continue
+            with self.lock:
+                self.sequence += 1
+                self.latest = Frame(image, time.perf_counter(), self.sequence)
+            self.first_frame.set()
+        self.source.close()
+
+    def snapshot(self, timeout=5.0):
+        """Returns a copy of the most recent frame, or None if no frame arrived in time."""
+        started_at = time.perf_counter()
+        if not self.first_frame.wait(timeout):
+            return None
+        with self.lock:
+            latest = self.latest
+        if latest is None:
+            return None
+        frame = Frame(latest.image.copy(), latest.captured_at, latest.sequence)
+        finished_at = time.perf_counter()
+        metrics.record_timing("camera.snapshot_latency", finished_at - started_at)
+        metrics.record_timing("camera.frame_age", finished_at - frame.captured_at)
+        return frame
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+
+
+def create_frame_source(spec, device="/dev/video0"):
+    """Builds a frame source from a config value: "v4l2", "synthetic" or an image glob."""
+    if spec == "v4l2":
+        return V4L2FrameSource(device)
+    if spec == "synthetic":
+        return SyntheticFrameSource()
+    return FileFrameSource(spec)
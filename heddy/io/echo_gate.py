@@ -0,0 +1,38 @@
+import numpy as np
+
+
+class EchoGate:
+    """Keeps our own speech, picked up by the microphone, away from the keyword spotter.
+
+    While the output engine is playing, a microphone frame is passed on only
+    if its energy is ``margin_db`` above the echo expected from the playback
+    level: the loudest level the engine mixed during the last ``window``
+    seconds plus the learned speaker-to-microphone coupling. Other frames
+    are replaced with silence of the same length, so the spotter's timing
+    is unchanged. The coupling starts at a conservative ``coupling_db`` and
+    tracks frames that were gated. This is a gate, not an echo canceller:
+    the wake word has to be said louder than the device is speaking.
+    """
+
+    def __init__(self, output_engine, margin_db=10.0, coupling_db=6.0, adaptation=0.1, window=0.25):
+        self.output_engine = output_engine
+        self.margin_db = margin_db
+        self.coupling_db = coupling_db
+        self.adaptation = adaptation
+        self.window = window
+        self.passed = 0
+        self.gated = 0
+
+    def filter(self, pcm):
+        """Returns ``pcm`` if it may contain the user's voice, otherwise silence."""
+        output_db = self.output_engine.output_level(self.window)
+        if output_db is None:
+            return pcm
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768
+        input_db = 10 * np.log10(np.mean(samples * samples) + 1e-10)
+        if input_db > output_db + self.coupling_db + self.margin_db:
+            self.passed += 1
+            return pcm
+        self.gated += 1
+        self.coupling_db += self.adaptation * (input_db - output_db - self.coupling_db)
+        return bytes(len(pcm))
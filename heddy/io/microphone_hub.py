@@ -0,0 +1,172 @@
+import itertools
+import math
+import threading
+import time
+from collections import deque
+from queue import Queue, Empty, Full
+
+from heddy.io.audio_recorder import SuppressStderr
+
+
+class Subscriber:
+    """A frame callback; frames published while its pre-roll is replayed wait in ``backlog``."""
+
+    __slots__ = ("callback", "backlog")
+
+    def __init__(self, callback, backlog=None):
+        self.callback = callback
+        self.backlog = backlog
+
+
+class MicrophoneHub:
+    """Single always-on microphone capture shared by every audio consumer.
+
+    One input stream is opened for the lifetime of the process. Each captured
+    frame of 16-bit mono PCM is passed to all subscribers on the capture thread
+    and kept in a short pre-roll ring buffer, so a new subscriber such as the
+    recorder can start with audio from just before it was triggered.
+    Pre-roll frames are timestamped, so a subscriber can leave out audio
+    captured after some point, e.g. our own start-recording chime.
+    Subscriber callbacks must return quickly; slow consumers should use
+    ``subscribe_queue``. The hub's lock is never held while a callback runs.
+    """
+
+    def __init__(self, rate=16000, frames_per_buffer=1024, preroll_seconds=0.5, device_index=None):
+        self.rate = rate
+        self.frames_per_buffer = frames_per_buffer
+        self.device_index = device_index
+        # (time.monotonic() when captured, frame)
+        self.preroll = deque(maxlen=max(1, math.ceil(preroll_seconds * rate / frames_per_buffer)))
+        self.subscribers = []
+        self.lock = threading.Lock()
+        # Deliveries in progress, delivery id -> delivering thread, so unsubscribe can wait for them
+        self.delivered = threading.Condition(self.lock)
+        self.in_flight = {}
+        self.deliveries = itertools.count(1)
+        self.running = False
+        self.thread = None
+        self.pyaudio_instance = None
+        self.stream = None
+
+    def start(self):
+        if self.running:
+            return
+        import pyaudio
+
+        # Suppress ALSA warnings during PyAudio initialization
+        with SuppressStderr():
+            self.pyaudio_instance = pyaudio.PyAudio()
+            self.stream = self.pyaudio_instance.open(format=pyaudio.paInt16,
+                                                     channels=1,
+                                                     rate=self.rate,
+                                                     input=True,
+                                                     input_device_index=self.device_index,
+                                                     frames_per_buffer=self.frames_per_buffer)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while self.running:
+            self.publish(self.stream.read(self.frames_per_buffer, exception_on_overflow=False))
+
+    def publish(self, data):
+        """Delivers one captured frame to the pre-roll buffer and every subscriber."""
+        with self.lock:
+            self.preroll.append((time.monotonic(), data))
+            callbacks = []
+            for subscriber in self.subscribers:
+                if subscriber.backlog is not None:
+                    subscriber.backlog.append(data)
+                else:
+                    callbacks.append(subscriber.callback)
+            delivery = next(self.deliveries)
+            self.in_flight[delivery] = threading.get_ident()
+        try:
+            for callback in callbacks:
+                self._deliver(callback, data)
+        finally:
+            with self.lock:
+                del self.in_flight[delivery]
+                self.delivered.notify_all()
+
+    @staticmethod
+    def _deliver(callback, data):
+        try:
+            callback(data)
+        except Exception as e:
+            print(f"Microphone subscriber failed: {e}")
+
+    def subscribe(self, callback, preroll=False, preroll_before=None, on_preroll=None):
+        """Registers a frame callback, first replaying the pre-roll buffer if requested.
+
+        With ``preroll_before`` (a ``time.monotonic()`` timestamp) only pre-roll
+        frames captured before that moment are replayed. Replayed frames go to
+        ``on_preroll`` instead of ``callback`` when given. The replay runs on
+        the calling thread without blocking capture; frames captured meanwhile
+        are queued and delivered right after it, so none is lost or repeated.
+        """
+        if not preroll:
+            with self.lock:
+                self.subscribers.append(Subscriber(callback))
+            return callback
+
+        subscriber = Subscriber(callback, backlog=[])
+        with self.lock:
+            frames = [data for captured_at, data in self.preroll
+                      if preroll_before is None or captured_at < preroll_before]
+            self.subscribers.append(subscriber)
+        for data in frames:
+            self._deliver(on_preroll or callback, data)
+        while True:
+            with self.lock:
+                frames, subscriber.backlog = subscriber.backlog, []
+                if not frames:
+                    # Caught up: the capture thread delivers from the next frame on
+                    subscriber.backlog = None
+                    return callback
+            for data in frames:
+                self._deliver(callback, data)
+
+    def subscribe_queue(self, maxsize=64):
+        """Returns a queue receiving every frame; the oldest frames are dropped if it fills up."""
+        frames = Queue(maxsize=maxsize)
+
+        def enqueue(data):
+            while True:
+                try:
+                    frames.put_nowait(data)
+                    return
+                except Full:
+                    pass
+                try:
+                    frames.get_nowait()
+                except Empty:
+                    # The consumer made room in the meantime
+                    pass
+
+        self.subscribe(enqueue)
+        return frames
+
+    def unsubscribe(self, callback):
+        """Removes a callback; once this returns, the callback receives no more frames.
+
+        Waits for a frame being delivered by another thread to finish. Called
+        from inside a callback, it does not wait for that delivery.
+        """
+        with self.lock:
+            self.subscribers = [subscriber for subscriber in self.subscribers if subscriber.callback != callback]
+            me = threading.get_ident()
+            pending = {delivery for delivery, thread in self.in_flight.items() if thread != me}
+            while pending & self.in_flight.keys():
+                self.delivered.wait()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join()
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+        if self.pyaudio_instance is not None:
+            self.pyaudio_instance.terminate()
@@ -0,0 +1,91 @@
+import io
+import struct
+
+
+class PCMBuffer:
+    """Growable, preallocated buffer holding raw PCM audio in memory.
+
+    Frames are copied into a single ``bytearray`` that doubles in size when
+    full, so recording does not keep one object per read and never needs a
+    join at the end. The captured audio is exposed as a zero-copy ``memoryview``.
+    """
+
+    def __init__(self, sample_rate=16000, sample_width=2, channels=1, initial_seconds=30):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.channels = channels
+        self.buffer = bytearray(int(initial_seconds * sample_rate * sample_width * channels))
+        self.length = 0
+
+    def append(self, data):
+        """Copies a chunk of PCM data to the end of the buffer."""
+        end = self.length + len(data)
+        if end > len(self.buffer):
+            self._grow(end)
+        self.buffer[self.length:end] = data
+        self.length = end
+
+    def _grow(self, required):
+        capacity = max(len(self.buffer) * 2, required)
+        # Allocate a new buffer instead of resizing in place, which would fail
+        # while a memoryview of the previous recording is still alive
+        grown = bytearray(capacity)
+        grown[:self.length] = memoryview(self.buffer)[:self.length]
+        self.buffer = grown
+
+    def clear(self):
+        self.length = 0
+
+    def view(self):
+        """Returns a memoryview over the captured PCM without copying it."""
+        return memoryview(self.buffer)[:self.length]
+
+    def duration(self):
+        return self.length / (self.sample_rate * self.sample_width * self.channels)
+
+    def wav_header(self):
+        byte_rate = self.sample_rate * self.channels * self.sample_width
+        return struct.pack(
+            "<4sI4s4sIHHIIHH4sI",
+            b"RIFF", 36 + self.length, b"WAVE",
+            b"fmt ", 16, 1, self.channels, self.sample_rate, byte_rate,
+            self.channels * self.sample_width, self.sample_width * 8,
+            b"data", self.length
+        )
+
+    def as_wav_file(self):
+        """Returns a readable file-like object yielding the buffer as a WAV file."""
+        return WavReader(self.wav_header(), self.view())
+
+    def save(self, path):
+        with open(path, "wb") as wav_file:
+            wav_file.write(self.wav_header())
+            wav_file.write(self.view())
+
+    def __len__(self):
+        return self.length
+
+
+class WavReader(io.RawIOBase):
+    """Read-only stream over a WAV header followed by a PCM memoryview, without concatenating them."""
+
+    def __init__(self, header, pcm):
+        self.parts = [memoryview(header), pcm]
+        self.part = 0
+        self.offset = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, target):
+        written = 0
+        while written < len(target) and self.part < len(self.parts):
+            source = self.parts[self.part]
+            count = min(len(target) - written, len(source) - self.offset)
+            target[written:written + count] = source[self.offset:self.offset + count]
+            written += count
+            self.offset += count
+            if self.offset == len(source):
+                self.part += 1
+                self.offset = 0
+        return written
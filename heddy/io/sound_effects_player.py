@@ -1,21 +1,38 @@
-import pyaudio
 import wave
-from elevenlabs import play
 
+from heddy.io.audio_decoder import parse_output_format, decoder_available, decode_stream
 from heddy.application_event import ApplicationEvent, ApplicationEventType, ProcessingStatus
 
 class AudioPlayer:
-    def __init__(self):
+    def __init__(self, output_engine=None, audio_format=None):
         """Initializes the sound effects player."""
-        self.pyaudio_instance = pyaudio.PyAudio()
+        # Only opened when an effect is played without an output engine
+        self.pyaudio_instance = None
+        # When an output engine is set, effects are mixed into its always-open stream
+        self.output_engine = output_engine
+        # Format of the synthesized audio (e.g. "pcm_24000" or "mp3_44100_128").
+        # With an output engine, PCM is written straight into its stream and
+        # compressed audio is decoded in-process when miniaudio is installed
+        self.audio_format = audio_format
+        self.in_process_decoding = decoder_available()
 
-    def play_sound(self, file_path):
+    def play_sound(self, file_path, block=False):
         """
         Play a sound effect from the specified file path.
 
         Args:
         file_path (str): The path to the wave file to play.
+        block (bool): Wait for the effect to finish. Without an output engine
+        playback always blocks.
         """
+        if self.output_engine is not None:
+            return self.output_engine.play_effect(file_path, block=block)
+
+        if self.pyaudio_instance is None:
+            import pyaudio
+
+            self.pyaudio_instance = pyaudio.PyAudio()
+
         # Open the wave file
         wf = wave.open(file_path, 'rb')
 
@@ -35,8 +52,72 @@ class AudioPlayer:
         stream.stop_stream()
         stream.close()
     
+    def play_audio(self, audio):
+        """
+        Play synthesized audio.
+
+        Args:
+        audio (bytes | Iterator[bytes]): A complete audio blob, or an iterator of
+        chunks which starts playing as soon as the first chunk arrives.
+        """
+        if self.output_engine is not None and self.audio_format is not None:
+            codec, rate = parse_output_format(self.audio_format)
+            chunks = [audio] if isinstance(audio, (bytes, bytearray)) else audio
+            if codec == "pcm":
+                pcm = chunks
+            elif self.in_process_decoding:
+                rate = self.output_engine.rate
+                pcm = decode_stream(chunks, rate, codec=codec)
+            else:
+                pcm = None
+            if pcm is not None:
+                try:
+                    return self.play_pcm_stream(pcm, rate)
+                finally:
+                    # Abort the rest of the download if playback was stopped early
+                    close = getattr(audio, "close", None)
+                    if close is not None:
+                        close()
+
+        # Fall back to an external player process per clip
+        from elevenlabs import play, stream as play_stream
+
+        if isinstance(audio, (bytes, bytearray)):
+            play(audio)
+        else:
+            play_stream(audio)
+
+    def play_pcm_stream(self, chunks, rate):
+        """Writes 16-bit mono PCM chunks into an output engine voice and waits until they have played."""
+        voice = self.output_engine.open_voice()
+        remainder = b""
+        try:
+            for chunk in chunks:
+                if voice.stopped:
+                    break
+                # Network chunks can split a sample in half
+                chunk = remainder + chunk
+                remainder = chunk[len(chunk) - len(chunk) % 2:]
+                if len(chunk) > len(remainder):
+                    self.output_engine.write_pcm(voice, chunk[:len(chunk) - len(remainder)], rate)
+        finally:
+            voice.close()
+        voice.wait()
+        return voice
+
+    def stop(self):
+        """Stops everything playing through the output engine, e.g. when the user barges in."""
+        if self.output_engine is not None:
+            self.output_engine.stop_all()
+
+    def wait_until_silent(self, timeout=None):
+        """Blocks until the output engine has stopped playing; returns False on timeout."""
+        if self.output_engine is None:
+            return True
+        return self.output_engine.wait_until_silent(timeout)
+
     def play(self, event: ApplicationEvent):
-        play(event.request)
+        self.play_audio(event.request)
         return ApplicationEvent(
             type=ApplicationEventType.PLAY,
             status=ProcessingStatus.SUCCESS
@@ -45,4 +126,5 @@ class AudioPlayer:
 
     def __del__(self):
         """Ensure PyAudio instance is terminated upon deletion."""
-        self.pyaudio_instance.terminate()
+        if self.pyaudio_instance is not None:
+            self.pyaudio_instance.terminate()
@@ -0,0 +1,85 @@
+import numpy as np
+
+
+class EnergyVAD:
+    """Energy and zero-crossing voice activity detector over 16-bit mono PCM.
+
+    Each chunk is split into short analysis frames and classified in one
+    vectorized pass. A frame is speech when its energy is ``margin_db`` above
+    the adaptive noise floor and its zero-crossing rate is not noise-like
+    (unless it is very loud). Any object with ``frame_seconds`` and an
+    ``is_speech(pcm)`` method returning per-frame booleans can replace it.
+    """
+
+    def __init__(self, sample_rate=16000, frame_ms=20, margin_db=12.0, min_energy_db=-55.0,
+                 max_zero_crossing_rate=0.35, noise_adaptation=0.05):
+        self.sample_rate = sample_rate
+        self.frame_length = int(sample_rate * frame_ms / 1000)
+        self.frame_seconds = self.frame_length / sample_rate
+        self.margin_db = margin_db
+        self.min_energy_db = min_energy_db
+        self.max_zero_crossing_rate = max_zero_crossing_rate
+        self.noise_adaptation = noise_adaptation
+        self.noise_floor_db = None
+        self.remainder = np.zeros(0, dtype=np.float32)
+
+    def reset(self):
+        self.noise_floor_db = None
+        self.remainder = np.zeros(0, dtype=np.float32)
+
+    def is_speech(self, pcm):
+        samples = np.concatenate([self.remainder, np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768])
+        count = len(samples) // self.frame_length
+        self.remainder = samples[count * self.frame_length:]
+        if count == 0:
+            return np.zeros(0, dtype=bool)
+        frames = samples[:count * self.frame_length].reshape(count, self.frame_length)
+
+        energy_db = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+        signs = np.signbit(frames)
+        zero_crossing_rate = np.mean(signs[:, 1:] != signs[:, :-1], axis=1)
+
+        if self.noise_floor_db is None:
+            self.noise_floor_db = max(float(np.min(energy_db)), self.min_energy_db - self.margin_db)
+        threshold = max(self.noise_floor_db + self.margin_db, self.min_energy_db)
+        loud = energy_db > threshold
+        speech = loud & ((zero_crossing_rate < self.max_zero_crossing_rate) | (energy_db > threshold + self.margin_db))
+
+        # Track the noise floor from frames classified as silence
+        silence = energy_db[~speech]
+        if len(silence):
+            self.noise_floor_db += self.noise_adaptation * (float(np.mean(silence)) - self.noise_floor_db)
+        return speech
+
+
+class Endpointer:
+    """Detects the end of an utterance from trailing silence after speech."""
+
+    def __init__(self, vad=None, trailing_silence=0.8, min_speech=0.3):
+        self.vad = vad or EnergyVAD()
+        self.trailing_silence = trailing_silence
+        self.min_speech = min_speech
+        self.reset()
+
+    def reset(self):
+        self.vad.reset()
+        self.speech_seconds = 0.0
+        self.silence_seconds = 0.0
+        self.elapsed = 0.0
+        self.endpoint = None
+
+    def process(self, pcm):
+        """Feeds a chunk of PCM; returns True once, on the chunk where the utterance ends."""
+        if self.endpoint is not None:
+            return False
+        for is_speech in self.vad.is_speech(pcm):
+            self.elapsed += self.vad.frame_seconds
+            if is_speech:
+                self.speech_seconds += self.vad.frame_seconds
+                self.silence_seconds = 0.0
+            else:
+                self.silence_seconds += self.vad.frame_seconds
+            if self.speech_seconds >= self.min_speech and self.silence_seconds >= self.trailing_silence:
+                self.endpoint = self.elapsed
+                return True
+        return False
@@ -1,30 +1,48 @@
+# Imported first so startup phases are timed from the start of the process
+from heddy.startup import profiler
 import os
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from heddy.application_event import ApplicationEvent, ApplicationEventType, ProcessingStatus
-from heddy.io.sound_effects_player import AudioPlayer
 from heddy.speech_to_text.stt_manager import STTManager
 from heddy.text_to_speech.text_to_speach_manager import TTSManager
-from heddy.word_detector import WordDetector
-from heddy.io.audio_recorder import start_recording, stop_recording
-from heddy.speech_to_text.assemblyai_transcriber import AssemblyAITranscriber
-from heddy.ai_backend.assistant_manager import ThreadManager, StreamingManager
-from heddy.text_to_speech.eleven_labs import ElevenLabsManager
-from heddy.vision_module import VisionModule
-import openai
+from heddy.word_detector import WordDetector, END_OF_UTTERANCE
+from heddy.io.audio_recorder import recorder
+from heddy.text_to_speech.speech_pipeline import SpeechPipeline
+from heddy.text_to_speech.tts_cache import CachedSynthesizer
+from heddy.transport import get_transport, ConnectionPrewarmer
+from heddy.functions2call import set_vision_module
+from heddy.tracing import tracer
+from heddy.metrics import metrics
+from heddy.runtime import AsyncRuntime
 from dotenv import load_dotenv
 
 
-class MainController:
-    # State variables
-    is_recording = False
-    picture_mode = False
-    last_thread_id = None
-    
-    # Global variable for transcription
-    transcription = ""
-    
-    # Global set to track processed message IDs
-    processed_messages = set()
+SOUND_EFFECTS = [
+    "listening.wav",
+    "startrecording.wav",
+    "tricorder.wav",
+    "respond.wav",
+    "timerreset.wav",
+]
+
+GREETING = 'Hello! How can I assist you today?'
+
+ASSISTANT_ID = "asst_3D8tACoidstqhbw5JE2Et2st"
+
+# Spoken while slow tools run
+TOOL_FILLER = "One moment."
+
+# Phrases the app itself says, synthesized in the background at startup so they play from the cache
+TTS_WARMUP_PHRASES = [
+    GREETING,
+    TOOL_FILLER,
+]
+
 
+class MainController:
     def __init__(
             self, 
             assistant,
@@ -32,20 +50,98 @@ class MainController:
             synthesizer,
             audio_player,
             vision_module,
-            word_detector
+            word_detector,
+            endpointer=None,
+            prewarmer=None,
+            barge_in=False,
+            recorder=recorder,
+            session_id=None
         ) -> None:
+        # Conversation state; one controller per device
+        self.is_recording = False
+        self.picture_mode = False
+        self.last_thread_id = None
+        self.transcription = ""
+        self.processed_messages = set()
+
         self.assistant = assistant
         self.transcriber = transcriber
         self.synthesizer = synthesizer
         self.vision_module = vision_module
         self.audio_player = audio_player
         self.word_detector = word_detector
+        # When set, trailing silence ends the recording instead of the "reply" keyword
+        self.endpointer = endpointer
+        # Opens provider connections in the background while the user is talking
+        self.prewarmer = prewarmer
+        # When set, the wake word interrupts the reply being spoken
+        self.barge_in = barge_in
+        self.interrupted = threading.Event()
+        # In server mode each session records from its own client's audio
+        self.recorder = recorder
+        self.session_id = session_id
 
     def process_event(self, event: ApplicationEvent):
+        if event.type == ApplicationEventType.START_RECORDING:
+            # The wake word starts a new traced turn. An interruption is only forgotten
+            # here: during the reply the spotter may cancel it before it has started
+            self.interrupted.clear()
+            self.assistant.clear_cancel()
+            tracer.start_turn(self.session_id)
+        if event.type == ApplicationEventType.LISTEN:
+            # Waiting for a keyword is idle time, not a stage of the turn
+            return self.word_detector.listen(event)
+        with tracer.span(event.type.name):
+            if self.barge_in and event.type in (ApplicationEventType.AI_INTERACT, ApplicationEventType.PLAY):
+                return self.handle_interruptible(event)
+            return self.handle_event(event)
+
+    def handle_interruptible(self, event: ApplicationEvent):
+        """Handles a stage that speaks while the keyword spotter listens for the wake word."""
+        self.word_detector.on_word = self.on_word_while_speaking
+        self.word_detector.resume()
+        try:
+            return self.handle_event(event)
+        finally:
+            self.word_detector.on_word = None
+            if not self.interrupted.is_set():
+                # Drop anything heard over our own speech
+                self.word_detector.clear()
+
+    def on_word_while_speaking(self, word):
+        if "computer" in word and not self.interrupted.is_set():
+            # Forget words heard earlier in the reply, so the wake word is the next one listened to
+            self.word_detector.clear()
+            self.interrupt()
+
+    def interrupt(self):
+        """Barge-in: stops the reply being spoken and cancels the assistant run behind it.
+
+        Runs on the keyword spotter's thread. The wake word stays queued, so the
+        next turn starts as soon as the interrupted stage returns.
+        """
+        started_at = time.perf_counter()
+        self.interrupted.set()
+        print("Wake word heard while speaking, interrupting the reply.")
+        self.assistant.cancel()
+        self.audio_player.stop()
+        # Measured on another thread so the spotter goes straight back to listening
+        threading.Thread(target=self.measure_interruption, args=(started_at,), daemon=True).start()
+
+    def measure_interruption(self, started_at):
+        if self.audio_player.wait_until_silent(timeout=1.0):
+            # Audio already handed to the device still has to play out
+            output_latency = getattr(self.audio_player.output_engine, "output_latency", 0.0)
+            metrics.record_timing("barge_in.interrupt_to_silence", time.perf_counter() - started_at + output_latency)
+            tracer.record_span("barge_in.interrupt_to_silence", started_at, output_latency=output_latency)
+        else:
+            print("Output did not go silent within a second of the interruption.")
+
+    def handle_event(self, event: ApplicationEvent):
         if event.type == ApplicationEventType.START:
             return ApplicationEvent(
                 ApplicationEventType.SYNTHESIZE,
-                request='Hello! How can I assist you today?'
+                request=GREETING
             )
         if event.type == ApplicationEventType.SYNTHESIZE:
             return self.synthesizer.synthesize(event)
@@ -54,8 +150,14 @@ class MainController:
         if event.type == ApplicationEventType.LISTEN:
             return self.word_detector.listen(event)
         if event.type == ApplicationEventType.START_RECORDING:
-            self.audio_player.play_sound("startrecording.wav")  # Play start recording sound
-            self.start_recording()
+            if self.prewarmer is not None:
+                self.prewarmer()
+            self.assistant.prepare()
+            # Let the chime finish before recording so it does not reach the transcriber,
+            # and keep it out of the pre-roll as well
+            chime_started_at = time.monotonic()
+            self.audio_player.play_sound("startrecording.wav", block=True)  # Play start recording sound
+            self.start_recording(preroll_before=chime_started_at)
             return ApplicationEvent(ApplicationEventType.LISTEN)
         if event.type == ApplicationEventType.USE_SNAPSHOT:
             self.audio_player.play_sound("tricorder.wav")  # Play take a picture sound
@@ -67,7 +169,7 @@ class MainController:
             self.word_detector.clear()
             return ApplicationEvent(
                 ApplicationEventType.TRANSCRIBE,
-                request="recorded_audio.wav"
+                request=self.recorder.audio
             )
         if event.type == ApplicationEventType.TRANSCRIBE:
             return self.transcriber.transcribe_audio_file(event)
@@ -81,12 +183,20 @@ class MainController:
             raise RuntimeError(event.error)
         if event.status == ProcessingStatus.INIT:
             return event
+        if self.interrupted.is_set() and event.type in (
+                ApplicationEventType.AI_INTERACT, ApplicationEventType.SYNTHESIZE, ApplicationEventType.PLAY):
+            # Skip what is left of the interrupted reply; the queued wake word starts the next turn
+            tracer.end_turn(self.session_id)
+            return ApplicationEvent(
+                type=ApplicationEventType.LISTEN,
+            )
         if event.type == ApplicationEventType.SYNTHESIZE:
             return ApplicationEvent(
                 type=ApplicationEventType.PLAY,
                 request=event.result
             )
         if event.type == ApplicationEventType.PLAY:
+            tracer.end_turn(self.session_id)
             return ApplicationEvent(
                 type=ApplicationEventType.LISTEN,
             )
@@ -112,6 +222,12 @@ class MainController:
             )
         if event.type == ApplicationEventType.AI_INTERACT:
             print(f"Assistant Response: '{event.result}'")
+            if self.assistant.speech_pipeline is not None:
+                # The reply was already spoken sentence by sentence while streaming
+                tracer.end_turn(self.session_id)
+                return ApplicationEvent(
+                    type=ApplicationEventType.LISTEN,
+                )
             return ApplicationEvent(
                 type=ApplicationEventType.SYNTHESIZE,
                 request=event.result
@@ -120,37 +236,55 @@ class MainController:
     def get_snapshot(self, event: ApplicationEvent):
         # TODO: move to vision module logic
         self.picture_mode = False
-        self.vision_module.capture_image_async()
+        if not self.vision_module.snapshot_pending:
+            self.vision_module.prepare_snapshot_async()
         event.status = ProcessingStatus.SUCCESS
         event.result = self.vision_module.describe_captured_image(event.request)
         return event
 
     # TODO: move to an interaction manager(?) module
     def stop_recording(self, ):
-        stop_recording()
+        self.recorder.stop_recording()
+        # Hands this recording's stream to the TRANSCRIBE event, so the next recording can start meanwhile
+        self.transcriber.stop_stream()
         self.is_recording = False
         print("Recording stopped. Processing...")
     
     # TODO: move to an interaction manager(?) module
-    def start_recording(self,):
-        start_recording()
+    def start_recording(self, preroll_before=None):
+        self.transcriber.start_stream()
+        if self.endpointer is not None:
+            self.endpointer.reset()
+        # The pre-roll still holds the wake word: the transcriber gets it, but the
+        # endpointer only counts speech captured after the recording started
+        self.recorder.start_recording(on_frame=self.transcriber.feed_audio, preroll_before=preroll_before,
+                                      on_live_frame=self.on_recorded_frame)
         self.is_recording = True
         print("Recording started...")
+
+    def on_recorded_frame(self, pcm):
+        if self.endpointer is not None and self.endpointer.process(pcm):
+            print("End of utterance detected.")
+            self.word_detector.push(END_OF_UTTERANCE)
     
     # TODO: move to an interaction manager(?) module
     def set_picture_mode(self,):
         if self.is_recording:
             self.picture_mode = True
             print("Picture mode activated")
+            # Capture and encode while the user is still talking and being transcribed
+            self.vision_module.prepare_snapshot_async()
 
     # TODO: move to an interaction(?) module
     def handle_detected_word(self, word):
         if "computer" in word and not self.is_recording:
             return ApplicationEvent(ApplicationEventType.START_RECORDING)
-        if "snapshot" in word and not self.picture_mode:
+        if "snapshot" in word and not self.picture_mode and self.vision_module is not None:
             return ApplicationEvent(ApplicationEventType.USE_SNAPSHOT)
         if "reply" in word and self.is_recording:
             return ApplicationEvent(ApplicationEventType.STOP_RECORDING)
+        if word == END_OF_UTTERANCE and self.is_recording:
+            return ApplicationEvent(ApplicationEventType.STOP_RECORDING)
         return ApplicationEvent(ApplicationEventType.LISTEN)
     
     def run(self, event: ApplicationEvent):
@@ -162,35 +296,247 @@ class MainController:
             result = self.process_event(current_event)
             current_event = self.process_result(result)
 
+# Heavy provider SDKs, PocketSphinx, OpenCV and the audio devices are imported
+# and opened inside these helpers, which initialize() runs concurrently
+
+def init_keyword_spotting(word_detector):
+    with profiler.phase("keyword model"):
+        word_detector.load()
+    return word_detector
+
+
+def init_audio_devices(hub, word_detector=None):
+    """Opens the microphone, then the output engine; PortAudio setup is kept on one thread.
+
+    Without a hub the keyword spotter opens its own LiveSpeech input, so it
+    is passed here and loaded after the output engine, on the same thread.
+    """
+    if hub is not None:
+        with profiler.phase("microphone"):
+            hub.start()
+    with profiler.phase("import audio output"):
+        from heddy.io.audio_engine import AudioOutputEngine
+        from heddy.io.sound_effects_player import AudioPlayer
+    with profiler.phase("audio output"):
+        output_engine = AudioOutputEngine()
+        output_engine.preload(SOUND_EFFECTS)
+        output_engine.start()
+    if word_detector is not None:
+        init_keyword_spotting(word_detector)
+    return AudioPlayer(output_engine=output_engine)
+
+
+def init_assistant(transport):
+    with profiler.phase("import openai"):
+        import openai
+        from heddy.ai_backend.assistant_manager import ThreadManager
+    with profiler.phase("openai client"):
+        openai_client = openai.OpenAI(
+            api_key=os.getenv("OPENAI_API_KEY"),
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            http_client=transport.httpx_client()
+        )
+    return openai_client, ThreadManager(
+        openai_client,
+        inactivity_timeout=float(os.getenv("HEDDY_THREAD_TIMEOUT", "90"))
+    )
+
+
+def init_speech_to_text():
+    with profiler.phase("import assemblyai"):
+        from heddy.speech_to_text.assemblyai_transcriber import AssemblyAITranscriber
+    assemblyai_transcriber = AssemblyAITranscriber(api_key=os.getenv("ASSEMBLYAI_API_KEY"))
+    streaming_transcriber = None
+    if os.getenv("HEDDY_STREAMING_STT", "1") == "1":
+        with profiler.phase("import websockets"):
+            from heddy.speech_to_text.streaming_transcriber import AssemblyAIStreamingTranscriber
+        streaming_transcriber = AssemblyAIStreamingTranscriber(api_key=os.getenv("ASSEMBLYAI_API_KEY"))
+    return STTManager(
+        transcriber=assemblyai_transcriber,
+        streaming_transcriber=streaming_transcriber
+    )
+
+
+def init_text_to_speech(transport):
+    from heddy.text_to_speech.eleven_labs import ElevenLabsManager
+
+    eleven_labs_manager = ElevenLabsManager(
+        api_key=os.getenv("ELEVENLABS_API_KEY"),
+        transport=transport,
+        base_url=os.getenv("ELEVENLABS_BASE_URL", "https://api.elevenlabs.io")
+    )
+    warmup_phrases = TTS_WARMUP_PHRASES + [
+        phrase for phrase in os.getenv("HEDDY_TTS_WARMUP_PHRASES", "").split("|") if phrase.strip()
+    ]
+    with profiler.phase("tts cache"):
+        synthesizer = CachedSynthesizer(
+            eleven_labs_manager,
+            cache_dir=os.path.expanduser(os.getenv("HEDDY_TTS_CACHE_DIR", "~/.cache/heddy/tts")),
+            max_disk_bytes=int(float(os.getenv("HEDDY_TTS_CACHE_MAX_MB", "256")) * 1024 * 1024),
+            warmup_phrases=warmup_phrases
+        )
+    return eleven_labs_manager, synthesizer
+
+
+def init_vision(transport):
+    with profiler.phase("import opencv"):
+        from heddy.io.camera import FrameGrabber, create_frame_source
+        from heddy.image_preprocessor import ImagePreprocessor
+        from heddy.vision_module import VisionModule
+    frame_grabber = None
+    camera = os.getenv("HEDDY_CAMERA", "v4l2")
+    if camera != "fswebcam":
+        with profiler.phase("camera"):
+            frame_grabber = FrameGrabber(create_frame_source(camera))
+            frame_grabber.start()
+    return VisionModule(
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        transport=transport,
+        frame_grabber=frame_grabber,
+        preprocessor=ImagePreprocessor(
+            max_width=int(os.getenv("HEDDY_IMAGE_MAX_SIZE", "1024")),
+            max_height=int(os.getenv("HEDDY_IMAGE_MAX_SIZE", "1024")),
+            image_format=os.getenv("HEDDY_IMAGE_FORMAT", "jpeg"),
+            quality=int(os.getenv("HEDDY_IMAGE_QUALITY", "80"))
+        ),
+        base_url=(os.getenv("OPENAI_BASE_URL") or "https://api.openai.com/v1").rstrip("/")
+    )
+
+
 def initialize():
     load_dotenv()
     print("System initializing...")
-    # Initialize OpenAI client ok computer send a little zapier tick please reply
-    openai_client = openai.OpenAI(
-        api_key=os.getenv("OPENAI_API_KEY")
-    ) # This line initializes openai_client with the openai library itself
+    recorder.output_filename = os.getenv("HEDDY_RECORDING_FILE")
+    trace_file = os.path.expanduser(os.getenv("HEDDY_TRACE_FILE", "~/.cache/heddy/traces.jsonl"))
+    if trace_file:
+        os.makedirs(os.path.dirname(trace_file) or ".", exist_ok=True)
+    tracer.configure(trace_file, max_bytes=int(os.getenv("HEDDY_TRACE_MAX_BYTES", str(5 * 1024 * 1024))))
+    transport = get_transport()
 
-    # Initialize modules with provided API keys
-    assemblyai_transcriber = AssemblyAITranscriber(api_key=os.getenv("ASSEMBLYAI_API_KEY"))
+    hub = None
+    if os.getenv("HEDDY_MIC_HUB", "1") == "1":
+        from heddy.io.microphone_hub import MicrophoneHub
+
+        hub = MicrophoneHub(preroll_seconds=float(os.getenv("HEDDY_PREROLL_SECONDS", "0.5")))
+        recorder.hub = hub
+    word_detector = WordDetector(hub=hub)
+
+    # Independent components start concurrently; keyword spotting and the
+    # microphone come first so the wake word can be heard as soon as possible
+    with ThreadPoolExecutor(max_workers=6, thread_name_prefix="heddy-init") as executor:
+        if hub is not None:
+            keyword_spotting = executor.submit(init_keyword_spotting, word_detector)
+            audio_devices = executor.submit(init_audio_devices, hub)
+        else:
+            # LiveSpeech initializes PortAudio, which must not race the output engine's setup
+            keyword_spotting = audio_devices = executor.submit(init_audio_devices, hub, word_detector)
+        assistant = executor.submit(init_assistant, transport)
+        speech_to_text = executor.submit(init_speech_to_text)
+        text_to_speech = executor.submit(init_text_to_speech, transport)
+        vision = executor.submit(init_vision, transport)
+
+        keyword_spotting.result()
+        audio_player = audio_devices.result()
+        # Barge-in keeps keyword spotting on while speaking, which needs the shared
+        # microphone so our own voice can be gated out of the spotter's input
+        barge_in = hub is not None and os.getenv("HEDDY_BARGE_IN", "0") == "1"
+        if barge_in:
+            from heddy.io.echo_gate import EchoGate
+
+            word_detector.echo_gate = EchoGate(
+                audio_player.output_engine,
+                margin_db=float(os.getenv("HEDDY_ECHO_GATE_MARGIN_DB", "10"))
+            )
+        # Start spotting keywords now instead of after the greeting
+        word_detector.run_thread()
+        metrics.record_timing("startup.wake_word_ready", profiler.elapsed())
 
-    # Adjusted to use the hardcoded Assistant ID
-    eleven_labs_manager = ElevenLabsManager(api_key=os.getenv("ELEVENLABS_API_KEY"))
-    vision_module = VisionModule(openai_api_key=os.getenv("OPENAI_API_KEY"))
+        openai_client, thread_manager = assistant.result()
+        # The inactivity reset sound goes through the shared output engine
+        thread_manager.audio_player = audio_player
+        transcriber = speech_to_text.result()
+        eleven_labs_manager, synthesizer = text_to_speech.result()
+        vision_module = vision.result()
+        # The assistant's send_image_description tool reads the latest snapshot from here
+        set_vision_module(vision_module)
 
-    # Initialize ThreadManager and StreamingManager
-    thread_manager = ThreadManager(openai_client)
-    streaming_manager = StreamingManager(thread_manager, eleven_labs_manager, assistant_id="asst_3D8tACoidstqhbw5JE2Et2st")
+    from heddy.text_to_speech.eleven_labs import pcm_format_for_rate
 
-    word_detector = WordDetector()
+    # "pcm" requests raw PCM at a rate matching the output device so speech is
+    # written straight into its stream; any other value is a provider format
+    tts_format = os.getenv("HEDDY_TTS_FORMAT", "pcm")
+    eleven_labs_manager.output_format = (
+        pcm_format_for_rate(audio_player.output_engine.rate) if tts_format == "pcm" else tts_format
+    )
+    audio_player.audio_format = eleven_labs_manager.output_format
+    # Warm the cache only now, since the output format is part of the cache key
+    synthesizer.warmup()
+
+    speech_pipeline = SpeechPipeline(synthesizer, audio_player)
+    # "assistants" (default) keeps the conversation in an Assistants thread,
+    # "chat" keeps it locally and streams one Chat Completions request per turn
+    if os.getenv("HEDDY_ASSISTANT_BACKEND", "assistants") == "chat":
+        from heddy.ai_backend.chat_completions import ChatCompletionsManager, ConversationStore
+
+        streaming_manager = ChatCompletionsManager(
+            openai_client,
+            model=os.getenv("HEDDY_CHAT_MODEL", "gpt-4o"),
+            conversation=ConversationStore(token_budget=int(os.getenv("HEDDY_CHAT_TOKEN_BUDGET", "3000"))),
+            speech_pipeline=speech_pipeline,
+            transport=transport,
+            tool_filler=TOOL_FILLER
+        )
+    else:
+        from heddy.ai_backend.assistant_manager import StreamingManager
+
+        streaming_manager = StreamingManager(
+            thread_manager,
+            eleven_labs_manager,
+            assistant_id=ASSISTANT_ID,
+            speech_pipeline=speech_pipeline,
+            transport=transport,
+            tool_filler=TOOL_FILLER
+        )
+
+    endpointer = None
+    if os.getenv("HEDDY_ENDPOINTING", "0") == "1":
+        from heddy.io.vad import Endpointer
+
+        endpointer = Endpointer(trailing_silence=float(os.getenv("HEDDY_TRAILING_SILENCE", "0.8")))
+    prewarmer = None
+    if os.getenv("HEDDY_PREWARM", "1") == "1":
+        streaming_transcriber = transcriber.streaming_transcriber
+        prewarmer = ConnectionPrewarmer(
+            transport,
+            urls=[eleven_labs_manager.url, vision_module.url],
+            openai_clients=[openai_client],
+            resolve_urls=[streaming_transcriber.url] if streaming_transcriber is not None else [],
+        )
+    metrics.record_timing("startup.ready", profiler.elapsed())
+    if os.getenv("HEDDY_STARTUP_REPORT", "1") == "1":
+        profiler.report()
     return MainController(
         assistant=streaming_manager,
-        transcriber=STTManager(transcriber=assemblyai_transcriber),
+        transcriber=transcriber,
         vision_module=vision_module,
-        audio_player=AudioPlayer(),
+        audio_player=audio_player,
         word_detector=word_detector,
-        synthesizer=TTSManager(eleven_labs_manager)
+        synthesizer=TTSManager(synthesizer),
+        endpointer=endpointer,
+        prewarmer=prewarmer,
+        barge_in=barge_in
     )
 
 if __name__ == "__main__":
     main = initialize()
-    main.run(ApplicationEvent(ApplicationEventType.START))
\ No newline at end of file
+    # HEDDY_RUNTIME: "serial" (default) for the blocking loop, "async" for the
+    # concurrent asyncio runtime, "async-compat" for asyncio with serial semantics
+    runtime = os.getenv("HEDDY_RUNTIME", "serial")
+    if runtime == "serial":
+        main.run(ApplicationEvent(ApplicationEventType.START))
+    else:
+        asyncio.run(
+            AsyncRuntime(main, concurrent=runtime != "async-compat").run(
+                ApplicationEvent(ApplicationEventType.START)
+            )
+        )
@@ -0,0 +1,50 @@
+import logging
+import threading
+from collections import defaultdict
+
+logger = logging.getLogger("heddy.metrics")
+
+
+class Metrics:
+    """Thread-safe store for counters, timings and other samples reported by the modules."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.samples = defaultdict(list)
+
+    def increment(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def record_timing(self, name, seconds):
+        with self.lock:
+            self.samples[name].append(seconds)
+        logger.debug("%s: %.1f ms", name, seconds * 1000)
+
+    def record_value(self, name, value):
+        with self.lock:
+            self.samples[name].append(value)
+        logger.debug("%s: %s", name, value)
+
+    def last(self, name):
+        with self.lock:
+            samples = self.samples.get(name)
+            return samples[-1] if samples else None
+
+    def snapshot(self):
+        """Returns a copy of all counters and samples."""
+        with self.lock:
+            return {
+                "counters": dict(self.counters),
+                "samples": {name: list(samples) for name, samples in self.samples.items()},
+            }
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.samples.clear()
+
+
+# Global instance to be used outside this script
+metrics = Metrics()
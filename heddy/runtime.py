@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+from heddy.application_event import ApplicationEvent, ApplicationEventType
+
+# Events that change the recording state; in concurrent mode the listener applies
+# them in the order the words were heard instead of dispatching them as tasks
+RECORDING_EVENTS = (
+    ApplicationEventType.START_RECORDING,
+    ApplicationEventType.USE_SNAPSHOT,
+    ApplicationEventType.STOP_RECORDING,
+)
+
+
+class AsyncRuntime:
+    """asyncio event runtime for MainController.
+
+    Events flow through an ``asyncio.Queue`` and every handler runs the
+    controller's blocking ``process_event``/``process_result`` in a thread
+    pool. In concurrent mode each event is dispatched as its own task, and a
+    dedicated listener keeps feeding wake words into the queue, so keyword
+    spotting, playback, transcription and the assistant stream overlap.
+    With ``concurrent=False`` events are handled one at a time exactly like
+    ``MainController.run``, which keeps the old behaviour available for
+    comparison.
+
+    The controller is shared by all tasks, so its state transitions
+    (``process_result``) are serialized by ``state_lock``, and recording
+    events are applied by the listener itself: a second wake word is only
+    handled once the first one's recording has started. Stopping a recording
+    hands its transcription stream to the TRANSCRIBE event, so that event
+    can still be finishing while the next recording starts.
+    """
+
+    def __init__(self, controller, concurrent=True, max_workers=4):
+        self.controller = controller
+        self.concurrent = concurrent
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="heddy-event")
+        self.queue = None
+        self.loop = None
+        self.tasks = set()
+        self.listener = None
+        self.state_lock = threading.Lock()
+        self.handlers = {
+            ApplicationEventType.START: self.handle_start,
+            ApplicationEventType.LISTEN: self.handle_listen,
+        }
+
+    async def call(self, func, *args):
+        return await self.loop.run_in_executor(self.executor, func, *args)
+
+    async def run(self, event: ApplicationEvent):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue()
+        await self.queue.put(event)
+        while True:
+            current_event = await self.queue.get()
+            if current_event.type == ApplicationEventType.EXIT:
+                break
+            print(current_event.type)
+            if self.concurrent:
+                task = asyncio.create_task(self.dispatch(current_event))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+            else:
+                await self.dispatch(current_event)
+        for task in list(self.tasks):
+            task.cancel()
+        self.executor.shutdown(wait=False)
+
+    async def dispatch(self, event: ApplicationEvent):
+        handler = self.handlers.get(event.type, self.handle_default)
+        try:
+            next_event = await handler(event)
+        except Exception as e:
+            if not self.concurrent:
+                raise
+            print(f"Failed to handle {event.type}: {e}")
+            return
+        if next_event is not None:
+            await self.queue.put(next_event)
+
+    def process_result(self, result: ApplicationEvent):
+        with self.state_lock:
+            return self.controller.process_result(result)
+
+    async def handle_default(self, event: ApplicationEvent):
+        result = await self.call(self.controller.process_event, event)
+        next_event = await self.call(self.process_result, result)
+        if self.concurrent and next_event is not None and next_event.type == ApplicationEventType.LISTEN:
+            # The background listener is already waiting for the next word
+            return None
+        return next_event
+
+    async def handle_start(self, event: ApplicationEvent):
+        self.controller.audio_player.play_sound("listening.wav")  # Play start listening sound
+        if self.concurrent:
+            self.start_listener()
+        return await self.handle_default(event)
+
+    async def handle_listen(self, event: ApplicationEvent):
+        if self.concurrent:
+            self.start_listener()
+            return None
+        return await self.handle_default(event)
+
+    def start_listener(self):
+        """Starts the thread that turns detected words into events for the rest of the session."""
+        if self.listener is not None:
+            return
+        self.listener = threading.Thread(target=self._listen_forever, daemon=True)
+        self.listener.start()
+
+    def _listen_forever(self):
+        while True:
+            try:
+                next_event = self.listen_once()
+            except Exception as e:
+                # Keep listening: without this thread no wake word would ever be heard again
+                print(f"Keyword listener failed, restarting it: {e}")
+                traceback.print_exc()
+                time.sleep(0.1)
+                continue
+            if next_event is not None and next_event.type != ApplicationEventType.LISTEN:
+                self.loop.call_soon_threadsafe(self.queue.put_nowait, next_event)
+
+    def listen_once(self):
+        """Waits for the next word and applies the recording events it leads to."""
+        result = self.controller.process_event(ApplicationEvent(ApplicationEventType.LISTEN))
+        with self.state_lock:
+            next_event = self.controller.process_result(result)
+            while next_event is not None and next_event.type in RECORDING_EVENTS:
+                stop_recording = next_event.type == ApplicationEventType.STOP_RECORDING
+                next_event = self.controller.process_result(self.controller.process_event(next_event))
+                if stop_recording:
+                    # The controller suspends the detector while it transcribes; in
+                    # concurrent mode keep listening so the next wake word is heard
+                    self.controller.word_detector.resume()
+        return next_event
@@ -0,0 +1,136 @@
+import heapq
+import itertools
+import threading
+import time
+
+from heddy.metrics import metrics
+
+
+class TimerHandle:
+    """A scheduled callback; ``cancel()`` stops it from running if it has not fired yet."""
+
+    __slots__ = ("scheduler", "deadline", "callback", "args", "name", "cancelled", "fired")
+
+    def __init__(self, scheduler, deadline, callback, args, name):
+        self.scheduler = scheduler
+        self.deadline = deadline
+        self.callback = callback
+        self.args = args
+        self.name = name
+        self.cancelled = False
+        self.fired = False
+
+    def cancel(self):
+        return self.scheduler.cancel(self)
+
+    def is_alive(self):
+        return not self.cancelled and not self.fired
+
+
+class TimerScheduler:
+    """Runs every timer of the process on one thread, from a heap ordered by deadline.
+
+    ``schedule`` pushes onto the heap in O(log n). ``cancel`` only marks the
+    entry; cancelled entries are skipped when they reach the top, and the
+    heap is rebuilt once they make up most of it. Callbacks run on the
+    scheduler thread, so they must be short and should hand slow work to
+    components that already own a thread (e.g. the shared output engine).
+    ``stop`` ends the thread; scheduling afterwards starts a new one, and
+    timers still pending then fire on it.
+    """
+
+    def __init__(self, name="heddy-timers"):
+        self.name = name
+        self.condition = threading.Condition()
+        self.heap = []
+        self.sequence = itertools.count()
+        # The thread running the timers; a stopped thread exits once it is no longer this one
+        self.thread = None
+        self.cancelled_pending = 0
+        self.scheduled = 0
+        self.fired = 0
+        self.cancelled = 0
+        self.failed = 0
+        self.max_lateness = 0.0
+        self.total_lateness = 0.0
+
+    def schedule(self, delay, callback, *args, name=None):
+        """Runs ``callback(*args)`` after ``delay`` seconds and returns its TimerHandle."""
+        handle = TimerHandle(self, time.monotonic() + delay, callback, args, name or getattr(callback, "__name__", "timer"))
+        with self.condition:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self.thread.start()
+            heapq.heappush(self.heap, (handle.deadline, next(self.sequence), handle))
+            self.scheduled += 1
+            # Only the earliest deadline can change how long the thread sleeps
+            if self.heap[0][2] is handle:
+                self.condition.notify()
+        return handle
+
+    def cancel(self, handle):
+        with self.condition:
+            if not handle.is_alive():
+                return False
+            handle.cancelled = True
+            self.cancelled += 1
+            self.cancelled_pending += 1
+            if self.cancelled_pending > 64 and self.cancelled_pending > len(self.heap) // 2:
+                self.heap = [entry for entry in self.heap if not entry[2].cancelled]
+                heapq.heapify(self.heap)
+                self.cancelled_pending = 0
+            return True
+
+    def _run(self):
+        current = threading.current_thread()
+        while True:
+            with self.condition:
+                while self.thread is current:
+                    while self.heap and self.heap[0][2].cancelled:
+                        heapq.heappop(self.heap)
+                        self.cancelled_pending -= 1
+                    if not self.heap:
+                        self.condition.wait()
+                        continue
+                    wait = self.heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self.condition.wait(wait)
+                if self.thread is not current:
+                    return
+                _, _, handle = heapq.heappop(self.heap)
+                handle.fired = True
+                lateness = time.monotonic() - handle.deadline
+                self.fired += 1
+                self.total_lateness += lateness
+                self.max_lateness = max(self.max_lateness, lateness)
+            metrics.record_timing("timers.lateness", lateness)
+            try:
+                handle.callback(*handle.args)
+            except Exception as e:
+                self.failed += 1
+                print(f"Timer {handle.name} failed: {e}")
+
+    def stats(self):
+        """Returns timer counts and how late timers fired."""
+        with self.condition:
+            return {
+                "pending": len(self.heap) - self.cancelled_pending,
+                "scheduled": self.scheduled,
+                "fired": self.fired,
+                "cancelled": self.cancelled,
+                "failed": self.failed,
+                "mean_lateness": self.total_lateness / self.fired if self.fired else 0.0,
+                "max_lateness": self.max_lateness,
+            }
+
+    def stop(self):
+        with self.condition:
+            thread, self.thread = self.thread, None
+            self.condition.notify_all()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+
+# Global instance to be used outside this script
+scheduler = TimerScheduler()
@@ -0,0 +1,82 @@
+import heapq
+import itertools
+import threading
+import time
+
+from heddy.metrics import metrics
+
+
+class FairLimiter:
+    """Bounds how many sessions process a turn at once and shares the slots fairly.
+
+    A session holds at most one slot, from the start of transcription until
+    its reply has been played. When sessions are waiting, a free slot goes
+    to the one that has used the least processing time recently (usage
+    decays with ``half_life`` seconds), ties broken by arrival order, so a
+    chatty device cannot starve quieter ones.
+    """
+
+    def __init__(self, max_active, half_life=60.0):
+        self.max_active = max_active
+        self.half_life = half_life
+        self.condition = threading.Condition()
+        self.active = 0
+        # Heap of [usage, arrival, session] for sessions waiting for a slot
+        self.waiting = []
+        self.arrivals = itertools.count()
+        # session -> (decayed usage in seconds, when it was last updated)
+        self.usage = {}
+
+    def _usage(self, session, now):
+        usage, updated_at = self.usage.get(session, (0.0, now))
+        return usage * 0.5 ** ((now - updated_at) / self.half_life)
+
+    def acquire(self, session, cancelled=None, timeout=None):
+        """Blocks until ``session`` may process a turn; returns the slot to pass to ``release``.
+
+        Gives up and returns None after ``timeout`` seconds, or once the
+        ``cancelled`` event is set and ``wake_waiters`` has been called.
+        """
+        started_at = time.perf_counter()
+        deadline = None if timeout is None else started_at + timeout
+        with self.condition:
+            entry = [self._usage(session, started_at), next(self.arrivals), session]
+            heapq.heappush(self.waiting, entry)
+            while self.active >= self.max_active or self.waiting[0] is not entry:
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if (cancelled is not None and cancelled.is_set()) or (remaining is not None and remaining <= 0):
+                    self.waiting.remove(entry)
+                    heapq.heapify(self.waiting)
+                    # The entry may have been first in line, blocking the next session
+                    self.condition.notify_all()
+                    return None
+                self.condition.wait(remaining)
+            heapq.heappop(self.waiting)
+            self.active += 1
+            # The next waiting session may fit into another free slot
+            self.condition.notify_all()
+        acquired_at = time.perf_counter()
+        metrics.record_timing("server.slot_wait", acquired_at - started_at)
+        return session, acquired_at
+
+    def wake_waiters(self):
+        """Makes waiting sessions check their ``cancelled`` event, e.g. after a session was closed."""
+        with self.condition:
+            self.condition.notify_all()
+
+    def release(self, slot):
+        session, acquired_at = slot
+        with self.condition:
+            now = time.perf_counter()
+            self.usage[session] = (self._usage(session, now) + now - acquired_at, now)
+            self.active -= 1
+            self.condition.notify_all()
+
+    def forget(self, session):
+        """Drops the usage history of a session that has disconnected."""
+        with self.condition:
+            self.usage.pop(session, None)
+
+    def stats(self):
+        with self.condition:
+            return {"active": self.active, "waiting": len(self.waiting), "max_active": self.max_active}
@@ -0,0 +1,229 @@
+"""Multi-session server: one heddy backend serving many thin clients over websockets.
+
+Usage: python -m heddy.server.server [--host 0.0.0.0] [--port 8765]
+                                     [--max-sessions 64] [--max-active-turns 8]
+
+Protocol, one websocket per device:
+
+  client -> server
+    binary                          16 kHz 16-bit mono microphone PCM
+    {"type": "word", "word": "computer"}
+                                    a keyword spotted on the device
+                                    ("computer", "reply", "snapshot")
+  server -> client
+    {"type": "session", "session": id, "audio_format": "pcm_24000", "input_rate": 16000}
+    {"type": "sound", "name": "startrecording.wav"}
+                                    play a sound effect locally
+    {"type": "audio_start"}, binary speech chunks, {"type": "audio_end"}
+    {"type": "stop"}                the reply was interrupted; flush playback
+    {"type": "transcript", "text": ...} and {"type": "reply", "text": ...}
+    {"type": "turn_end"}            the reply has been sent
+    {"type": "error", "error": ...}
+
+With HEDDY_ENDPOINTING=1 recordings end on trailing silence, so clients
+only need to spot the wake word. Provider settings come from the same
+environment variables as the single-device mode.
+"""
+import argparse
+import itertools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from heddy.server.fairness import FairLimiter
+from heddy.scheduler import scheduler
+from heddy.server.session import Session
+from heddy.tracing import tracer
+
+
+class SharedResources:
+    """Provider clients, connection pools and worker limits shared by every session."""
+
+    def __init__(
+            self,
+            transport,
+            openai_client,
+            eleven_labs_manager,
+            synthesizer,
+            transcriber,
+            assistant_id,
+            streaming_stt=True,
+            streaming_stt_url=None,
+            assemblyai_api_key=None,
+            endpointing=False,
+            max_active_turns=8,
+            max_tool_workers=8,
+            prewarmer=None,
+            frames_per_buffer=1024,
+            timer_scheduler=None,
+            inactivity_timeout=90
+        ):
+        self.transport = transport
+        self.openai_client = openai_client
+        self.eleven_labs_manager = eleven_labs_manager
+        self.synthesizer = synthesizer
+        self.transcriber = transcriber
+        self.assistant_id = assistant_id
+        # Streaming transcription keeps one websocket per session; otherwise recordings are uploaded
+        self.streaming_stt = streaming_stt
+        self.streaming_stt_url = streaming_stt_url
+        self.assemblyai_api_key = assemblyai_api_key
+        self.endpointing = endpointing
+        self.limiter = FairLimiter(max_active_turns)
+        self.tool_executor = ThreadPoolExecutor(max_workers=max_tool_workers, thread_name_prefix="heddy-tool")
+        self.prewarmer = prewarmer
+        self.frames_per_buffer = frames_per_buffer
+        # Inactivity timers of every session
+        self.timer_scheduler = timer_scheduler or scheduler
+        self.inactivity_timeout = inactivity_timeout
+
+    def create_streaming_transcriber(self):
+        if not self.streaming_stt:
+            return None
+        from heddy.speech_to_text.streaming_transcriber import AssemblyAIStreamingTranscriber
+
+        url = {"url": self.streaming_stt_url} if self.streaming_stt_url else {}
+        return AssemblyAIStreamingTranscriber(api_key=self.assemblyai_api_key, **url)
+
+    def create_endpointer(self):
+        if not self.endpointing:
+            return None
+        from heddy.io.vad import Endpointer
+
+        return Endpointer(trailing_silence=float(os.getenv("HEDDY_TRAILING_SILENCE", "0.8")))
+
+
+class SessionServer:
+    """Accepts websocket clients and runs one Session per connection."""
+
+    def __init__(self, resources, host="127.0.0.1", port=8765, max_sessions=64):
+        from websockets.sync.server import serve
+
+        self.resources = resources
+        self.max_sessions = max_sessions
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.session_ids = itertools.count(1)
+        self.server = serve(self.handle, host, port)
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.socket.getsockname()[:2]
+        return f"ws://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def serve_forever(self):
+        print(f"Serving sessions on {self.url}")
+        self.server.serve_forever()
+
+    def stop(self):
+        self.server.shutdown()
+        with self.lock:
+            sessions = list(self.sessions.values())
+        for session in sessions:
+            session.close()
+
+    def handle(self, connection):
+        with self.lock:
+            if len(self.sessions) >= self.max_sessions:
+                connection.close(1013, "Too many sessions")
+                return
+            session_id = f"s{next(self.session_ids)}"
+            session = self.sessions[session_id] = Session(session_id, self.resources, connection)
+        print(f"Session {session_id} connected")
+        # Keywords from this connection may interrupt a reply; trace that in the session's turn
+        tracer.bind(session_id)
+        session.start()
+        try:
+            for message in connection:
+                session.handle_message(message)
+        except Exception as e:
+            print(f"Session {session_id}: connection error: {e}")
+        finally:
+            session.close()
+            with self.lock:
+                self.sessions.pop(session_id, None)
+            print(f"Session {session_id} disconnected")
+
+    def stats(self):
+        with self.lock:
+            sessions = len(self.sessions)
+        return {
+            "sessions": sessions,
+            **self.resources.limiter.stats(),
+            "timers": self.resources.timer_scheduler.stats(),
+            "connections": self.resources.transport.stats(),
+        }
+
+
+def create_resources(max_active_turns=8):
+    """Builds the shared provider clients from the environment, like the single-device initialize()."""
+    from dotenv import load_dotenv
+    from heddy.main_controller import ASSISTANT_ID, init_assistant, init_text_to_speech
+    from heddy.speech_to_text.assemblyai_transcriber import AssemblyAITranscriber
+    from heddy.text_to_speech.eleven_labs import pcm_format_for_rate
+    from heddy.transport import HTTPTransport, ConnectionPrewarmer
+
+    load_dotenv()
+    # One pooled connection per turn that may be in flight
+    transport = HTTPTransport(pool_maxsize=max_active_turns)
+    openai_client, _ = init_assistant(transport)
+    eleven_labs_manager, synthesizer = init_text_to_speech(transport)
+    tts_format = os.getenv("HEDDY_TTS_FORMAT", "pcm")
+    eleven_labs_manager.output_format = pcm_format_for_rate(24000) if tts_format == "pcm" else tts_format
+    synthesizer.warmup()
+    prewarmer = None
+    if os.getenv("HEDDY_PREWARM", "1") == "1":
+        prewarmer = ConnectionPrewarmer(
+            transport,
+            urls=[eleven_labs_manager.url],
+            openai_clients=[openai_client]
+        )
+    return SharedResources(
+        transport=transport,
+        openai_client=openai_client,
+        eleven_labs_manager=eleven_labs_manager,
+        synthesizer=synthesizer,
+        transcriber=AssemblyAITranscriber(api_key=os.getenv("ASSEMBLYAI_API_KEY")),
+        assistant_id=ASSISTANT_ID,
+        streaming_stt=os.getenv("HEDDY_STREAMING_STT", "1") == "1",
+        assemblyai_api_key=os.getenv("ASSEMBLYAI_API_KEY"),
+        endpointing=os.getenv("HEDDY_ENDPOINTING", "0") == "1",
+        max_active_turns=max_active_turns,
+        prewarmer=prewarmer,
+        inactivity_timeout=float(os.getenv("HEDDY_THREAD_TIMEOUT", "90"))
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-sessions", type=int, default=64)
+    parser.add_argument("--max-active-turns", type=int, default=8,
+                        help="sessions that may transcribe, think and speak at the same time")
+    args = parser.parse_args()
+
+    trace_file = os.path.expanduser(os.getenv("HEDDY_TRACE_FILE", "~/.cache/heddy/traces.jsonl"))
+    if trace_file:
+        os.makedirs(os.path.dirname(trace_file) or ".", exist_ok=True)
+    tracer.configure(trace_file, max_bytes=int(os.getenv("HEDDY_TRACE_MAX_BYTES", str(5 * 1024 * 1024))))
+    server = SessionServer(
+        create_resources(args.max_active_turns),
+        host=args.host,
+        port=args.port,
+        max_sessions=args.max_sessions
+    )
+    try:
+        server.serve_forever()
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+import json
+import os
+import threading
+
+from heddy.ai_backend.assistant_manager import ThreadManager, StreamingManager
+from heddy.application_event import ApplicationEvent, ApplicationEventType, ProcessingStatus
+from heddy.io.audio_recorder import AudioRecorder
+from heddy.io.microphone_hub import MicrophoneHub
+from heddy.main_controller import MainController
+from heddy.speech_to_text.stt_manager import STTManager
+from heddy.text_to_speech.speech_pipeline import SpeechPipeline
+from heddy.text_to_speech.text_to_speach_manager import TTSManager
+from heddy.tracing import tracer
+from heddy.word_detector import WordDetector
+
+# Queued to wake a session's loop when the client disconnects
+SESSION_CLOSED = "<session-closed>"
+
+
+class RemoteMicrophone(MicrophoneHub):
+    """MicrophoneHub fed with the audio frames a client streams instead of a local device."""
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+
+class RemoteWordDetector(WordDetector):
+    """Keyword queue fed with the words a client spotted on the device."""
+
+    def load(self,):
+        pass
+
+    def run_thread(self,):
+        # Nothing to run: the session dispatches words as they arrive
+        pass
+
+
+class RemoteAudioPlayer:
+    """Sends sound effects and synthesized speech to the client instead of a sound card.
+
+    Effects are sent by name for the client to play locally; speech is sent
+    as binary messages between ``audio_start`` and ``audio_end`` events.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self.output_engine = None
+        # Bumped by stop() so the clip being sent is abandoned
+        self.generation = 0
+
+    def play_sound(self, file_path, block=False):
+        self.session.send_event("sound", name=os.path.basename(file_path))
+
+    def play_audio(self, audio):
+        generation = self.generation
+        chunks = [audio] if isinstance(audio, (bytes, bytearray)) else audio
+        self.session.send_event("audio_start")
+        try:
+            for chunk in chunks:
+                if self.generation != generation or self.session.closed.is_set():
+                    break
+                self.session.send(chunk)
+        finally:
+            # Abort the rest of the download if the clip was abandoned
+            close = getattr(audio, "close", None)
+            if close is not None:
+                close()
+        self.session.send_event("audio_end")
+
+    def play(self, event: ApplicationEvent):
+        self.play_audio(event.request)
+        return ApplicationEvent(
+            type=ApplicationEventType.PLAY,
+            status=ProcessingStatus.SUCCESS
+        )
+
+    def stop(self):
+        self.generation += 1
+        self.session.send_event("stop")
+
+    def wait_until_silent(self, timeout=None):
+        # The client flushes its playback buffer on "stop"
+        return True
+
+
+class Session:
+    """Conversation state of one connected device.
+
+    Every session has its own controller, recorder, keyword queue, assistant
+    thread, speech pipeline and streaming transcription. Provider clients,
+    connection pools, the TTS cache and tool threads are shared through
+    ``resources``, and ``resources.limiter`` bounds how many sessions
+    process a turn at once.
+    """
+
+    def __init__(self, session_id, resources, connection):
+        self.session_id = session_id
+        self.resources = resources
+        self.connection = connection
+        self.send_lock = threading.Lock()
+        self.closed = threading.Event()
+        self.thread = None
+
+        self.microphone = RemoteMicrophone(frames_per_buffer=resources.frames_per_buffer)
+        self.microphone.start()
+        self.word_detector = RemoteWordDetector()
+        self.audio_player = RemoteAudioPlayer(self)
+        self.thread_manager = ThreadManager(resources.openai_client, audio_player=self.audio_player,
+                                            inactivity_timeout=resources.inactivity_timeout,
+                                            timer_scheduler=resources.timer_scheduler)
+        self.speech_pipeline = SpeechPipeline(resources.synthesizer, self.audio_player, session_id=session_id)
+        self.controller = MainController(
+            assistant=StreamingManager(
+                self.thread_manager,
+                resources.eleven_labs_manager,
+                assistant_id=resources.assistant_id,
+                speech_pipeline=self.speech_pipeline,
+                transport=resources.transport,
+                tool_executor=resources.tool_executor
+            ),
+            transcriber=STTManager(
+                transcriber=resources.transcriber,
+                streaming_transcriber=resources.create_streaming_transcriber()
+            ),
+            synthesizer=TTSManager(resources.synthesizer),
+            audio_player=self.audio_player,
+            vision_module=None,
+            word_detector=self.word_detector,
+            endpointer=resources.create_endpointer(),
+            prewarmer=resources.prewarmer,
+            barge_in=True,
+            recorder=AudioRecorder(hub=self.microphone),
+            session_id=session_id
+        )
+
+    def send(self, data):
+        if self.closed.is_set():
+            return
+        try:
+            with self.send_lock:
+                self.connection.send(data)
+        except Exception as e:
+            print(f"Session {self.session_id}: send failed, closing: {e}")
+            # Sends come from the session and pipeline threads, which close() would wait for
+            self.close(wait=False)
+
+    def send_event(self, event_type, **fields):
+        self.send(json.dumps({"type": event_type, **fields}))
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name=f"heddy-session-{self.session_id}", daemon=True)
+        self.thread.start()
+        self.send_event(
+            "session",
+            session=self.session_id,
+            audio_format=self.resources.eleven_labs_manager.output_format,
+            input_rate=self.microphone.rate
+        )
+        return self
+
+    def handle_message(self, message):
+        """Handles one message from the client: microphone audio or a spotted keyword."""
+        if isinstance(message, bytes):
+            self.microphone.publish(message)
+            return
+        data = json.loads(message)
+        if data.get("type") == "word":
+            self.word_detector.dispatch([data["word"].lower().strip()])
+
+    def run(self):
+        """Runs the controller loop; turn processing waits for a slot from the shared limiter.
+
+        Once the session is closed, the loop tears down the session's state
+        itself, so nothing is stopped under a turn still using it.
+        """
+        tracer.bind(self.session_id)
+        event = ApplicationEvent(ApplicationEventType.LISTEN)
+        slot = None
+        try:
+            while not self.closed.is_set():
+                if event.type == ApplicationEventType.TRANSCRIBE and slot is None:
+                    slot = self.resources.limiter.acquire(self.session_id, cancelled=self.closed)
+                    if slot is None or self.closed.is_set():
+                        break
+                try:
+                    result = self.controller.process_event(event)
+                    self.report(result)
+                    event = self.controller.process_result(result)
+                except Exception as e:
+                    print(f"Session {self.session_id}: turn failed: {e}")
+                    self.send_event("error", error=str(e))
+                    if self.controller.is_recording:
+                        self.controller.stop_recording()
+                    event = ApplicationEvent(ApplicationEventType.LISTEN)
+                if slot is not None and event.type == ApplicationEventType.LISTEN:
+                    self.resources.limiter.release(slot)
+                    slot = None
+                    self.send_event("turn_end")
+        finally:
+            if slot is not None:
+                self.resources.limiter.release(slot)
+            self.tear_down()
+
+    def report(self, event: ApplicationEvent):
+        if event.status != ProcessingStatus.SUCCESS:
+            return
+        if event.type == ApplicationEventType.TRANSCRIBE:
+            self.send_event("transcript", text=event.result)
+        elif event.type == ApplicationEventType.AI_INTERACT:
+            self.send_event("reply", text=event.result)
+
+    def close(self, wait=True, timeout=10.0):
+        """Ends the session: interrupts the current turn and wakes the session loop to tear it down.
+
+        With ``wait``, blocks until the loop has finished.
+        """
+        if not self.closed.is_set():
+            self.closed.set()
+            # Stops waiting for a turn slot, if the loop is
+            self.resources.limiter.wake_waiters()
+            self.controller.assistant.cancel()
+            self.word_detector.push(SESSION_CLOSED)
+            if self.thread is None:
+                self.tear_down()
+        thread = self.thread
+        if wait and thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+            if thread.is_alive():
+                print(f"Session {self.session_id}: still finishing a turn {timeout}s after closing")
+
+    def tear_down(self):
+        # Runs on the session thread once its loop has stopped
+        if self.controller.is_recording:
+            self.controller.stop_recording()
+        self.speech_pipeline.close()
+        self.thread_manager.close()
+        self.resources.limiter.forget(self.session_id)
@@ -1,16 +1,24 @@
 import assemblyai as aai
+from heddy.io.pcm_buffer import PCMBuffer
 from heddy.speech_to_text.stt_manager import STTStatus, STTResult
 
 class AssemblyAITranscriber:
-    def __init__(self, api_key):
+    def __init__(self, api_key, http_timeout=60.0, base_url=None):
         # Set the API key globally for the assemblyai package
         aai.settings.api_key = api_key
+        # The SDK keeps one pooled keep-alive client; only its timeout is configurable
+        aai.settings.http_timeout = http_timeout
+        if base_url:
+            aai.settings.base_url = base_url
 
-    def transcribe_audio_file(self, audio_file_path):
+    def transcribe_audio_file(self, audio):
         # Instantiate the Transcriber object
         transcriber = aai.Transcriber()
+        # In-memory recordings are uploaded straight from the buffer as a WAV stream
+        if isinstance(audio, PCMBuffer):
+            audio = audio.as_wav_file()
         # Start the transcription process
-        transcript = transcriber.transcribe(audio_file_path)
+        transcript = transcriber.transcribe(audio)
         
         # Check the transcription status and return the appropriate response
         
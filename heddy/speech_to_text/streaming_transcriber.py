@@ -0,0 +1,251 @@
+import base64
+import json
+import queue
+import threading
+from urllib.parse import urlencode
+
+from websockets.sync.client import connect
+
+from heddy.speech_to_text.stt_manager import STTStatus, STTResult
+
+
+class StreamingTranscriber:
+    """Interface for transcribers that consume audio while it is being recorded.
+
+    ``start`` opens a session, ``send_audio`` is called from the recording
+    thread with raw 16-bit mono PCM and must not wait on the network,
+    ``stop`` ends the recording and returns its session, and ``finish``
+    closes that session and returns the final ``STTResult``. A new session
+    can start while a stopped one is still being finished.
+    ``partial_transcript`` holds the running transcript at any point in
+    between.
+    """
+
+    partial_transcript = ""
+
+    def start(self):
+        raise NotImplementedError
+
+    def send_audio(self, pcm: bytes):
+        raise NotImplementedError
+
+    def stop(self):
+        raise NotImplementedError
+
+    def finish(self, session=None) -> STTResult:
+        raise NotImplementedError
+
+
+class StreamingSession:
+    """State of one recording's websocket session.
+
+    Every ``start`` gets a new session, so messages that arrive late on the
+    previous session's connection cannot leak into the next transcript.
+    Recorded audio waits on a bounded queue that the session's sender thread
+    drains, so a slow connection never holds up the microphone thread.
+    """
+
+    def __init__(self, max_queued_chunks=500):
+        self.websocket = None
+        self.connected = threading.Event()
+        self.terminated = threading.Event()
+        self.receiver = None
+        self.sender = None
+        # PCM chunks to send; None marks the end of the recording
+        self.audio = queue.Queue(maxsize=max_queued_chunks)
+        self.dropped_chunks = 0
+        # Set by stop(); the session is then finished by whoever stopped it, not abandoned
+        self.stopped = False
+        self.final_texts = []
+        self.partial_text = ""
+        self.error = None
+
+    @property
+    def transcript(self):
+        return " ".join(self.final_texts + [self.partial_text]).strip()
+
+
+class AssemblyAIStreamingTranscriber(StreamingTranscriber):
+    """Real-time transcription over the AssemblyAI websocket protocol.
+
+    ``url`` can point at a local stand-in server speaking the same protocol.
+    """
+
+    def __init__(
+            self,
+            api_key,
+            sample_rate=16000,
+            url="wss://api.assemblyai.com/v2/realtime/ws",
+            min_chunk_ms=100,
+            finish_timeout=5.0,
+            max_queued_chunks=500
+        ):
+        self.api_key = api_key
+        self.sample_rate = sample_rate
+        self.url = url
+        # The service rejects chunks shorter than 100 ms, so small frames are batched
+        self.min_chunk_bytes = int(sample_rate * 2 * min_chunk_ms / 1000)
+        self.finish_timeout = finish_timeout
+        # About 30 s of 1024-frame microphone buffers
+        self.max_queued_chunks = max_queued_chunks
+        self.lock = threading.Lock()
+        self.session = StreamingSession(max_queued_chunks)
+
+    @property
+    def partial_transcript(self):
+        return self.session.transcript
+
+    @property
+    def error(self):
+        return self.session.error
+
+    def start(self):
+        """Opens the websocket in the background so recording is not delayed."""
+        session = StreamingSession(self.max_queued_chunks)
+        with self.lock:
+            previous, self.session = self.session, session
+            abandoned = previous.receiver is not None and not previous.stopped
+            previous.stopped = True
+        if abandoned and not previous.terminated.is_set():
+            # An unfinished session from an abandoned recording; its receiver stops with the connection
+            previous.terminated.set()
+            if previous.websocket is not None:
+                previous.websocket.close()
+        session.receiver = threading.Thread(target=self._run, args=(session,), daemon=True)
+        session.receiver.start()
+        session.sender = threading.Thread(target=self._send, args=(session,), daemon=True)
+        session.sender.start()
+
+    def _run(self, session):
+        query = urlencode({"sample_rate": self.sample_rate})
+        try:
+            session.websocket = connect(
+                f"{self.url}?{query}",
+                additional_headers={"Authorization": self.api_key}
+            )
+        except Exception as e:
+            session.error = f"Failed to connect to streaming transcriber: {e}"
+            print(session.error)
+            session.connected.set()
+            session.terminated.set()
+            return
+        if session.terminated.is_set():
+            # Abandoned while connecting
+            session.websocket.close()
+            return
+        session.connected.set()
+        try:
+            for message in session.websocket:
+                self._handle_message(session, json.loads(message))
+                if session.terminated.is_set():
+                    break
+        except Exception as e:
+            if not session.terminated.is_set():
+                session.error = f"Streaming transcription failed: {e}"
+                print(session.error)
+        finally:
+            session.terminated.set()
+
+    def _handle_message(self, session, message):
+        message_type = message.get("message_type")
+        if message_type == "PartialTranscript":
+            session.partial_text = message.get("text", "")
+        elif message_type == "FinalTranscript":
+            if message.get("text"):
+                session.final_texts.append(message["text"])
+            session.partial_text = ""
+        elif message_type == "SessionTerminated":
+            session.terminated.set()
+        elif "error" in message:
+            session.error = message["error"]
+            print(f"Streaming transcription error: {session.error}")
+
+    def send_audio(self, pcm: bytes):
+        """Queues audio for the sender thread; called from the microphone thread."""
+        session = self.session
+        if not session.stopped:
+            self._enqueue(session, pcm)
+
+    def _enqueue(self, session, item):
+        while True:
+            try:
+                session.audio.put_nowait(item)
+                return
+            except queue.Full:
+                pass
+            # The connection is not keeping up; drop the oldest audio instead of blocking capture
+            try:
+                session.audio.get_nowait()
+                session.dropped_chunks += 1
+            except queue.Empty:
+                pass
+
+    def stop(self):
+        """Ends the recording's audio and returns its session for finish().
+
+        The sender then flushes the queued audio and asks the server to
+        finalize, while a new session may already be starting.
+        """
+        with self.lock:
+            session = self.session
+            if session.stopped:
+                return session
+            session.stopped = True
+        self._enqueue(session, None)
+        return session
+
+    def _send(self, session):
+        """Sends queued audio in chunks of at least ``min_chunk_bytes``, then ends the session."""
+        while not session.connected.wait(0.1):
+            if session.terminated.is_set():
+                # Abandoned while connecting
+                return
+        pending = bytearray()
+        while not session.terminated.is_set():
+            try:
+                pcm = session.audio.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if session.websocket is None or session.error:
+                # The connection failed; finish() reports the error
+                if pcm is None:
+                    return
+                continue
+            try:
+                if pcm is not None:
+                    pending += pcm
+                    if len(pending) >= self.min_chunk_bytes:
+                        self._send_chunk(session, pending)
+                        pending = bytearray()
+                    continue
+                if pending:
+                    self._send_chunk(session, pending)
+                session.websocket.send(json.dumps({"terminate_session": True}))
+            except Exception as e:
+                session.error = f"Failed to send audio for streaming transcription: {e}"
+                print(session.error)
+            return
+
+    def _send_chunk(self, session, pcm):
+        chunk = base64.b64encode(pcm).decode("utf-8")
+        session.websocket.send(json.dumps({"audio_data": chunk}))
+
+    def finish(self, session=None) -> STTResult:
+        """Waits for a stopped session to be finalized and returns its transcript.
+
+        Without a session the current one is stopped first.
+        """
+        if session is None:
+            session = self.stop()
+        if session.sender is not None:
+            session.sender.join(self.finish_timeout)
+        if session.dropped_chunks:
+            print(f"Streaming transcription dropped {session.dropped_chunks} audio chunks")
+        session.terminated.wait(self.finish_timeout)
+        if session.websocket is not None:
+            session.websocket.close()
+        if session.receiver is not None:
+            session.receiver.join(self.finish_timeout)
+        if session.error:
+            return STTResult(None, session.error, STTStatus.ERROR)
+        return STTResult(session.transcript, None, STTStatus.SUCCESS)
@@ -1,3 +1,5 @@
+import threading
+from collections import deque
 from dataclasses import dataclass
 from typing import Optional
 from enum import Enum
@@ -15,11 +17,47 @@ class STTResult:
     status: STTStatus
 
 class STTManager:
-    def __init__(self, transcriber) -> None:
+    def __init__(self, transcriber, streaming_transcriber=None) -> None:
         self.transcriber = transcriber
+        self.streaming_transcriber = streaming_transcriber
+        self.streaming = False
+        # A recording's transcription can still be finishing when the next recording starts
+        self.lock = threading.Lock()
+        self.stopped_sessions = deque()
+
+    def start_stream(self):
+        """Starts a streaming session so audio is transcribed while it is recorded."""
+        if self.streaming_transcriber is not None:
+            with self.lock:
+                self.streaming_transcriber.start()
+                self.streaming = True
+
+    def stop_stream(self):
+        """Ends the recording's stream; its transcript is collected by the next transcription."""
+        with self.lock:
+            self._stop_stream()
+
+    def _stop_stream(self):
+        if self.streaming:
+            self.streaming = False
+            self.stopped_sessions.append(self.streaming_transcriber.stop())
+
+    def feed_audio(self, pcm: bytes):
+        if self.streaming:
+            self.streaming_transcriber.send_audio(pcm)
 
     def transcribe_audio_file(self, event: ApplicationEvent):
-        result: STTResult = self.transcriber.transcribe_audio_file(event.request)
+        result: STTResult = None
+        with self.lock:
+            self._stop_stream()
+            session = self.stopped_sessions.popleft() if self.stopped_sessions else None
+        if session is not None:
+            result = self.streaming_transcriber.finish(session)
+            if result.status != STTStatus.SUCCESS:
+                print(f"Streaming transcription failed, uploading recording instead: {result.error}")
+                result = None
+        if result is None:
+            result = self.transcriber.transcribe_audio_file(event.request)
         if result.status == STTStatus.SUCCESS:
             event.result = result.text
             event.status = ProcessingStatus.SUCCESS
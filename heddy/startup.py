@@ -0,0 +1,47 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from heddy.metrics import metrics
+
+
+class StartupProfiler:
+    """Records how long each startup phase and heavy import takes.
+
+    Phases may run concurrently on different threads; ``report()`` prints
+    them in start order with their offset from boot, duration and thread.
+    Heavy imports are timed as their own phases, which gives a coarse
+    ``python -X importtime``-style breakdown.
+    """
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.lock = threading.Lock()
+        self.phases = []
+
+    @contextmanager
+    def phase(self, name):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            finished_at = time.perf_counter()
+            with self.lock:
+                self.phases.append((name, started_at, finished_at, threading.current_thread().name))
+            metrics.record_timing(f"startup.{name}", finished_at - started_at)
+
+    def elapsed(self):
+        return time.perf_counter() - self.started_at
+
+    def report(self):
+        print(f"{'startup phase':40} {'start ms':>9} {'took ms':>9}  thread")
+        with self.lock:
+            phases = sorted(self.phases, key=lambda phase: phase[1])
+        for name, started_at, finished_at, thread in phases:
+            print(f"{name:40} {(started_at - self.started_at) * 1000:9.1f} "
+                  f"{(finished_at - started_at) * 1000:9.1f}  {thread}")
+        print(f"{'ready':40} {self.elapsed() * 1000:9.1f}")
+
+
+# Global instance to be used outside this script
+profiler = StartupProfiler()
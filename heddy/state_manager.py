@@ -1,9 +0,0 @@
-class SingletonMeta(type):
-    _instances = {}
-    def __call__(cls, *args, **kwargs):
-        if cls not in cls._instances:
-            cls._instances[cls] = super().__call__(*args, **kwargs)
-        return cls._instances[cls]
-
-class StateManager(metaclass=SingletonMeta):
-    last_interaction_time = None
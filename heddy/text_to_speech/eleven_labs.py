@@ -1,29 +1,57 @@
-import requests
-from heddy.text_to_speech.text_to_speach_manager import TTSStatus, TTSResult
+import time
+from heddy.transport import get_transport
+from heddy.text_to_speech.text_to_speach_manager import TTSStatus, TTSResult, AudioStream
+
+
+# Sample rates of the raw 16-bit mono PCM output formats offered by the API
+PCM_SAMPLE_RATES = (16000, 22050, 24000, 44100)
+
+
+def pcm_format_for_rate(rate):
+    """Returns the PCM output format closest to an output device rate.
+
+    An exact match is used when available, otherwise the highest rate that
+    divides the device rate evenly (e.g. 24000 for 48000), otherwise the
+    highest rate below it.
+    """
+    if rate in PCM_SAMPLE_RATES:
+        return f"pcm_{rate}"
+    divisors = [candidate for candidate in PCM_SAMPLE_RATES if rate % candidate == 0]
+    lower = [candidate for candidate in PCM_SAMPLE_RATES if candidate < rate]
+    return f"pcm_{max(divisors or lower or PCM_SAMPLE_RATES[:1])}"
 
 
 class ElevenLabsManager:
-    def __init__(self, api_key):
+    def __init__(self, api_key, stream=True, chunk_size=4096, transport=None, base_url="https://api.elevenlabs.io",
+                 output_format="mp3_44100_128"):
         self.api_key = api_key
+        self.transport = transport or get_transport()
         self.voice_id = "RXZFrCz94YM9cSj7aieu"
         self.model_id = "eleven_turbo_v2"
-        self.url = f"https://api.elevenlabs.io/v1/text-to-speech/{self.voice_id}/stream"
+        self.url = f"{base_url}/v1/text-to-speech/{self.voice_id}/stream"
+        self.output_format = output_format
+        self.optimize_streaming_latency = 0
+        self.voice_settings = {
+            "similarity_boost": 1.0,
+            "stability": 1.0,
+            "style": 1.0,
+            "use_speaker_boost": True
+        }
+        # When streaming, the response body is handed to the player chunk by chunk
+        # instead of being downloaded in full first
+        self.stream = stream
+        self.chunk_size = chunk_size
 
     def __call__(self, text):
         query_params = {
-            "optimize_streaming_latency": 0,
-            "output_format": "mp3_44100_128"
+            "optimize_streaming_latency": self.optimize_streaming_latency,
+            "output_format": self.output_format
         }
 
         payload = {
             "model_id": self.model_id,
             "text": text,
-            "voice_settings": {
-                "similarity_boost": 1.0,
-                "stability": 1.0,
-                "style": 1.0,
-                "use_speaker_boost": True
-            }
+            "voice_settings": self.voice_settings
         }
 
         headers = {
@@ -31,11 +59,27 @@ class ElevenLabsManager:
             "Xi-Api-Key": self.api_key
         }
 
-        response = requests.post(self.url, params=query_params, json=payload, headers=headers)
+        started_at = time.perf_counter()
+        response = self.transport.post(self.url, params=query_params, json=payload, headers=headers, stream=self.stream)
 
         if response.status_code != 200:
-            return TTSResult(status=TTSStatus.ERROR, error=response.text)
-        return TTSResult(
-            status=TTSStatus.SUCCESS,
-            audio=response.content
-        )
\ No newline at end of file
+            try:
+                return TTSResult(status=TTSStatus.ERROR, error=response.text)
+            finally:
+                response.close()
+        if self.stream:
+            return TTSResult(
+                status=TTSStatus.SUCCESS,
+                audio_stream=AudioStream(
+                    response.iter_content(chunk_size=self.chunk_size),
+                    started_at=started_at,
+                    on_close=response.close
+                )
+            )
+        try:
+            return TTSResult(
+                status=TTSStatus.SUCCESS,
+                audio=response.content
+            )
+        finally:
+            response.close()
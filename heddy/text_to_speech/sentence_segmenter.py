@@ -0,0 +1,66 @@
+import re
+
+# A sentence ends with terminal punctuation (optionally followed by closing
+# quotes/brackets) and whitespace, or with a line break
+SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*\s+|\n+")
+
+ABBREVIATIONS = {"mr.", "mrs.", "ms.", "dr.", "st.", "vs.", "etc.", "e.g.", "i.e.", "approx."}
+
+
+class SentenceSegmenter:
+    """Incrementally splits streamed text deltas into speakable segments.
+
+    Short sentences are coalesced until a segment reaches ``min_chars`` so TTS
+    is not called for every "Sure." on its own. The first segment uses the
+    lower ``first_min_chars`` threshold so the reply starts playing early.
+    """
+
+    def __init__(self, min_chars=60, first_min_chars=20):
+        self.min_chars = min_chars
+        self.first_min_chars = first_min_chars
+        self.buffer = ""
+        self.pending = ""
+        self.emitted = 0
+
+    def feed(self, delta):
+        """Adds a text delta and returns the list of segments that are ready to speak."""
+        if not delta:
+            return []
+        self.buffer += delta
+        segments = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.buffer):
+            sentence = self.buffer[start:match.end()]
+            if self._is_abbreviation(sentence):
+                continue
+            start = match.end()
+            segment = self._coalesce(sentence)
+            if segment:
+                segments.append(segment)
+        self.buffer = self.buffer[start:]
+        return segments
+
+    def flush(self):
+        """Returns whatever text is left once the stream has finished."""
+        remainder = (self.pending + self.buffer).strip()
+        self.pending = ""
+        self.buffer = ""
+        if not remainder:
+            return []
+        self.emitted += 1
+        return [remainder]
+
+    def _coalesce(self, sentence):
+        self.pending += sentence
+        threshold = self.first_min_chars if self.emitted == 0 else self.min_chars
+        if len(self.pending.strip()) < threshold:
+            return None
+        segment = self.pending.strip()
+        self.pending = ""
+        self.emitted += 1
+        return segment
+
+    @staticmethod
+    def _is_abbreviation(sentence):
+        words = sentence.split()
+        return bool(words) and words[-1].lower() in ABBREVIATIONS
@@ -0,0 +1,140 @@
+import threading
+from queue import Empty, Queue
+
+from heddy.text_to_speech.text_to_speach_manager import TTSStatus
+from heddy.tracing import tracer
+
+# Marks the end of a reply in both queues
+END_OF_REPLY = object()
+# Stops both workers
+CLOSE = object()
+
+
+class SpeechPipeline:
+    """Bounded producer/consumer pipeline: text segments -> synthesis -> playback.
+
+    Segments are synthesized on one worker thread and played on another, so
+    the next sentence is being synthesized while the current one is playing.
+    Both queues are bounded, which applies backpressure to the producer when
+    synthesis or playback falls behind. ``cancel()`` drops the rest of the
+    current reply, e.g. when the user interrupts it with the wake word.
+    """
+
+    def __init__(self, synthesizer, audio_player, max_pending=2, session_id=None):
+        self.synthesizer = synthesizer
+        self.audio_player = audio_player
+        self.text_queue = Queue(maxsize=max_pending)
+        self.audio_queue = Queue(maxsize=max_pending)
+        self.reply_done = threading.Event()
+        self.reply_done.set()
+        self.cancelled = threading.Event()
+        # Spans from the workers belong to this session's turns in server mode
+        self.session_id = session_id
+        self.synthesis_thread = threading.Thread(target=self._synthesis_worker, daemon=True)
+        self.playback_thread = threading.Thread(target=self._playback_worker, daemon=True)
+        self.synthesis_thread.start()
+        self.playback_thread.start()
+
+    def start_reply(self):
+        """Prepares the pipeline for a new reply.
+
+        A cancellation is not cleared here, since the wake word may already
+        have interrupted this reply; see ``clear_cancel()``.
+        """
+        self.reply_done.clear()
+
+    def clear_cancel(self):
+        """Lets the next reply play after an interruption."""
+        self.cancelled.clear()
+
+    def submit(self, text):
+        """Queues a text segment for synthesis, blocking while the pipeline is full."""
+        if text and text.strip():
+            self.text_queue.put(text)
+
+    def finish_reply(self):
+        """Signals that no more segments will be submitted for the current reply."""
+        self.text_queue.put(END_OF_REPLY)
+
+    def wait(self, timeout=None):
+        """Blocks until everything submitted for the current reply has been played."""
+        return self.reply_done.wait(timeout)
+
+    def cancel(self):
+        """Drops every pending segment of the current reply and stops the one playing.
+
+        The end-of-reply marker still flows through, so ``wait()`` returns once
+        the producer has called ``finish_reply()``.
+        """
+        self.cancelled.set()
+        self._drain(self.text_queue)
+        self._drain(self.audio_queue)
+        self.audio_player.stop()
+
+    def close(self):
+        """Stops the worker threads once everything queued before has been handled."""
+        self.text_queue.put(CLOSE)
+
+    def _drain(self, queue):
+        markers = []
+        while True:
+            try:
+                item = queue.get_nowait()
+            except Empty:
+                break
+            if item is END_OF_REPLY or item is CLOSE:
+                markers.append(item)
+            else:
+                self._discard(item)
+        for marker in markers:
+            queue.put(marker)
+
+    @staticmethod
+    def _discard(audio):
+        # Closing a queued stream aborts its download
+        close = getattr(audio, "close", None)
+        if close is not None:
+            close()
+
+    def _synthesis_worker(self):
+        tracer.bind(self.session_id)
+        while True:
+            text = self.text_queue.get()
+            if text is CLOSE:
+                self.audio_queue.put(CLOSE)
+                return
+            if text is END_OF_REPLY:
+                self.audio_queue.put(END_OF_REPLY)
+                continue
+            if self.cancelled.is_set():
+                continue
+            try:
+                result = self.synthesizer(text)
+            except Exception as e:
+                print(f"Failed to synthesize segment: {e}")
+                continue
+            if result.status != TTSStatus.SUCCESS:
+                print(f"Failed to synthesize segment: {result.error}")
+                continue
+            audio = result.audio_stream if result.audio_stream is not None else result.audio
+            if self.cancelled.is_set():
+                self._discard(audio)
+                continue
+            self.audio_queue.put(audio)
+
+    def _playback_worker(self):
+        tracer.bind(self.session_id)
+        while True:
+            audio = self.audio_queue.get()
+            if audio is CLOSE:
+                return
+            if audio is END_OF_REPLY:
+                self.reply_done.set()
+                continue
+            if self.cancelled.is_set():
+                self._discard(audio)
+                continue
+            try:
+                self.audio_player.play_audio(audio)
+            except Exception as e:
+                print(f"Failed to play segment: {e}")
@@ -1,7 +1,10 @@
+import time
 from dataclasses import dataclass
 from enum import Enum
-from typing import Optional
+from typing import Iterator, Optional
 from heddy.application_event import ApplicationEvent, ApplicationEventType, ProcessingStatus
+from heddy.metrics import metrics
+from heddy.tracing import tracer
 
 class TTSStatus(Enum):
     SUCCESS = 1
@@ -13,19 +16,62 @@ class TTSResult:
     status: TTSStatus
     audio: Optional[bytes] = None
     error: Optional[str] = None
-    
+    audio_stream: Optional[Iterator[bytes]] = None
+
+
+class AudioStream:
+    """Iterator over synthesized audio chunks that reports time-to-first-audio.
+
+    The clock starts when the synthesis request is issued and stops when the
+    player pulls the first non-empty chunk. ``close()`` aborts the download
+    of the remaining chunks; it is also called once the chunks run out.
+    """
+
+    def __init__(self, chunks, started_at=None, on_close=None):
+        self.chunks = iter(chunks)
+        self.started_at = started_at or time.perf_counter()
+        self.time_to_first_audio = None
+        self.on_close = on_close
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            chunk = next(self.chunks)
+            while not chunk:
+                chunk = next(self.chunks)
+        except StopIteration:
+            # Release the connection as soon as the body is exhausted
+            self.close()
+            raise
+        if self.time_to_first_audio is None:
+            self.time_to_first_audio = time.perf_counter() - self.started_at
+            metrics.record_timing("tts.time_to_first_audio", self.time_to_first_audio)
+            tracer.record_span("tts.time_to_first_audio", self.started_at)
+        return chunk
+
+    def close(self):
+        close = getattr(self.chunks, "close", None)
+        if close is not None:
+            close()
+        on_close, self.on_close = self.on_close, None
+        if on_close is not None:
+            on_close()
+
+
 class TTSManager:
     def __init__(self, synthesizer):
         self.synthesizer = synthesizer
-    
+
     def synthesize(self, event: ApplicationEvent):
         result: TTSResult = self.synthesizer(event.request)
 
         if result.status == TTSStatus.SUCCESS:
-            event.result = result.audio
+            event.result = result.audio_stream if result.audio_stream is not None else result.audio
             event.status = ProcessingStatus.SUCCESS
         else:
             event.error = result.error
             event.status = ProcessingStatus.ERROR
-        
+
         return event
@@ -0,0 +1,214 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from heddy.metrics import metrics
+from heddy.text_to_speech.text_to_speach_manager import TTSStatus, TTSResult
+
+
+def normalize_text(text):
+    return re.sub(r"\s+", " ", text).strip()
+
+
+class CachedSynthesizer:
+    """Content-addressed cache around a synthesizer such as ElevenLabsManager.
+
+    Audio is keyed on everything that changes the rendered output: voice,
+    model, voice settings, output format and the normalized text. Entries live
+    in an in-memory LRU bounded by ``max_bytes`` and, when ``cache_dir`` is
+    set, in files that survive restarts, least recently used first evicted
+    once they exceed ``max_disk_bytes``. Hits never touch the network.
+    """
+
+    def __init__(self, synthesizer, max_bytes=16 * 1024 * 1024, cache_dir=None, warmup_phrases=(),
+                 max_disk_bytes=256 * 1024 * 1024):
+        self.synthesizer = synthesizer
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.warmup_phrases = list(warmup_phrases)
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.memory_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        # key -> file size, least recently used first; recency survives restarts as the file mtime
+        self.disk_entries = OrderedDict()
+        self.disk_bytes = 0
+        self.disk_evictions = 0
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._load_disk_entries()
+
+    def _load_disk_entries(self):
+        files = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, entry.name, stat.st_size))
+        for _, key, size in sorted(files):
+            self.disk_entries[key] = size
+            self.disk_bytes += size
+        self._evict_disk()
+
+    def cache_key(self, text):
+        identity = {
+            "voice_id": getattr(self.synthesizer, "voice_id", None),
+            "model_id": getattr(self.synthesizer, "model_id", None),
+            "voice_settings": getattr(self.synthesizer, "voice_settings", None),
+            "output_format": getattr(self.synthesizer, "output_format", None),
+            "text": normalize_text(text),
+        }
+        return hashlib.sha256(json.dumps(identity, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def __call__(self, text):
+        key = self.cache_key(text)
+        audio = self.get(key)
+        if audio is not None:
+            return TTSResult(status=TTSStatus.SUCCESS, audio=audio)
+
+        with self.lock:
+            self.misses += 1
+        metrics.increment("tts_cache.misses")
+        result = self.synthesizer(text)
+        if result.status != TTSStatus.SUCCESS:
+            return result
+        if result.audio_stream is not None:
+            return TTSResult(status=TTSStatus.SUCCESS, audio_stream=self._tee(key, result.audio_stream))
+        self.put(key, result.audio)
+        return result
+
+    def _tee(self, key, audio_stream):
+        """Passes chunks through to the player and stores the audio once the stream completes."""
+        chunks = []
+        try:
+            for chunk in audio_stream:
+                chunks.append(chunk)
+                yield chunk
+        finally:
+            # Closing the tee early (barge-in) aborts the download without caching a partial clip
+            close = getattr(audio_stream, "close", None)
+            if close is not None:
+                close()
+        self.put(key, b"".join(chunks))
+
+    def get(self, key):
+        with self.lock:
+            audio = self.entries.get(key)
+            if audio is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                self.bytes_served += len(audio)
+        if audio is not None:
+            metrics.increment("tts_cache.hits")
+            return audio
+
+        path = self._path(key)
+        if path and os.path.exists(path):
+            try:
+                with open(path, "rb") as audio_file:
+                    audio = audio_file.read()
+                os.utime(path)
+            except OSError:
+                # Evicted meanwhile
+                return None
+            with self.lock:
+                if key in self.disk_entries:
+                    self.disk_entries.move_to_end(key)
+            self._remember(key, audio)
+            with self.lock:
+                self.hits += 1
+                self.disk_hits += 1
+                self.bytes_served += len(audio)
+            metrics.increment("tts_cache.hits")
+            return audio
+        return None
+
+    def put(self, key, audio):
+        if not audio:
+            return
+        self._remember(key, audio)
+        path = self._path(key)
+        if path and not os.path.exists(path):
+            temp_path = f"{path}.{threading.get_ident()}.tmp"
+            try:
+                with open(temp_path, "wb") as audio_file:
+                    audio_file.write(audio)
+                os.replace(temp_path, path)
+            except OSError as e:
+                print(f"Failed to write TTS cache entry: {e}")
+                return
+            with self.lock:
+                if key not in self.disk_entries:
+                    self.disk_entries[key] = len(audio)
+                    self.disk_bytes += len(audio)
+            self._evict_disk()
+
+    def _evict_disk(self):
+        evicted = []
+        with self.lock:
+            while self.disk_bytes > self.max_disk_bytes and self.disk_entries:
+                key, size = self.disk_entries.popitem(last=False)
+                self.disk_bytes -= size
+                self.disk_evictions += 1
+                evicted.append(key)
+        for key in evicted:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _remember(self, key, audio):
+        if len(audio) > self.max_bytes:
+            return
+        with self.lock:
+            if key in self.entries:
+                self.memory_bytes -= len(self.entries.pop(key))
+            self.entries[key] = audio
+            self.memory_bytes += len(audio)
+            while self.memory_bytes > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.memory_bytes -= len(evicted)
+
+    def _path(self, key):
+        if not self.cache_dir:
+            return None
+        return os.path.join(self.cache_dir, key)
+
+    def warmup(self, phrases=None):
+        """Synthesizes the given phrases (or the configured list) in the background."""
+        phrases = list(phrases) if phrases is not None else self.warmup_phrases
+        thread = threading.Thread(target=self._warmup, args=(phrases,), daemon=True)
+        thread.start()
+        return thread
+
+    def _warmup(self, phrases):
+        for phrase in phrases:
+            try:
+                result = self(phrase)
+                if result.audio_stream is not None:
+                    # Draining the stream is what stores it in the cache
+                    for _ in result.audio_stream:
+                        pass
+            except Exception as e:
+                print(f"Failed to warm up TTS cache for '{phrase}': {e}")
+        print(f"TTS cache warmed up: {self.stats()}")
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self.entries),
+                "memory_bytes": self.memory_bytes,
+                "disk_entries": len(self.disk_entries),
+                "disk_bytes": self.disk_bytes,
+                "disk_evictions": self.disk_evictions,
+                "bytes_served": self.bytes_served,
+            }
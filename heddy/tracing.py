@@ -0,0 +1,186 @@
+import itertools
+import json
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+
+
+class Span:
+    """A timed section of a turn; use as a context manager or call ``end()``."""
+
+    def __init__(self, tracer, turn, name, parent_id, attributes):
+        self.tracer = tracer
+        self.turn = turn
+        self.name = name
+        self.span_id = next(tracer.span_ids)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.started_at = time.perf_counter()
+        self.ended_at = None
+
+    def end(self, **attributes):
+        if self.ended_at is not None:
+            return
+        self.ended_at = time.perf_counter()
+        self.attributes.update(attributes)
+        self.tracer._finish(self)
+
+    def __enter__(self):
+        self.tracer._push(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.tracer._pop(self)
+        if exc_type is not None:
+            self.attributes["error"] = repr(exc_value)
+        self.end()
+        return False
+
+
+class Turn:
+    def __init__(self):
+        self.turn_id = uuid.uuid4().hex[:12]
+        self.started_at = time.perf_counter()
+        self.wall_time = datetime.now(timezone.utc).isoformat()
+        self.span_count = 0
+
+
+class Tracer:
+    """Per-turn latency tracing written to a rotating JSON-lines file.
+
+    A turn runs from the wake word until the reply has been played. Every
+    span opened while a turn is active is written as one line with the turn
+    ID, its parent span, its start offset from the beginning of the turn and
+    its duration; the turn itself is written as a final line when it ends.
+    Spans outside a turn (e.g. the startup greeting) are not recorded.
+
+    In server mode every session has its own current turn. Threads working
+    for a session call ``bind(session)`` once, and their spans go to that
+    session's turn; unbound threads use the turn of the local device.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.span_ids = itertools.count(1)
+        # Current turn per session; None is the local device
+        self.turns = {}
+        self.logger = logging.getLogger("heddy.trace")
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+        self.handler = None
+
+    def configure(self, path, max_bytes=5 * 1024 * 1024, backup_count=5):
+        """Starts writing traces to ``path``, rotated at ``max_bytes``; an empty path disables writing."""
+        if self.handler is not None:
+            self.logger.removeHandler(self.handler)
+            self.handler.close()
+            self.handler = None
+        if path:
+            self.handler = RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+            self.handler.setFormatter(logging.Formatter("%(message)s"))
+            self.logger.addHandler(self.handler)
+
+    @property
+    def enabled(self):
+        return self.handler is not None
+
+    @property
+    def turn(self):
+        """The current turn of the session bound to the calling thread."""
+        return self.turns.get(self.session)
+
+    @property
+    def session(self):
+        """The session bound to the calling thread."""
+        return getattr(self.local, "session", None)
+
+    def bind(self, session):
+        """Attributes spans opened on the calling thread to ``session``."""
+        self.local.session = session
+
+    def start_turn(self, session=None):
+        """Starts a new turn, ending the previous one if it is still open."""
+        self.end_turn(session)
+        turn = Turn()
+        with self.lock:
+            self.turns[session] = turn
+        return turn.turn_id
+
+    def end_turn(self, session=None):
+        with self.lock:
+            turn = self.turns.pop(session, None)
+        if turn is None:
+            return
+        record = {
+            "type": "turn",
+            "turn": turn.turn_id,
+            "name": "turn",
+            "time": turn.wall_time,
+            "duration": time.perf_counter() - turn.started_at,
+            "spans": turn.span_count,
+        }
+        if session is not None:
+            record["session"] = session
+        self._write(record)
+
+    def span(self, name, **attributes):
+        """Starts a span in the current turn, nested under the span open on this thread.
+
+        Used with ``with`` it becomes the parent of spans opened inside it;
+        otherwise it is ended explicitly, possibly from another thread.
+        """
+        stack = self._stack()
+        parent_id = stack[-1].span_id if stack else None
+        return Span(self, self.turn, name, parent_id, attributes)
+
+    def record_span(self, name, started_at, ended_at=None, **attributes):
+        """Records a span measured elsewhere from ``time.perf_counter()`` timestamps."""
+        span = self.span(name, **attributes)
+        span.started_at = started_at
+        span.ended_at = ended_at if ended_at is not None else time.perf_counter()
+        self._finish(span)
+
+    def _stack(self):
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def _push(self, span):
+        self._stack().append(span)
+
+    def _pop(self, span):
+        stack = self._stack()
+        if span in stack:
+            stack.remove(span)
+
+    def _finish(self, span):
+        turn = span.turn
+        if turn is None or not self.enabled:
+            return
+        with self.lock:
+            turn.span_count += 1
+        record = {
+            "type": "span",
+            "turn": turn.turn_id,
+            "name": span.name,
+            "span_id": span.span_id,
+            "parent": span.parent_id,
+            "start": span.started_at - turn.started_at,
+            "duration": span.ended_at - span.started_at,
+            "thread": threading.current_thread().name,
+        }
+        record.update(span.attributes)
+        self._write(record)
+
+    def _write(self, record):
+        if self.enabled:
+            self.logger.info(json.dumps(record, default=str))
+
+
+# Global instance to be used outside this script
+tracer = Tracer()
@@ -0,0 +1,252 @@
+import socket
+import threading
+import time
+import weakref
+from functools import partial
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from heddy.metrics import metrics
+from heddy.tracing import tracer
+
+
+class HTTPTransport:
+    """Owns pooled keep-alive HTTP sessions for every outbound provider call.
+
+    One ``requests.Session`` is kept per host so TCP and TLS connections are
+    reused across requests. Every request gets connect/read timeouts unless
+    the caller passes its own, and responses are gzip-negotiated.
+    """
+
+    def __init__(self, pool_maxsize=4, connect_timeout=3.05, read_timeout=60):
+        self.pool_maxsize = pool_maxsize
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.lock = threading.Lock()
+        self.sessions = {}
+        self.adapters = {}
+        self._httpx_client = None
+        # Pre-warmed connections no request has used yet, with their socket and warm-up time
+        self.prewarmed = weakref.WeakKeyDictionary()
+        self.prewarm_hits = {}
+        self.prewarm_misses = {}
+
+    def session(self, url):
+        """Returns the pooled session for the host of the given URL."""
+        host = urlparse(url).netloc
+        with self.lock:
+            session = self.sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                session.headers["Accept-Encoding"] = "gzip, deflate"
+                self.sessions[host] = session
+                self.adapters[host] = adapter
+            return session
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", (self.connect_timeout, self.read_timeout))
+        host = urlparse(url).netloc
+        kwargs["hooks"] = _add_hook(kwargs.get("hooks"), partial(self._count_prewarm, host))
+        with tracer.span(f"http.{method}", host=host):
+            return self.session(url).request(method, url, **kwargs)
+
+    def _count_prewarm(self, host, response, **kwargs):
+        # Response hooks run before the body is read, while the response still holds its connection
+        conn = getattr(response.raw, "connection", None)
+        if conn is None:
+            return
+        with self.lock:
+            entry = self.prewarmed.pop(conn, None)
+            if entry is None:
+                return
+            sock, prewarmed_at = entry
+            # A dropped connection is reopened in place, on a new socket
+            hit = conn.sock is sock
+            counts = self.prewarm_hits if hit else self.prewarm_misses
+            counts[host] = counts.get(host, 0) + 1
+        metrics.increment("transport.prewarm_hits" if hit else "transport.prewarm_misses")
+        metrics.record_timing("transport.prewarm_age", time.monotonic() - prewarmed_at)
+
+    def prewarm(self, url):
+        """Resolves the host and opens a keep-alive connection that later requests can reuse.
+
+        No request is sent: the TCP and TLS handshakes are done on a
+        connection taken from the pool a request to ``url`` would use, which
+        then goes back to the pool idle. The connection is remembered so the
+        request reusing it counts as a pre-warm hit.
+        """
+        pool = self._connection_pool(url)
+        conn = pool._get_conn()
+        try:
+            if conn.sock is None:
+                conn.connect()
+                with self.lock:
+                    self.prewarmed[conn] = (conn.sock, time.monotonic())
+        except Exception:
+            conn.close()
+            raise
+        finally:
+            pool._put_conn(conn)
+
+    def _connection_pool(self, url):
+        """Returns the urllib3 pool the session's adapter sends requests to ``url`` through."""
+        session = self.session(url)
+        adapter = session.get_adapter(url)
+        # The pool key includes the TLS and proxy settings, which requests takes from the environment
+        settings = session.merge_environment_settings(url, {}, None, None, None)
+        if hasattr(adapter, "get_connection_with_tls_context"):
+            request = requests.Request("GET", url).prepare()
+            return adapter.get_connection_with_tls_context(
+                request, settings["verify"], proxies=settings["proxies"], cert=settings["cert"]
+            )
+        return adapter.get_connection(url, settings["proxies"])
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def httpx_client(self):
+        """Returns a shared pooled httpx client for SDKs that accept one (e.g. openai.OpenAI)."""
+        import httpx
+
+        with self.lock:
+            if self._httpx_client is None:
+                self._httpx_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=self.pool_maxsize * 4,
+                        max_keepalive_connections=self.pool_maxsize * 4
+                    ),
+                    timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                    event_hooks={"request": [_trace_httpx_request], "response": [_trace_httpx_response]}
+                )
+            return self._httpx_client
+
+    def stats(self):
+        """Returns per-host request, connection and connection-reuse counts."""
+        stats = {}
+        with self.lock:
+            adapters = dict(self.adapters)
+        for host, adapter in adapters.items():
+            requests_sent = 0
+            connections_opened = 0
+            pools = adapter.poolmanager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                requests_sent += pool.num_requests
+                connections_opened += pool.num_connections
+            stats[host] = {
+                "requests": requests_sent,
+                "connections": connections_opened,
+                "reused": max(requests_sent - connections_opened, 0),
+                "prewarm_hits": self.prewarm_hits.get(host, 0),
+                "prewarm_misses": self.prewarm_misses.get(host, 0),
+            }
+        return stats
+
+    def close(self):
+        with self.lock:
+            for session in self.sessions.values():
+                session.close()
+            self.sessions.clear()
+            self.adapters.clear()
+            if self._httpx_client is not None:
+                self._httpx_client.close()
+                self._httpx_client = None
+
+
+def _add_hook(hooks, hook):
+    """Appends a response hook to the hooks a caller passed to requests."""
+    hooks = dict(hooks or {})
+    response_hooks = hooks.get("response", [])
+    if callable(response_hooks):
+        response_hooks = [response_hooks]
+    hooks["response"] = list(response_hooks) + [hook]
+    return hooks
+
+
+def _trace_httpx_request(request):
+    request.extensions["trace_started_at"] = time.perf_counter()
+
+
+def _trace_httpx_response(response):
+    # Response hooks run once the headers have arrived, before a streamed body is read
+    started_at = response.request.extensions.get("trace_started_at")
+    if started_at is not None:
+        tracer.record_span(
+            f"http.{response.request.method}",
+            started_at,
+            host=response.request.url.host,
+            status=response.status_code
+        )
+
+
+class ConnectionPrewarmer:
+    """Opens connections to the provider hosts in the background, e.g. on the wake word.
+
+    ``urls`` are warmed in the requests-based transport pools without sending
+    a request. ``openai_clients`` are warmed with their cheapest documented
+    request, listing the models, which opens a connection in the httpx client
+    the SDK uses. For ``resolve_urls`` (e.g. websocket endpoints opened per
+    session) only DNS is resolved. Hosts warmed less than ``min_interval``
+    seconds ago are skipped.
+    """
+
+    def __init__(self, transport, urls=(), openai_clients=(), resolve_urls=(), min_interval=10.0):
+        self.transport = transport
+        self.urls = list(urls)
+        self.openai_clients = list(openai_clients)
+        self.resolve_urls = list(resolve_urls)
+        self.min_interval = min_interval
+        self.last_prewarm = {}
+        # Wake words can start overlapping pre-warms
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        thread = threading.Thread(target=self._prewarm, daemon=True)
+        thread.start()
+        return thread
+
+    def _prewarm(self):
+        started_at = time.perf_counter()
+        for url, prewarm in [(url, partial(self.transport.prewarm, url)) for url in self.urls] + \
+                [(str(client.base_url), partial(prewarm_openai, client)) for client in self.openai_clients] + \
+                [(url, partial(resolve, url)) for url in self.resolve_urls]:
+            now = time.monotonic()
+            with self.lock:
+                if now - self.last_prewarm.get(url, float("-inf")) < self.min_interval:
+                    continue
+                self.last_prewarm[url] = now
+            try:
+                prewarm()
+            except Exception as e:
+                print(f"Failed to pre-warm connection to {url}: {e}")
+        metrics.record_timing("transport.prewarm", time.perf_counter() - started_at)
+
+
+def prewarm_openai(client):
+    """Lists the models, a cheap documented GET that opens a connection in the client's pool."""
+    client.models.list()
+
+
+def resolve(url):
+    """Resolves the host of a URL so the system resolver has it cached."""
+    parsed = urlparse(url)
+    default_port = 443 if parsed.scheme in ("https", "wss") else 80
+    socket.getaddrinfo(parsed.hostname, parsed.port or default_port, type=socket.SOCK_STREAM)
+
+
+# Global instance to be used outside this script
+default_transport = HTTPTransport()
+
+
+def get_transport():
+    return default_transport
@@ -3,7 +3,11 @@ import os
 import base64
 import uuid
 import threading
-import requests
+import time
+import cv2
+from heddy.image_preprocessor import EncodedImage, Base64JSONBody
+from heddy.metrics import metrics
+from heddy.transport import get_transport
 
 image_description = ""
 
@@ -13,9 +17,24 @@ def process_image(image_path):
     image_description = generated_description
 
 class VisionModule:
-    def __init__(self, openai_api_key):
+    def __init__(self, openai_api_key, transport=None, frame_grabber=None, preprocessor=None,
+                 base_url="https://api.openai.com/v1"):
         self.api_key = openai_api_key
+        self.url = f"{base_url}/chat/completions"
+        self.transport = transport or get_transport()
+        # When a FrameGrabber is set, snapshots come from memory instead of fswebcam
+        self.frame_grabber = frame_grabber
+        # When an ImagePreprocessor is set, images are downscaled and recompressed before upload
+        self.preprocessor = preprocessor
+        self.image_path = None
+        self.frame = None
         self.capture_complete = threading.Event()
+        # Snapshot captured and encoded ahead of time while the user is still talking
+        self.snapshot_ready = threading.Event()
+        self.snapshot_pending = False
+        self.prepared_image = None
+        # Description of the latest snapshot, attached to messages by the send_image_description tool
+        self.last_description = None
 
     def capture_image_async(self):
         """Initiates the image capture process in a new thread."""
@@ -24,6 +43,27 @@ class VisionModule:
         thread.start()
 
     def capture_image(self):
+        """Captures an image, from the frame grabber if there is one, otherwise with fswebcam."""
+        started_at = time.perf_counter()
+        self.image_path = None
+        self.frame = None
+        if self.frame_grabber is not None:
+            self.capture_frame()
+        else:
+            self.capture_image_with_fswebcam()
+        metrics.record_timing("vision.capture", time.perf_counter() - started_at)
+
+    def capture_frame(self):
+        """Copies the latest frame from the frame grabber."""
+        frame = self.frame_grabber.snapshot()
+        if frame is None:
+            print("Failed to capture image: no frame available.")
+        else:
+            self.frame = frame.image
+            print(f"Image captured successfully: frame {frame.sequence}")
+        self.capture_complete.set()
+
+    def capture_image_with_fswebcam(self):
         """Captures an image using fswebcam and saves it as a PNG file."""
         image_file_name = f"{uuid.uuid4()}.png"
         self.image_path = f"/tmp/{image_file_name}"
@@ -39,18 +79,41 @@ class VisionModule:
             self.image_path = None  # Ensure path is reset on failure
             self.capture_complete.set()  # Signal to unblock any waiting process, even though capture failed
 
+    def encode_image(self):
+        """Encodes the captured image for upload, preprocessing it when a preprocessor is set."""
+        if self.frame is not None:
+            if self.preprocessor is not None:
+                return self.preprocessor.process(self.frame)
+            ok, encoded = cv2.imencode(".png", self.frame)
+            if ok:
+                height, width = self.frame.shape[:2]
+                return EncodedImage(encoded.tobytes(), "image/png", width, height)
+        elif self.image_path and os.path.exists(self.image_path):
+            if self.preprocessor is not None:
+                return self.preprocessor.process_file(self.image_path)
+            with open(self.image_path, "rb") as image_file:
+                return EncodedImage(image_file.read(), "image/png", 1280, 720)
+        print("No image file found or image capture failed.")
+        return None
+
     def encode_image_to_base64(self):
         """Encodes the captured image to a base64 string."""
-        if self.image_path and os.path.exists(self.image_path):
-            with open(self.image_path, "rb") as image_file:
-                return base64.b64encode(image_file.read()).decode('utf-8')
-        else:
-            print("No image file found or image capture failed.")
+        image = self.encode_image()
+        if image is not None:
+            return base64.b64encode(image.data).decode('utf-8')
         return None
 
-    def get_image_description(self, transcription, base64_image):
-        """Sends the base64-encoded image along with the transcription to the OpenAI API and returns the description."""
-        if base64_image:
+    def get_image_description(self, transcription, image):
+        """Sends the image along with the transcription to the OpenAI API and returns the description.
+
+        The image is either an EncodedImage, which is base64-encoded while the
+        request body streams, or an already base64-encoded PNG string.
+        """
+        if image:
+            if isinstance(image, EncodedImage):
+                image_url = f"data:{image.mime_type};base64,{Base64JSONBody.PLACEHOLDER}"
+            else:
+                image_url = f"data:image/png;base64,{image}"
             headers = {
                 "Content-Type": "application/json",
                 "Authorization": f"Bearer {self.api_key}"
@@ -63,14 +126,18 @@ class VisionModule:
                         "role": "user",
                         "content": [
                             {"type": "text", "text": transcription},  # Use transcription as the prompt
-                            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{base64_image}"}}
+                            {"type": "image_url", "image_url": {"url": image_url}}
                         ]
                     }
                 ],
                 "max_tokens": 300
             }
 
-            response = requests.post("https://api.openai.com/v1/chat/completions", headers=headers, json=payload)
+            if isinstance(image, EncodedImage):
+                body = Base64JSONBody(payload, image.data)
+                response = self.transport.post(self.url, headers=headers, data=body)
+            else:
+                response = self.transport.post(self.url, headers=headers, json=payload)
             if response.status_code == 200:
                 try:
                     return response.json()['choices'][0]['message']['content']
@@ -80,12 +147,45 @@ class VisionModule:
                 print(f"Error in OpenAI API call: {response.text}")
         return "Failed to encode image or image capture failed."
 
+    def get_stored_image_description(self):
+        """Returns the description of the latest snapshot, or None before the first one."""
+        return self.last_description
+
+    def prepare_snapshot_async(self):
+        """Captures and encodes a snapshot in the background so it is ready before the transcript."""
+        self.snapshot_ready.clear()
+        self.prepared_image = None
+        self.snapshot_pending = True
+        thread = threading.Thread(target=self._prepare_snapshot)
+        thread.start()
+
+    def _prepare_snapshot(self):
+        try:
+            self.capture_image()
+            started_at = time.perf_counter()
+            self.prepared_image = self.encode_image()
+            metrics.record_timing("vision.encode", time.perf_counter() - started_at)
+        finally:
+            self.snapshot_ready.set()
+
     def describe_captured_image(self, transcription="What's in this image?"):
         """Ensures the image capture has completed, then encodes and sends it along with the transcription to the OpenAI API for a description."""
-        self.capture_complete.wait()  # Wait for the image capture to complete
-        base64_image = self.encode_image_to_base64()
-        if base64_image:
-            description = self.get_image_description(transcription, base64_image)
+        started_at = time.perf_counter()
+        if self.snapshot_pending:
+            # Only waits if capture and encoding have not already finished in the background
+            self.snapshot_ready.wait()
+            self.snapshot_pending = False
+            image = self.prepared_image
+        else:
+            self.capture_complete.wait()  # Wait for the image capture to complete
+            image = self.encode_image()
+        metrics.record_timing("vision.wait_for_snapshot", time.perf_counter() - started_at)
+        if image:
+            print(f"Uploading {len(image.data)} bytes of {image.mime_type} ({image.width}x{image.height})")
+            started_at = time.perf_counter()
+            description = self.get_image_description(transcription, image)
+            metrics.record_timing("vision.describe", time.perf_counter() - started_at)
+            self.last_description = description
             print(f"Sending image description request...")
             # Cleanup
             if self.image_path and os.path.exists(self.image_path):
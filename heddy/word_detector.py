@@ -1,24 +1,49 @@
 import os
-from pocketsphinx import LiveSpeech, get_model_path
 from heddy.application_event import ApplicationEvent, ProcessingStatus
 from heddy.resources import get_resource_dir
 from queue import Queue
 from threading import Thread
 
+# Pushed into the word queue by the endpointer when trailing silence ends an utterance
+END_OF_UTTERANCE = "<end-of-utterance>"
 
 class WordDetector:
-    def __init__(self, kws_path=None, model_path=None,) -> None:
+    def __init__(self, kws_path=None, model_path=None, hub=None, echo_gate=None) -> None:
         self.kws_path = kws_path or os.path.join(get_resource_dir(), "keywords.kws")
-        self.model_path = model_path or get_model_path()
+        self.model_path = model_path
+        # With a MicrophoneHub, frames come from the shared capture instead of a LiveSpeech stream
+        self.hub = hub
+        # Filters microphone frames captured while we are speaking (see EchoGate)
+        self.echo_gate = echo_gate
+        # Called from the detector thread with each word heard while not suspended,
+        # before it is queued; used to interrupt a reply on the wake word
+        self.on_word = None
         self.queue = Queue()
         self.thread = None
         self.suspended = False
-    
-    def run(self,):
+        # Built by load(), ahead of the first listen() when called during startup
+        self.decoder = None
+        self.speech = None
+
+    def load(self,):
+        """Imports PocketSphinx and loads the acoustic model and keyword list."""
+        if self.decoder is not None or self.speech is not None:
+            return
+        from pocketsphinx import Decoder, LiveSpeech, get_model_path
+
+        self.model_path = self.model_path or get_model_path()
         print(f"Model Path: {self.model_path}")
         print(f"Keywords File Path: {self.kws_path}")
+        if self.hub is not None:
+            self.decoder = Decoder(
+                samprate=16000,
+                hmm=os.path.join(self.model_path, 'en-us/en-us'),
+                lm=None,
+                kws=self.kws_path
+            )
+            return
 
-        speech = LiveSpeech(
+        self.speech = LiveSpeech(
             verbose=False,  # Set to True for detailed logs from PocketSphinx
             sampling_rate=16000,
             buffer_size=256,
@@ -28,18 +53,51 @@ class WordDetector:
             lm=None,
             kws=self.kws_path
         )
+
+    def run(self,):
+        self.load()
+        if self.hub is not None:
+            self.run_with_hub()
+            return
+
         print("PocketSphinx initialized successfully.")
         print("Listening for keywords...")
 
-        for phrase in speech:
+        for phrase in self.speech:
             detected_words = [seg[0].lower().strip() for seg in phrase.segments(detailed=True)]  # Extract words
             print(f"Detected words: {detected_words}")  # Log for debugging
-            for word in detected_words:
-                if self.suspended:
-                    continue
-                self.queue.put(word)
+            self.dispatch(detected_words)
             
         
+    def run_with_hub(self,):
+        decoder = self.decoder
+        frames = self.hub.subscribe_queue()
+        print("PocketSphinx initialized successfully.")
+        print("Listening for keywords...")
+
+        decoder.start_utt()
+        while True:
+            data = frames.get()
+            if self.echo_gate is not None:
+                data = self.echo_gate.filter(data)
+            decoder.process_raw(data, False, False)
+            if decoder.hyp() is None:
+                continue
+            detected_words = [seg.word.lower().strip() for seg in decoder.seg()]  # Extract words
+            decoder.end_utt()
+            decoder.start_utt()
+            print(f"Detected words: {detected_words}")  # Log for debugging
+            self.dispatch(detected_words)
+
+    def dispatch(self, detected_words):
+        for word in detected_words:
+            if self.suspended:
+                continue
+            on_word = self.on_word
+            if on_word is not None:
+                on_word(word)
+            self.queue.put(word)
+
     def run_thread(self,):
         self.thread = Thread(target=self.run)
         self.thread.start()
@@ -54,9 +112,17 @@ class WordDetector:
         return event
     
     def clear(self,):
-        # HACK: this is hacky but should work
-        self.queue = Queue()
+        # Drain in place so a thread already blocked in listen() keeps its queue
+        while not self.queue.empty():
+            self.queue.get_nowait()
         self.suspended = True
+
+    def push(self, word):
+        """Queues a word from a source other than the keyword spotter."""
+        self.queue.put(word)
+
+    def resume(self,):
+        self.suspended = False
         
         
 
@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+
+openai = pytest.importorskip("openai")
+
+from benchmarks.fake_servers import FakeLatency, FakeProviderServer
+from heddy.ai_backend.assistant_manager import StreamingManager, ThreadManager
+from heddy.application_event import ApplicationEvent, ApplicationEventType, ProcessingStatus
+from heddy.scheduler import TimerScheduler
+
+REPLY = "It is sunny with a light breeze. Expect a high of twenty two degrees this afternoon."
+
+
+@pytest.fixture
+def server():
+    server = FakeProviderServer(FakeLatency(api=0.0, llm_first_token=0.0, llm_token_interval=0.0)).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def assistant(server):
+    client = openai.OpenAI(api_key="test", base_url=f"{server.url}/v1")
+    scheduler = TimerScheduler()
+    thread_manager = ThreadManager(client, timer_scheduler=scheduler)
+    yield StreamingManager(thread_manager, None, assistant_id="asst_fake")
+    thread_manager.close()
+    scheduler.stop()
+
+
+def interact(assistant, server):
+    sent = len(server.requests)
+    event = assistant.handle_streaming_interaction(ApplicationEvent(ApplicationEventType.AI_INTERACT, request="Hi"))
+    assert event.status == ProcessingStatus.SUCCESS
+    assert event.result == REPLY
+    return server.requests[sent:]
+
+
+def test_every_turn_takes_one_round_trip(assistant, server):
+    # First turn without a spare thread: create-and-run
+    assert interact(assistant, server) == [("POST", "/v1/threads/runs")]
+    assert assistant.thread_manager.round_trips == 1
+    # Later turns carry the message in the run request
+    thread_id = assistant.thread_manager.thread_id
+    assert interact(assistant, server) == [("POST", f"/v1/threads/{thread_id}/runs")]
+    assert assistant.thread_manager.round_trips == 1
+
+
+def test_spare_thread_turn_takes_one_round_trip(assistant, server):
+    assistant.prepare()
+    assistant.thread_manager.spare_thread.result()
+    requests = interact(assistant, server)
+    assert requests == [("POST", f"/v1/threads/{assistant.thread_manager.thread_id}/runs")]
+    assert assistant.thread_manager.round_trips == 1
+
+
+class RecordingPlayer:
+    def __init__(self):
+        self.threads = []
+        self.played = threading.Event()
+
+    def play_sound(self, file_path, block=False):
+        self.threads.append(threading.current_thread().name)
+        self.played.set()
+
+
+def test_inactivity_reset_plays_its_sound_off_the_scheduler_thread():
+    scheduler = TimerScheduler(name="test-timers")
+    player = RecordingPlayer()
+    thread_manager = ThreadManager(None, audio_player=player, inactivity_timeout=0.01, timer_scheduler=scheduler)
+    thread_manager.thread_id = "thread_1"
+    thread_manager.end_of_interaction()
+    assert player.played.wait(1)
+    assert thread_manager.thread_id is None
+    assert player.threads[0] != "test-timers"
+    thread_manager.close()
+    scheduler.stop()
+
+
+def test_closed_thread_manager_schedules_no_reset():
+    scheduler = TimerScheduler(name="test-timers")
+    thread_manager = ThreadManager(None, timer_scheduler=scheduler)
+    thread_manager.end_of_interaction()
+    thread_manager.close()
+    # A turn finishing after the session closed
+    thread_manager.end_of_interaction()
+    assert scheduler.stats()["pending"] == 0
+    scheduler.stop()
+
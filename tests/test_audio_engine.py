@@ -0,0 +1,47 @@
+import numpy as np
+
+from heddy.io.audio_engine import AudioOutputEngine, StreamingResampler
+
+
+def sine(frames, rate, frequency=440.0):
+    return np.sin(2 * np.pi * frequency * np.arange(frames) / rate).astype(np.float32)[:, None]
+
+
+def reference(samples, source_rate, target_rate):
+    count = (len(samples) - 1) * target_rate // source_rate + 1
+    positions = np.arange(count) * source_rate / target_rate
+    return np.interp(positions, np.arange(len(samples)), samples[:, 0]).astype(np.float32)[:, None]
+
+
+def test_chunked_resampling_matches_resampling_the_whole_stream():
+    samples = sine(24000, 24000)
+    resampler = StreamingResampler(24000, 44100)
+    chunks = np.array_split(samples, [1, 100, 1023, 1024, 5000, 12345])
+    output = np.concatenate([resampler.process(chunk) for chunk in chunks])
+    np.testing.assert_allclose(output, reference(samples, 24000, 44100), atol=1e-6)
+
+
+def test_output_rate_does_not_drift():
+    resampler = StreamingResampler(22050, 48000)
+    produced = sum(len(resampler.process(sine(441, 22050))) for _ in range(500))
+    # 10 seconds of input at 22050 Hz
+    assert abs(produced - 480000) <= 3
+
+
+def test_same_rate_passes_through():
+    samples = sine(100, 16000)
+    assert StreamingResampler(16000, 16000).process(samples) is samples
+
+
+def test_voice_written_in_chunks_plays_without_steps():
+    engine = AudioOutputEngine(rate=48000, channels=1)
+    voice = engine.open_voice()
+    pcm = (sine(2400, 24000) * 16384).astype(np.int16).tobytes()
+    for start in range(0, len(pcm), 202):
+        engine.write_pcm(voice, pcm[start:start + 202], 24000)
+    voice.close()
+    mix = np.zeros((8192, 1), dtype=np.float32)
+    voice.read_into(mix)
+    played = mix[:4799, 0]
+    expected = reference(sine(2400, 24000) * 16384 / 32768, 24000, 48000)[:, 0]
+    np.testing.assert_allclose(played, expected, atol=1e-4)
@@ -0,0 +1,107 @@
+import threading
+import time
+
+from heddy.application_event import ApplicationEvent, ApplicationEventType
+from heddy.io.audio_recorder import AudioRecorder
+from heddy.io.microphone_hub import MicrophoneHub
+from heddy.main_controller import MainController
+from heddy.text_to_speech.speech_pipeline import SpeechPipeline
+from heddy.text_to_speech.text_to_speach_manager import TTSResult, TTSStatus
+
+
+class FakePlayer:
+    output_engine = None
+
+    def __init__(self):
+        self.played = []
+        self.silent = threading.Event()
+
+    def play_sound(self, file_path, block=False):
+        pass
+
+    def play_audio(self, audio):
+        self.played.append(audio)
+
+    def stop(self):
+        pass
+
+    def wait_until_silent(self, timeout=None):
+        # The mixer takes a while to write its last buffer
+        return self.silent.wait(timeout)
+
+
+class FakeAssistant:
+    def __init__(self):
+        self.cancelled = threading.Event()
+
+    def prepare(self):
+        pass
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def clear_cancel(self):
+        self.cancelled.clear()
+
+
+class FakeTranscriber:
+    def start_stream(self):
+        pass
+
+    def feed_audio(self, pcm):
+        pass
+
+    def stop_stream(self):
+        pass
+
+
+def make_controller(player):
+    return MainController(
+        assistant=FakeAssistant(),
+        transcriber=FakeTranscriber(),
+        synthesizer=None,
+        audio_player=player,
+        vision_module=None,
+        word_detector=None,
+        barge_in=True,
+        recorder=AudioRecorder(hub=MicrophoneHub())
+    )
+
+
+def test_interrupt_does_not_wait_for_silence():
+    player = FakePlayer()
+    controller = make_controller(player)
+    started_at = time.perf_counter()
+    controller.interrupt()
+    assert time.perf_counter() - started_at < 0.5
+    assert controller.assistant.cancelled.is_set()
+    player.silent.set()
+
+
+def test_cancel_is_cleared_when_the_next_turn_starts():
+    player = FakePlayer()
+    player.silent.set()
+    controller = make_controller(player)
+    controller.interrupt()
+    controller.process_event(ApplicationEvent(ApplicationEventType.START_RECORDING))
+    assert not controller.interrupted.is_set()
+    assert not controller.assistant.cancelled.is_set()
+    controller.stop_recording()
+
+
+def test_interruption_before_the_reply_starts_is_kept():
+    player = FakePlayer()
+    pipeline = SpeechPipeline(lambda text: TTSResult(status=TTSStatus.SUCCESS, audio=text.encode()), player)
+    pipeline.cancel()
+    pipeline.start_reply()
+    pipeline.submit("Should not be heard.")
+    pipeline.finish_reply()
+    assert pipeline.wait(timeout=1)
+    assert player.played == []
+    pipeline.clear_cancel()
+    pipeline.start_reply()
+    pipeline.submit("Next turn.")
+    pipeline.finish_reply()
+    assert pipeline.wait(timeout=1)
+    assert player.played == [b"Next turn."]
+    pipeline.close()
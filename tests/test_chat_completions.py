@@ -0,0 +1,111 @@
+import json
+
+import pytest
+
+openai = pytest.importorskip("openai")
+
+from benchmarks.fake_servers import FakeLatency, FakeProviderServer, FakeScript
+from heddy.ai_backend.chat_completions import ChatCompletionsManager, ConversationStore, estimate_tokens
+from heddy.application_event import ApplicationEvent, ApplicationEventType, ProcessingStatus
+from heddy.functions2call import ToolRegistry
+
+REPLY = "It is sunny with a light breeze. Expect a high of twenty two degrees this afternoon."
+
+
+def tool_call(call_id, arguments='{"city": "Paris"}'):
+    return {"id": call_id, "type": "function", "function": {"name": "lookup", "arguments": arguments}}
+
+
+def add_exchange(store, text):
+    store.add_user(text)
+    store.add_assistant(text)
+
+
+def test_messages_start_with_the_instructions():
+    store = ConversationStore(instructions="Be brief.")
+    add_exchange(store, "Hello")
+    assert store.messages() == [
+        {"role": "system", "content": "Be brief."},
+        {"role": "user", "content": "Hello"},
+        {"role": "assistant", "content": "Hello"},
+    ]
+    assert ConversationStore(instructions="").messages() == []
+
+
+def test_oldest_exchanges_are_dropped_whole():
+    text = "x" * 40
+    exchange_tokens = 2 * estimate_tokens({"content": text})
+    store = ConversationStore(instructions="", token_budget=2 * exchange_tokens)
+    for index in range(4):
+        add_exchange(store, f"{index}{text[1:]}")
+    messages = store.messages()
+    assert [message["content"][0] for message in messages] == ["2", "2", "3", "3"]
+    assert store.stats() == {"exchanges": 2, "tokens": 2 * exchange_tokens,
+                             "token_budget": 2 * exchange_tokens, "trimmed": 2}
+
+
+def test_latest_exchange_is_kept_over_budget():
+    store = ConversationStore(instructions="", token_budget=1)
+    add_exchange(store, "first")
+    add_exchange(store, "a much longer second exchange")
+    assert [message["content"] for message in store.messages()] == ["a much longer second exchange"] * 2
+    assert store.stats()["exchanges"] == 1
+
+
+def test_tool_call_stays_with_its_result():
+    store = ConversationStore(instructions="", token_budget=60)
+    store.add_user("Weather in Paris?")
+    store.add_assistant(None, tool_calls=[tool_call("call_1")])
+    store.add_tool_result("call_1", "Sunny in Paris")
+    store.add_assistant("It is sunny.")
+    add_exchange(store, "y" * 120)
+    roles = [message["role"] for message in store.messages()]
+    # The whole tool exchange went at once; no tool result is left without its call
+    assert roles == ["user", "assistant"]
+    store.add_user("And in Rome?")
+    store.add_assistant(None, tool_calls=[tool_call("call_2", '{"city": "Rome"}')])
+    store.add_tool_result("call_2", "Rainy in Rome")
+    roles = [message["role"] for message in store.messages()]
+    assert roles == ["user", "assistant", "tool"]
+
+
+def test_clear_forgets_the_history():
+    store = ConversationStore(instructions="Be brief.")
+    add_exchange(store, "Hello")
+    store.clear()
+    assert store.messages() == [{"role": "system", "content": "Be brief."}]
+    assert store.stats()["tokens"] == 0
+    assert store.stats()["exchanges"] == 0
+
+
+@pytest.fixture
+def server():
+    script = FakeScript(tool_call="lookup", tool_arguments='{"city": "Paris"}')
+    server = FakeProviderServer(FakeLatency(api=0.0, llm_first_token=0.0, llm_token_interval=0.0), script).start()
+    yield server
+    server.stop()
+
+
+def test_tool_call_round_trip(server):
+    registry = ToolRegistry()
+    calls = []
+
+    @registry.register("lookup", {"type": "object", "properties": {"city": {"type": "string"}}})
+    def lookup(arguments):
+        calls.append(arguments)
+        return f"Sunny in {arguments['city']}"
+
+    client = openai.OpenAI(api_key="test", base_url=f"{server.url}/v1")
+    chat = ChatCompletionsManager(client, model="fake", tool_registry=registry)
+    event = chat.handle_streaming_interaction(ApplicationEvent(ApplicationEventType.AI_INTERACT, request="Weather?"))
+    assert event.status == ProcessingStatus.SUCCESS
+    assert event.result == REPLY
+    assert calls == [{"city": "Paris"}]
+    # The tool call and the reply that follows its result
+    assert chat.round_trips == 2
+    assert server.requests == [("POST", "/v1/chat/completions")] * 2
+    messages = chat.conversation.messages()
+    assert [message["role"] for message in messages] == ["system", "user", "assistant", "tool", "assistant"]
+    assert json.loads(messages[2]["tool_calls"][0]["function"]["arguments"]) == {"city": "Paris"}
+    assert messages[3] == {"role": "tool", "tool_call_id": messages[2]["tool_calls"][0]["id"],
+                           "content": "Sunny in Paris"}
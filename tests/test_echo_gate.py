@@ -0,0 +1,47 @@
+import numpy as np
+
+from heddy.io.echo_gate import EchoGate
+
+
+class FakeEngine:
+    def __init__(self, level=None):
+        self.level = level
+
+    def output_level(self, window=0.25):
+        return self.level
+
+
+def frame(level_db, length=1024):
+    amplitude = 10 ** (level_db / 20) * np.sqrt(2)
+    samples = amplitude * np.sin(2 * np.pi * 300 * np.arange(length) / 16000)
+    return (samples * 32767).astype(np.int16).tobytes()
+
+
+def test_everything_passes_while_nothing_plays():
+    gate = EchoGate(FakeEngine(level=None))
+    pcm = frame(-40)
+    assert gate.filter(pcm) is pcm
+
+
+def test_echo_is_replaced_with_silence_of_the_same_length():
+    gate = EchoGate(FakeEngine(level=-20), margin_db=10, coupling_db=6)
+    pcm = frame(-20)
+    assert gate.filter(pcm) == bytes(len(pcm))
+    assert gate.gated == 1
+
+
+def test_voice_louder_than_the_echo_passes():
+    gate = EchoGate(FakeEngine(level=-30), margin_db=10, coupling_db=0)
+    pcm = frame(-10)
+    assert gate.filter(pcm) is pcm
+    assert gate.passed == 1
+
+
+def test_coupling_adapts_to_the_gated_echo():
+    gate = EchoGate(FakeEngine(level=-20), margin_db=10, coupling_db=6, adaptation=0.5)
+    for _ in range(20):
+        gate.filter(frame(-35))
+    # The speaker reaches the microphone about 15 dB down
+    assert abs(gate.coupling_db + 15) < 0.5
+    # A voice 10 dB above the learned echo now gets through
+    assert gate.filter(frame(-24)) != bytes(2048)
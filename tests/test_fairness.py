@@ -0,0 +1,97 @@
+import threading
+import time
+
+from heddy.server.fairness import FairLimiter
+
+
+def wait_for_waiting(limiter, count):
+    deadline = time.monotonic() + 5
+    while limiter.stats()["waiting"] < count and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+
+def test_slots_are_bounded():
+    limiter = FairLimiter(max_active=2)
+    first = limiter.acquire("a")
+    limiter.acquire("b")
+    acquired = threading.Event()
+    thread = threading.Thread(target=lambda: (limiter.acquire("c"), acquired.set()))
+    thread.start()
+    assert not acquired.wait(0.05)
+    assert limiter.stats() == {"active": 2, "waiting": 1, "max_active": 2}
+    limiter.release(first)
+    assert acquired.wait(1)
+    thread.join()
+
+
+def test_free_slot_goes_to_the_least_busy_session():
+    limiter = FairLimiter(max_active=1)
+    # "busy" has used a slot for a while, "quiet" not at all
+    slot = limiter.acquire("busy")
+    time.sleep(0.05)
+    limiter.release(slot)
+    held = limiter.acquire("holder")
+    order = []
+
+    def acquire(session):
+        slot = limiter.acquire(session)
+        order.append(session)
+        limiter.release(slot)
+
+    busy = threading.Thread(target=acquire, args=("busy",))
+    busy.start()
+    wait_for_waiting(limiter, 1)
+    quiet = threading.Thread(target=acquire, args=("quiet",))
+    quiet.start()
+    wait_for_waiting(limiter, 2)
+    limiter.release(held)
+    busy.join()
+    quiet.join()
+    # Arrived later, but served first
+    assert order == ["quiet", "busy"]
+
+
+def test_usage_decays_and_can_be_forgotten():
+    limiter = FairLimiter(max_active=1, half_life=0.01)
+    slot = limiter.acquire("a")
+    time.sleep(0.02)
+    limiter.release(slot)
+    time.sleep(0.1)
+    assert limiter._usage("a", time.perf_counter()) < 0.001
+    limiter.forget("a")
+    assert "a" not in limiter.usage
+
+
+def test_cancelled_waiter_gives_up_and_unblocks_the_next():
+    limiter = FairLimiter(max_active=1)
+    held = limiter.acquire("holder")
+    closed = threading.Event()
+    results = {}
+
+    def acquire(session, **options):
+        results[session] = limiter.acquire(session, **options)
+
+    closing = threading.Thread(target=acquire, args=("closing",), kwargs={"cancelled": closed})
+    closing.start()
+    wait_for_waiting(limiter, 1)
+    other = threading.Thread(target=acquire, args=("other",))
+    other.start()
+    wait_for_waiting(limiter, 2)
+    closed.set()
+    limiter.wake_waiters()
+    closing.join(1)
+    assert not closing.is_alive()
+    assert results["closing"] is None
+    assert limiter.stats()["waiting"] == 1
+    limiter.release(held)
+    other.join(1)
+    assert results["other"][0] == "other"
+
+
+def test_acquire_times_out():
+    limiter = FairLimiter(max_active=1)
+    limiter.acquire("holder")
+    started_at = time.perf_counter()
+    assert limiter.acquire("late", timeout=0.05) is None
+    assert time.perf_counter() - started_at < 1
+    assert limiter.stats() == {"active": 1, "waiting": 0, "max_active": 1}
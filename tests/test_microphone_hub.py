@@ -0,0 +1,144 @@
+import threading
+import time
+
+from heddy.io.audio_recorder import AudioRecorder
+from heddy.io.microphone_hub import MicrophoneHub
+
+
+def frame(index):
+    return bytes([index]) * 4
+
+
+def test_preroll_is_replayed_before_live_frames():
+    hub = MicrophoneHub(frames_per_buffer=1024, preroll_seconds=0.2)
+    for index in range(1, 6):
+        hub.publish(frame(index))
+    received = []
+    hub.subscribe(received.append, preroll=True)
+    hub.publish(frame(6))
+    # 0.2 s of pre-roll at 1024 frames per buffer keeps the last 4 frames
+    assert received == [frame(index) for index in range(2, 7)]
+
+
+def test_preroll_before_leaves_out_later_frames():
+    hub = MicrophoneHub()
+    hub.publish(frame(1))
+    time.sleep(0.01)
+    cutoff = time.monotonic()
+    hub.publish(frame(2))
+    received = []
+    hub.subscribe(received.append, preroll=True, preroll_before=cutoff)
+    assert received == [frame(1)]
+
+
+def test_slow_replay_does_not_block_capture_or_drop_frames():
+    hub = MicrophoneHub(preroll_seconds=1.0)
+    for index in range(3):
+        hub.publish(frame(index))
+    received = []
+    replaying = threading.Event()
+
+    def slow_callback(data):
+        replaying.set()
+        received.append(data)
+        time.sleep(0.05)
+
+    subscriber = threading.Thread(target=hub.subscribe, args=(slow_callback,), kwargs={"preroll": True})
+    subscriber.start()
+    replaying.wait()
+    started_at = time.perf_counter()
+    for index in range(3, 6):
+        hub.publish(frame(index))
+    # Frames captured during the replay are queued instead of waiting for it
+    assert time.perf_counter() - started_at < 0.05
+    subscriber.join()
+    hub.publish(frame(6))
+    assert received == [frame(index) for index in range(7)]
+
+
+def test_unsubscribe_waits_for_a_delivery_in_progress():
+    hub = MicrophoneHub()
+    entered = threading.Event()
+    release = threading.Event()
+    received = []
+
+    def callback(data):
+        entered.set()
+        release.wait()
+        received.append(data)
+
+    hub.subscribe(callback)
+    publisher = threading.Thread(target=hub.publish, args=(frame(1),))
+    publisher.start()
+    entered.wait()
+    unsubscribed = threading.Event()
+    unsubscriber = threading.Thread(target=lambda: (hub.unsubscribe(callback), unsubscribed.set()))
+    unsubscriber.start()
+    assert not unsubscribed.wait(0.05)
+    release.set()
+    unsubscriber.join(1)
+    assert unsubscribed.is_set()
+    assert received == [frame(1)]
+    hub.publish(frame(2))
+    assert received == [frame(1)]
+    publisher.join()
+
+
+def test_a_callback_can_unsubscribe_itself():
+    hub = MicrophoneHub()
+    received = []
+
+    def callback(data):
+        received.append(data)
+        hub.unsubscribe(callback)
+
+    hub.subscribe(callback)
+    hub.publish(frame(1))
+    hub.publish(frame(2))
+    assert received == [frame(1)]
+
+
+def test_subscribe_queue_drops_the_oldest_frames():
+    hub = MicrophoneHub()
+    frames = hub.subscribe_queue(maxsize=2)
+    for index in range(4):
+        hub.publish(frame(index))
+    assert [frames.get_nowait(), frames.get_nowait()] == [frame(2), frame(3)]
+
+
+def test_subscribe_queue_survives_a_racing_consumer(capsys):
+    hub = MicrophoneHub()
+    frames = hub.subscribe_queue(maxsize=1)
+    done = threading.Event()
+
+    def consume():
+        while not done.is_set():
+            try:
+                frames.get(timeout=0.01)
+            except Exception:
+                pass
+
+    consumer = threading.Thread(target=consume)
+    consumer.start()
+    for index in range(5000):
+        hub.publish(frame(index % 256))
+    done.set()
+    consumer.join()
+    assert "subscriber failed" not in capsys.readouterr().out
+
+
+def test_recorder_hands_off_a_new_buffer_per_recording():
+    hub = MicrophoneHub()
+    recorder = AudioRecorder(hub=hub)
+    recorder.start_recording()
+    hub.publish(frame(1))
+    recorder.stop_recording()
+    first = recorder.audio
+    hub.publish(frame(2))
+    recorder.start_recording()
+    hub.publish(frame(3))
+    recorder.stop_recording()
+    assert recorder.audio is not first
+    assert bytes(first.view()) == frame(1)
+    # The second recording starts with the pre-roll, which still holds the earlier frames
+    assert bytes(recorder.audio.view()).endswith(frame(3))
@@ -0,0 +1,45 @@
+import wave
+
+from heddy.io.pcm_buffer import PCMBuffer
+
+
+def test_append_grows_past_initial_capacity():
+    buffer = PCMBuffer(sample_rate=16000, initial_seconds=0.001)
+    chunks = [bytes([index]) * 100 for index in range(10)]
+    for chunk in chunks:
+        buffer.append(chunk)
+    assert len(buffer) == 1000
+    assert bytes(buffer.view()) == b"".join(chunks)
+
+
+def test_views_of_earlier_audio_survive_growth():
+    buffer = PCMBuffer(sample_rate=16000, initial_seconds=0.001)
+    buffer.append(b"\x01\x02" * 8)
+    view = buffer.view()
+    buffer.append(b"\x03\x04" * 1000)
+    assert bytes(view) == b"\x01\x02" * 8
+
+
+def test_duration_and_clear():
+    buffer = PCMBuffer(sample_rate=16000)
+    buffer.append(bytes(32000))
+    assert buffer.duration() == 1.0
+    buffer.clear()
+    assert len(buffer) == 0
+    assert bytes(buffer.view()) == b""
+
+
+def test_as_wav_file_is_a_valid_wav(tmp_path):
+    buffer = PCMBuffer(sample_rate=16000)
+    pcm = bytes(range(256)) * 10
+    buffer.append(pcm)
+    with wave.open(buffer.as_wav_file(), "rb") as wav_file:
+        assert wav_file.getframerate() == 16000
+        assert wav_file.getnchannels() == 1
+        assert wav_file.getsampwidth() == 2
+        assert wav_file.readframes(wav_file.getnframes()) == pcm
+
+    path = tmp_path / "recording.wav"
+    buffer.save(path)
+    with wave.open(str(path), "rb") as wav_file:
+        assert wav_file.readframes(wav_file.getnframes()) == pcm
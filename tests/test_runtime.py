@@ -0,0 +1,78 @@
+import asyncio
+from queue import Queue
+
+from heddy.application_event import ApplicationEvent, ApplicationEventType, ProcessingStatus
+from heddy.runtime import AsyncRuntime
+
+
+class FakeWordDetector:
+    def __init__(self):
+        self.resumed = 0
+
+    def resume(self):
+        self.resumed += 1
+
+
+class FakeController:
+    """Just enough of MainController's recording state machine."""
+
+    def __init__(self, words):
+        self.words = Queue()
+        for word in words:
+            self.words.put(word)
+        self.is_recording = False
+        self.word_detector = FakeWordDetector()
+        self.handled = []
+
+    def process_event(self, event):
+        if event.type == ApplicationEventType.LISTEN:
+            word = self.words.get()
+            if isinstance(word, Exception):
+                raise word
+            event.result = word
+        else:
+            self.handled.append(event.type)
+        if event.type == ApplicationEventType.START_RECORDING:
+            self.is_recording = True
+        if event.type == ApplicationEventType.STOP_RECORDING:
+            self.is_recording = False
+            return ApplicationEvent(ApplicationEventType.TRANSCRIBE, status=ProcessingStatus.SUCCESS)
+        event.status = ProcessingStatus.SUCCESS
+        return event
+
+    def process_result(self, event):
+        if event.type == ApplicationEventType.LISTEN:
+            if event.result == "computer" and not self.is_recording:
+                return ApplicationEvent(ApplicationEventType.START_RECORDING)
+            if event.result == "reply" and self.is_recording:
+                return ApplicationEvent(ApplicationEventType.STOP_RECORDING)
+            return ApplicationEvent(ApplicationEventType.LISTEN)
+        if event.type == ApplicationEventType.TRANSCRIBE:
+            return ApplicationEvent(ApplicationEventType.AI_INTERACT)
+        return ApplicationEvent(ApplicationEventType.LISTEN)
+
+
+def test_repeated_wake_word_starts_one_recording():
+    controller = FakeController(["computer", "computer", "reply"])
+    runtime = AsyncRuntime(controller)
+    assert runtime.listen_once().type == ApplicationEventType.LISTEN
+    assert runtime.listen_once().type == ApplicationEventType.LISTEN
+    assert runtime.listen_once().type == ApplicationEventType.AI_INTERACT
+    assert controller.handled == [ApplicationEventType.START_RECORDING, ApplicationEventType.STOP_RECORDING]
+    assert controller.word_detector.resumed == 1
+
+
+def test_listener_survives_a_failing_word():
+    controller = FakeController([RuntimeError("decoder failed"), "computer", "reply"])
+    runtime = AsyncRuntime(controller)
+    events = []
+
+    async def run():
+        runtime.loop = asyncio.get_running_loop()
+        runtime.queue = asyncio.Queue()
+        runtime.start_listener()
+        event = await asyncio.wait_for(runtime.queue.get(), timeout=5)
+        events.append(event.type)
+
+    asyncio.run(run())
+    assert events == [ApplicationEventType.AI_INTERACT]
@@ -0,0 +1,90 @@
+import threading
+import time
+
+import pytest
+
+from heddy.scheduler import TimerScheduler
+
+
+@pytest.fixture
+def timers():
+    timers = TimerScheduler(name="test-timers")
+    yield timers
+    timers.stop()
+
+
+def test_timers_fire_in_deadline_order(timers):
+    fired = []
+    done = threading.Event()
+    timers.schedule(0.06, lambda: (fired.append("last"), done.set()))
+    timers.schedule(0.02, fired.append, "first")
+    timers.schedule(0.04, fired.append, "second")
+    # Equal deadlines keep their scheduling order
+    timers.schedule(0.04, fired.append, "third")
+    assert done.wait(1)
+    assert fired == ["first", "second", "third", "last"]
+
+
+def test_cancelled_timers_do_not_fire(timers):
+    fired = []
+    handle = timers.schedule(0.02, fired.append, "cancelled")
+    done = threading.Event()
+    timers.schedule(0.05, done.set)
+    assert handle.cancel()
+    assert not handle.is_alive()
+    assert not handle.cancel()
+    assert timers.stats()["pending"] == 1
+    assert done.wait(1)
+    assert fired == []
+    assert timers.stats()["cancelled"] == 1
+
+
+def test_many_cancellations_compact_the_heap(timers):
+    handles = [timers.schedule(60, lambda: None) for _ in range(200)]
+    for handle in handles[:150]:
+        handle.cancel()
+    assert timers.stats()["pending"] == 50
+    assert len(timers.heap) < 200
+
+
+def test_lateness_is_measured(timers):
+    done = threading.Event()
+    timers.schedule(0.01, done.set)
+    assert done.wait(1)
+    time.sleep(0.01)
+    stats = timers.stats()
+    assert stats["fired"] == 1
+    assert 0.0 <= stats["max_lateness"] < 0.5
+
+
+def test_slow_callback_delays_later_timers_but_failures_do_not_stop_the_thread(timers):
+    fired = []
+    done = threading.Event()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    timers.schedule(0.01, time.sleep, 0.1)
+    timers.schedule(0.02, fail)
+    timers.schedule(0.03, lambda: (fired.append(time.monotonic()), done.set()))
+    scheduled_at = time.monotonic()
+    assert done.wait(1)
+    stats = timers.stats()
+    assert stats["failed"] == 1
+    # Callbacks share one thread: the last timer waited for the slow one
+    assert fired[0] - scheduled_at >= 0.1
+    assert stats["max_lateness"] >= 0.07
+
+
+def test_scheduling_after_stop_restarts_the_thread(timers):
+    fired = []
+    timers.schedule(0.05, fired.append, "pending")
+    timers.stop()
+    assert fired == []
+    done = threading.Event()
+    timers.schedule(0.01, done.set)
+    assert done.wait(1)
+    # Timers left pending by the stop fire on the new thread
+    time.sleep(0.06)
+    assert fired == ["pending"]
+    assert timers.stats()["pending"] == 0
@@ -0,0 +1,48 @@
+from heddy.text_to_speech.sentence_segmenter import SentenceSegmenter
+
+
+def feed_all(segmenter, deltas):
+    segments = []
+    for delta in deltas:
+        segments += segmenter.feed(delta)
+    return segments + segmenter.flush()
+
+
+def test_splits_streamed_deltas_into_sentences():
+    segmenter = SentenceSegmenter(min_chars=0, first_min_chars=0)
+    deltas = ["It is sun", "ny today. Expect", " a high of twenty", " two degrees! Enjoy?"]
+    assert feed_all(segmenter, deltas) == ["It is sunny today.", "Expect a high of twenty two degrees!", "Enjoy?"]
+
+
+def test_does_not_split_after_abbreviations():
+    segmenter = SentenceSegmenter(min_chars=0, first_min_chars=0)
+    assert feed_all(segmenter, ["Ask Dr. Smith about it. ", "Then rest."]) == [
+        "Ask Dr. Smith about it.", "Then rest."
+    ]
+
+
+def test_coalesces_short_sentences_until_min_chars():
+    segmenter = SentenceSegmenter(min_chars=20, first_min_chars=5)
+    # The first segment only needs first_min_chars; later ones are joined until min_chars
+    assert segmenter.feed("Sure. Yes. No. Maybe later. ") == ["Sure.", "Yes. No. Maybe later."]
+    assert segmenter.feed("Ok. ") == []
+    assert segmenter.flush() == ["Ok."]
+
+
+def test_first_segment_uses_lower_threshold():
+    segmenter = SentenceSegmenter(min_chars=60, first_min_chars=5)
+    assert segmenter.feed("Hello there. ") == ["Hello there."]
+    assert segmenter.feed("Short one. ") == []
+    assert segmenter.flush() == ["Short one."]
+
+
+def test_flush_returns_unterminated_remainder_once():
+    segmenter = SentenceSegmenter()
+    assert segmenter.feed("no punctuation at all") == []
+    assert segmenter.flush() == ["no punctuation at all"]
+    assert segmenter.flush() == []
+
+
+def test_line_breaks_end_segments():
+    segmenter = SentenceSegmenter(min_chars=0, first_min_chars=0)
+    assert feed_all(segmenter, ["First item\n", "Second item\n"]) == ["First item", "Second item"]
@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("websockets")
+openai = pytest.importorskip("openai")
+pytest.importorskip("assemblyai")
+
+from benchmarks.e2e_bench import generate_fixtures
+from benchmarks.fake_servers import FakeLatency, FakeProviderServer, FakeRealtimeServer, FakeScript
+from benchmarks.load_generator import SimulatedClient
+from heddy.scheduler import TimerScheduler
+from heddy.server.server import SessionServer, SharedResources
+from heddy.speech_to_text.assemblyai_transcriber import AssemblyAITranscriber
+from heddy.text_to_speech.eleven_labs import ElevenLabsManager
+from heddy.transport import HTTPTransport
+
+LATENCY = FakeLatency(api=0.01, stt=0.05, stt_final=0.02, llm_first_token=0.05, llm_token_interval=0.0,
+                      tts_first_byte=0.02, tts_chunk_interval=0.0, tts_seconds_per_char=0.001)
+
+
+@pytest.fixture
+def server():
+    script = FakeScript()
+    provider = FakeProviderServer(LATENCY, script).start()
+    realtime = FakeRealtimeServer(LATENCY, script).start()
+    transport = HTTPTransport()
+    eleven_labs_manager = ElevenLabsManager(api_key="test", transport=transport, base_url=provider.url,
+                                            output_format="pcm_16000")
+    timers = TimerScheduler()
+    resources = SharedResources(
+        transport=transport,
+        openai_client=openai.OpenAI(api_key="test", base_url=f"{provider.url}/v1"),
+        eleven_labs_manager=eleven_labs_manager,
+        synthesizer=eleven_labs_manager,
+        transcriber=AssemblyAITranscriber(api_key="test", base_url=provider.url),
+        assistant_id="asst_fake",
+        streaming_stt_url=realtime.url,
+        assemblyai_api_key="test",
+        max_active_turns=1,
+        timer_scheduler=timers
+    )
+    server = SessionServer(resources, port=0).start()
+    yield server
+    server.stop()
+    timers.stop()
+    realtime.stop()
+    provider.stop()
+
+
+def test_two_sessions_take_turns_and_leave_no_timers(server):
+    clients = [SimulatedClient(server.url, generate_fixtures(1, seed=index), turns=2, speed=20.0, think=0.0)
+               for index in range(2)]
+    threads = [threading.Thread(target=client.run) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(60)
+    for client in clients:
+        assert client.errors == []
+        assert len(client.results) == 2
+
+    deadline = time.monotonic() + 15
+    while server.sessions and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert server.sessions == {}
+    stats = server.stats()
+    assert stats["timers"]["pending"] == 0
+    assert stats["active"] == 0
@@ -0,0 +1,79 @@
+import sys
+import types
+
+from heddy.io.sound_effects_player import AudioPlayer
+
+
+class FakeVoice:
+    stopped = False
+
+    def close(self):
+        pass
+
+    def wait(self):
+        pass
+
+
+class FakeEngine:
+    rate = 48000
+
+    def __init__(self):
+        self.written = []
+
+    def open_voice(self):
+        return FakeVoice()
+
+    def write_pcm(self, voice, pcm, rate):
+        self.written.append((pcm, rate))
+
+
+class Source:
+    """A streamed download: a generator that records being closed."""
+
+    def __init__(self, chunks):
+        self.closed = False
+        self.chunks = self.generate(chunks)
+
+    def generate(self, chunks):
+        try:
+            yield from chunks
+        finally:
+            self.closed = True
+
+    def __iter__(self):
+        return self.chunks
+
+    def close(self):
+        self.chunks.close()
+
+
+def fake_elevenlabs(monkeypatch):
+    played = []
+    module = types.SimpleNamespace(
+        play=lambda audio: played.append(("play", audio)),
+        stream=lambda audio: played.append(("stream", list(audio))),
+    )
+    monkeypatch.setitem(sys.modules, "elevenlabs", module)
+    return played
+
+
+def test_compressed_audio_without_a_decoder_goes_to_the_external_player(monkeypatch):
+    played = fake_elevenlabs(monkeypatch)
+    engine = FakeEngine()
+    player = AudioPlayer(output_engine=engine, audio_format="mp3_44100_128")
+    player.in_process_decoding = False
+    source = Source([b"mp3-1", b"mp3-2"])
+    player.play_audio(source)
+    assert played == [("stream", [b"mp3-1", b"mp3-2"])]
+    assert engine.written == []
+
+
+def test_pcm_is_written_to_the_engine_and_the_download_closed(monkeypatch):
+    played = fake_elevenlabs(monkeypatch)
+    engine = FakeEngine()
+    player = AudioPlayer(output_engine=engine, audio_format="pcm_24000")
+    source = Source([b"\x01\x02\x03", b"\x04"])
+    player.play_audio(source)
+    assert engine.written == [(b"\x01\x02", 24000), (b"\x03\x04", 24000)]
+    assert source.closed
+    assert played == []
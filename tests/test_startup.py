@@ -0,0 +1,22 @@
+import subprocess
+import sys
+
+
+def test_importing_the_controller_loads_no_heavy_modules():
+    # Audio devices, OpenCV and the provider SDKs are imported by the init helpers, off the import path
+    code = (
+        "import sys, heddy.main_controller; "
+        "print(' '.join(name for name in ('pyaudio', 'cv2', 'openai', 'pocketsphinx', 'websockets') "
+        "if name in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
+
+
+def test_importing_the_players_loads_no_audio_device_module():
+    code = (
+        "import sys, heddy.io.sound_effects_player, heddy.io.audio_engine, benchmarks.tts_playback_bench; "
+        "print('pyaudio' in sys.modules)"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,129 @@
+import base64
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("websockets")
+
+from benchmarks.fake_servers import FakeLatency, FakeRealtimeServer, FakeScript
+from heddy.application_event import ApplicationEvent, ApplicationEventType, ProcessingStatus
+from heddy.speech_to_text.stt_manager import STTManager, STTStatus
+from heddy.speech_to_text.streaming_transcriber import AssemblyAIStreamingTranscriber, StreamingSession
+
+ONE_SECOND = bytes(16000 * 2)
+
+
+@pytest.fixture
+def server():
+    server = FakeRealtimeServer(FakeLatency(stt_final=0.01), FakeScript(transcript="turn the lights on")).start()
+    yield server
+    server.stop()
+
+
+def test_transcribes_against_stand_in_server(server):
+    transcriber = AssemblyAIStreamingTranscriber(api_key="test", url=server.url)
+    transcriber.start()
+    transcriber.send_audio(ONE_SECOND)
+    result = transcriber.finish()
+    assert result.status == STTStatus.SUCCESS
+    assert result.text == "turn the lights on"
+
+
+def test_late_messages_of_a_previous_session_are_ignored(server):
+    transcriber = AssemblyAIStreamingTranscriber(api_key="test", url=server.url)
+    transcriber.start()
+    abandoned = transcriber.session
+    transcriber.start()
+    # A final transcript arriving late on the abandoned connection
+    transcriber._handle_message(abandoned, {"message_type": "FinalTranscript", "text": "stale words"})
+    transcriber.send_audio(ONE_SECOND)
+    result = transcriber.finish()
+    assert result.text == "turn the lights on"
+    assert abandoned.terminated.is_set()
+
+
+def test_connection_failure_is_reported(server):
+    transcriber = AssemblyAIStreamingTranscriber(api_key="test", url="ws://127.0.0.1:1/v2/realtime/ws",
+                                                 finish_timeout=1.0)
+    transcriber.start()
+    result = transcriber.finish()
+    assert result.status == STTStatus.ERROR
+
+
+def test_transcription_overlaps_the_next_recording(server):
+    stt = STTManager(None, AssemblyAIStreamingTranscriber(api_key="test", url=server.url))
+    stt.start_stream()
+    stt.feed_audio(ONE_SECOND)
+    stt.stop_stream()
+    first = stt.stopped_sessions[0]
+    events = []
+    transcribing = threading.Thread(
+        target=lambda: events.append(stt.transcribe_audio_file(ApplicationEvent(ApplicationEventType.TRANSCRIBE)))
+    )
+    transcribing.start()
+    # The next wake word starts a recording while the first one is still being finalized
+    stt.start_stream()
+    second = stt.streaming_transcriber.session
+    transcribing.join(5)
+    assert events[0].status == ProcessingStatus.SUCCESS
+    assert events[0].result == "turn the lights on"
+    assert first.terminated.is_set()
+    assert second is not first
+    assert not second.stopped and not second.terminated.is_set()
+    stt.feed_audio(ONE_SECOND)
+    stt.stop_stream()
+    event = stt.transcribe_audio_file(ApplicationEvent(ApplicationEventType.TRANSCRIBE))
+    assert event.result == "turn the lights on"
+
+
+class StalledWebsocket:
+    """A connection under backpressure: sends block until released."""
+
+    def __init__(self):
+        self.released = threading.Event()
+        self.sent = []
+
+    def send(self, message):
+        self.released.wait()
+        self.sent.append(json.loads(message))
+
+
+def stalled_session(transcriber, max_queued_chunks):
+    session = transcriber.session = StreamingSession(max_queued_chunks)
+    session.websocket = StalledWebsocket()
+    session.connected.set()
+    session.sender = threading.Thread(target=transcriber._send, args=(session,), daemon=True)
+    session.sender.start()
+    return session
+
+
+def test_send_audio_does_not_wait_for_a_stalled_connection():
+    transcriber = AssemblyAIStreamingTranscriber(api_key="test", min_chunk_ms=0, max_queued_chunks=4)
+    session = stalled_session(transcriber, 4)
+    started_at = time.perf_counter()
+    for index in range(20):
+        transcriber.send_audio(bytes([index]) * 32)
+    assert time.perf_counter() - started_at < 0.1
+    # The queue stays bounded by dropping the oldest audio
+    assert session.dropped_chunks > 0
+    session.websocket.released.set()
+    session.audio.put(None)
+    session.sender.join(1)
+    sent = session.websocket.sent
+    assert sent[-1] == {"terminate_session": True}
+    assert len(sent) - 1 + session.dropped_chunks == 20
+
+
+def test_sender_batches_audio_into_minimum_chunks():
+    transcriber = AssemblyAIStreamingTranscriber(api_key="test", min_chunk_ms=100)
+    session = stalled_session(transcriber, 500)
+    session.websocket.released.set()
+    # 64 ms frames: two make a chunk, and the rest is flushed at the end
+    for _ in range(5):
+        transcriber.send_audio(bytes(2048))
+    session.audio.put(None)
+    session.sender.join(1)
+    sizes = [len(base64.b64decode(message["audio_data"])) for message in session.websocket.sent[:-1]]
+    assert sizes == [4096, 4096, 2048]
@@ -0,0 +1,128 @@
+import asyncio
+import time
+from functools import partial
+
+import pytest
+
+from heddy import functions2call
+from heddy.functions2call import ToolRegistry, UnknownToolError, default_registry
+
+PARAMETERS = {"type": "object", "properties": {"city": {"type": "string"}}}
+
+
+class FakeTransport:
+    def __init__(self, status_code=200):
+        self.status_code = status_code
+        self.posts = []
+
+    def post(self, url, json=None, timeout=None):
+        self.posts.append((url, json, timeout))
+        return self
+
+
+def make_registry(**options):
+    registry = ToolRegistry()
+    calls = []
+
+    @registry.register("lookup", PARAMETERS, **options)
+    def lookup(arguments):
+        calls.append(arguments)
+        return f"Sunny in {arguments['city']}"
+
+    return registry, calls
+
+
+def test_call_parses_json_arguments_and_records_stats():
+    registry, calls = make_registry()
+    assert registry.call("lookup", '{"city": "Oslo"}') == "Sunny in Oslo"
+    assert calls == [{"city": "Oslo"}]
+    stats = registry.get_stats()["lookup"]
+    assert stats["calls"] == 1
+    assert stats["failures"] == 0
+    assert registry.definitions()[0]["function"]["name"] == "lookup"
+
+
+def test_cacheable_results_are_reused_until_they_expire():
+    registry, calls = make_registry(cacheable=True, ttl=0.05)
+    registry.call("lookup", {"city": "Oslo"})
+    registry.call("lookup", '{"city": "Oslo"}')
+    registry.call("lookup", {"city": "Rome"})
+    assert len(calls) == 2
+    assert registry.get_stats()["lookup"]["cache_hits"] == 1
+    time.sleep(0.06)
+    registry.call("lookup", {"city": "Oslo"})
+    assert len(calls) == 3
+
+
+def test_results_are_not_cached_by_default():
+    registry, calls = make_registry()
+    registry.call("lookup", {"city": "Oslo"})
+    registry.call("lookup", {"city": "Oslo"})
+    assert len(calls) == 2
+
+
+def test_failures_are_counted_and_not_cached():
+    registry = ToolRegistry()
+    attempts = []
+
+    @registry.register("flaky", PARAMETERS, cacheable=True)
+    def flaky(arguments):
+        attempts.append(arguments)
+        raise RuntimeError("offline")
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            registry.call("flaky", {})
+    assert len(attempts) == 2
+    assert registry.get_stats()["flaky"]["failures"] == 2
+
+
+def test_unknown_tools_raise():
+    with pytest.raises(UnknownToolError):
+        ToolRegistry().call("missing", {})
+
+
+def test_async_tools_run_with_their_timeout():
+    registry = ToolRegistry()
+
+    @registry.register("slow", PARAMETERS, timeout=0.01)
+    async def slow(arguments):
+        await asyncio.sleep(1)
+
+    @registry.register("quick", PARAMETERS)
+    async def quick(arguments):
+        return "done"
+
+    assert registry.call("quick", {}) == "done"
+    assert asyncio.run(registry.call_async("quick", {})) == "done"
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(registry.call_async("slow", {}))
+
+
+def test_tools_making_requests_use_the_callers_transport():
+    transport = FakeTransport()
+    output = default_registry.call("send_text_message", '{"message": "hi"}', transport=transport)
+    assert output == "Success!"
+    assert transport.posts[0][1] == {"text": "hi"}
+    # The request gets the tool's timeout so a hung webhook fails on its own
+    assert transport.posts[0][2] == 10.0
+
+
+class FakeVisionModule:
+    def __init__(self):
+        self.description = None
+
+    def get_stored_image_description(self):
+        return self.description
+
+
+def test_image_description_is_read_from_the_latest_snapshot(monkeypatch):
+    vision = FakeVisionModule()
+    monkeypatch.setattr(functions2call, "vision_module", vision)
+    call = partial(default_registry.call, "send_image_description", {"message": "Look"})
+    assert call() == "Failure: no snapshot has been described yet"
+    vision.description = "A cat."
+    assert call() == "Look\n\nImage Description: A cat."
+    # Not cached: a new snapshot is seen right away
+    vision.description = "A dog."
+    assert call() == "Look\n\nImage Description: A dog."
@@ -0,0 +1,93 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from heddy.ai_backend.tool_runner import ToolRunner
+from heddy.functions2call import ToolRegistry
+
+
+def tool_call(index, name):
+    return SimpleNamespace(id=f"call_{index}", function=SimpleNamespace(name=name, arguments="{}"))
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    def __init__(self, max_workers):
+        super().__init__(max_workers=max_workers)
+        self.submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+def test_unknown_tools_are_answered_without_a_worker():
+    executor = CountingExecutor(max_workers=1)
+    runner = ToolRunner(tool_registry=ToolRegistry(), tool_executor=executor)
+    outputs = runner.run([tool_call(index, "nope") for index in range(20)])
+    assert [output["output"] for output in outputs] == ["Failure: unknown tool nope"] * 20
+    assert executor.submitted == 0
+    executor.shutdown()
+
+
+class HangingTransport:
+    """A webhook that never answers: requests only end when they have a timeout."""
+
+    def __init__(self):
+        self.released = threading.Event()
+
+    def post(self, url, json=None, timeout=None):
+        if self.released.wait(timeout):
+            raise RuntimeError("released")
+        raise TimeoutError(f"no response after {timeout}s")
+
+
+def test_timed_out_tools_give_their_worker_back():
+    registry = ToolRegistry()
+
+    @registry.register("webhook", {}, timeout=0.05, uses_transport=True)
+    def webhook(arguments, transport=None, timeout=None):
+        return transport.post("http://hooks.invalid/", json=arguments, timeout=timeout)
+
+    @registry.register("quick", {}, timeout=0.5)
+    def quick(arguments):
+        return "done"
+
+    transport = HangingTransport()
+    executor = ThreadPoolExecutor(max_workers=1)
+    runner = ToolRunner(tool_registry=registry, transport=transport, tool_executor=executor)
+    try:
+        first = runner.run([tool_call(0, "webhook")])
+        assert first[0]["output"].startswith("Failure: webhook")
+        # The one shared worker is free again for the next call
+        assert runner.run([tool_call(1, "quick")])[0]["output"] == "done"
+    finally:
+        transport.released.set()
+        executor.shutdown()
+
+
+class RecordingPipeline:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, text):
+        self.submitted.append(text)
+
+
+def test_filler_is_spoken_before_slow_tools():
+    registry = ToolRegistry()
+
+    @registry.register("slow", {}, expected_latency=1.5)
+    def slow(arguments):
+        return "slow"
+
+    @registry.register("quick", {})
+    def quick(arguments):
+        return "quick"
+
+    runner = ToolRunner(tool_registry=registry, tool_filler="One moment.")
+    pipeline = RecordingPipeline()
+    assert [output["output"] for output in runner.run([tool_call(0, "quick")], pipeline)] == ["quick"]
+    assert pipeline.submitted == []
+    outputs = runner.run([tool_call(1, "quick"), tool_call(2, "slow")], pipeline)
+    assert [output["tool_call_id"] for output in outputs] == ["call_1", "call_2"]
+    assert pipeline.submitted == ["One moment."]
@@ -0,0 +1,84 @@
+import threading
+
+import pytest
+
+from benchmarks.fake_servers import FakeLatency, FakeProviderServer
+from heddy.transport import ConnectionPrewarmer, HTTPTransport
+
+
+@pytest.fixture
+def server():
+    server = FakeProviderServer(FakeLatency(api=0.0)).start()
+    yield server
+    server.stop()
+
+
+def host_stats(transport, server):
+    return transport.stats()[server.url.split("//")[1]]
+
+
+def test_request_reuses_the_prewarmed_connection(server):
+    transport = HTTPTransport()
+    transport.prewarm(f"{server.url}/v1")
+    # The connection is opened without sending the provider a request
+    assert server.requests == []
+    assert transport.post(f"{server.url}/v1/threads", json={}).status_code == 200
+    stats = host_stats(transport, server)
+    assert stats["connections"] == 1
+    assert stats["prewarm_hits"] == 1
+    assert stats["prewarm_misses"] == 0
+    transport.close()
+
+
+def test_requests_without_prewarm_count_nothing(server):
+    transport = HTTPTransport()
+    transport.post(f"{server.url}/v1/threads", json={})
+    transport.post(f"{server.url}/v1/threads", json={})
+    stats = host_stats(transport, server)
+    assert (stats["prewarm_hits"], stats["prewarm_misses"]) == (0, 0)
+    transport.close()
+
+
+def test_closed_prewarmed_connection_is_a_miss(server):
+    transport = HTTPTransport()
+    transport.prewarm(f"{server.url}/v1")
+    for conn in list(transport.prewarmed.keys()):
+        conn.close()
+    transport.post(f"{server.url}/v1/threads", json={})
+    stats = host_stats(transport, server)
+    assert (stats["prewarm_hits"], stats["prewarm_misses"]) == (0, 1)
+    transport.close()
+
+
+def test_concurrent_requests_count_one_hit_per_prewarm(server):
+    transport = HTTPTransport(pool_maxsize=8)
+    transport.prewarm(f"{server.url}/v1")
+    threads = [threading.Thread(target=transport.post, args=(f"{server.url}/v1/threads",), kwargs={"json": {}})
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stats = host_stats(transport, server)
+    assert (stats["prewarm_hits"], stats["prewarm_misses"]) == (1, 0)
+    transport.close()
+
+
+def test_prewarmer_skips_recently_warmed_urls(server):
+    transport = HTTPTransport()
+    prewarmer = ConnectionPrewarmer(transport, urls=[f"{server.url}/v1"], min_interval=60)
+    threads = [prewarmer() for _ in range(4)]
+    for thread in threads:
+        thread.join()
+    assert server.requests == []
+    assert host_stats(transport, server)["connections"] == 1
+    transport.close()
+
+
+def test_prewarmer_lists_the_models_of_openai_clients(server):
+    openai = pytest.importorskip("openai")
+    transport = HTTPTransport()
+    client = openai.OpenAI(api_key="test", base_url=f"{server.url}/v1", http_client=transport.httpx_client())
+    ConnectionPrewarmer(transport, openai_clients=[client])().join()
+    assert server.requests == [("GET", "/v1/models")]
+    transport.close()
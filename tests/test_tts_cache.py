@@ -0,0 +1,119 @@
+from heddy.text_to_speech.text_to_speach_manager import AudioStream, TTSResult, TTSStatus
+from heddy.text_to_speech.tts_cache import CachedSynthesizer
+
+
+class FakeSynthesizer:
+    voice_id = "voice"
+    model_id = "model"
+    voice_settings = {"stability": 1.0}
+
+    def __init__(self, stream=False, output_format="pcm_24000"):
+        self.stream = stream
+        self.output_format = output_format
+        self.calls = []
+        self.closed = 0
+
+    def __call__(self, text):
+        self.calls.append(text)
+        audio = text.encode("utf-8") * 4
+        if self.stream:
+            chunks = [audio[:len(audio) // 2], audio[len(audio) // 2:]]
+            return TTSResult(status=TTSStatus.SUCCESS, audio_stream=AudioStream(chunks, on_close=self.on_close))
+        return TTSResult(status=TTSStatus.SUCCESS, audio=audio)
+
+    def on_close(self):
+        self.closed += 1
+
+
+def test_second_request_is_served_from_memory():
+    synthesizer = FakeSynthesizer()
+    cache = CachedSynthesizer(synthesizer)
+    first = cache("Hello there.")
+    second = cache("  Hello   there. ")
+    assert second.audio == first.audio
+    assert synthesizer.calls == ["Hello there."]
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_output_format_is_part_of_the_key():
+    synthesizer = FakeSynthesizer()
+    cache = CachedSynthesizer(synthesizer)
+    cache("Hello.")
+    synthesizer.output_format = "mp3_44100_128"
+    cache("Hello.")
+    assert len(synthesizer.calls) == 2
+
+
+def test_least_recently_used_entries_are_evicted():
+    synthesizer = FakeSynthesizer()
+    cache = CachedSynthesizer(synthesizer, max_bytes=60)
+    cache("aaaaaa")  # 24 bytes
+    cache("bbbbbb")
+    cache("aaaaaa")  # touch a, so b is the oldest
+    cache("cccccc")
+    assert cache.stats()["memory_bytes"] <= 60
+    cache("aaaaaa")
+    cache("bbbbbb")
+    assert synthesizer.calls == ["aaaaaa", "bbbbbb", "cccccc", "bbbbbb"]
+
+
+def test_entries_survive_restarts_on_disk(tmp_path):
+    CachedSynthesizer(FakeSynthesizer(), cache_dir=str(tmp_path))("Persisted.")
+    synthesizer = FakeSynthesizer()
+    cache = CachedSynthesizer(synthesizer, cache_dir=str(tmp_path))
+    assert cache("Persisted.").audio == "Persisted.".encode("utf-8") * 4
+    assert synthesizer.calls == []
+    assert cache.stats()["disk_hits"] == 1
+
+
+def test_streamed_audio_is_cached_once_fully_played():
+    synthesizer = FakeSynthesizer(stream=True)
+    cache = CachedSynthesizer(synthesizer)
+    assert b"".join(cache("Streamed.").audio_stream) == "Streamed.".encode("utf-8") * 4
+    assert synthesizer.closed == 1
+    assert cache("Streamed.").audio == "Streamed.".encode("utf-8") * 4
+    assert synthesizer.calls == ["Streamed."]
+
+
+def test_interrupted_stream_is_not_cached():
+    synthesizer = FakeSynthesizer(stream=True)
+    cache = CachedSynthesizer(synthesizer)
+    stream = cache("Interrupted.").audio_stream
+    next(stream)
+    stream.close()
+    assert synthesizer.closed == 1
+    assert cache("Interrupted.").audio_stream is not None
+    assert synthesizer.calls == ["Interrupted.", "Interrupted."]
+
+
+def test_warmup_fills_the_cache():
+    synthesizer = FakeSynthesizer(stream=True)
+    cache = CachedSynthesizer(synthesizer, warmup_phrases=["Hello!", "One moment."])
+    cache.warmup().join()
+    assert cache.stats()["entries"] == 2
+    assert cache("One moment.").audio is not None
+
+
+def test_disk_tier_evicts_least_recently_used_files(tmp_path):
+    synthesizer = FakeSynthesizer()
+    cache = CachedSynthesizer(synthesizer, max_bytes=0, cache_dir=str(tmp_path), max_disk_bytes=60)
+    cache("aaaaaa")  # 24 bytes
+    cache("bbbbbb")
+    cache("aaaaaa")  # read back from disk, so b is the oldest
+    cache("cccccc")
+    assert cache.stats()["disk_bytes"] <= 60
+    assert cache.stats()["disk_evictions"] == 1
+    assert len(list(tmp_path.iterdir())) == 2
+    cache("aaaaaa")
+    cache("bbbbbb")
+    assert synthesizer.calls == ["aaaaaa", "bbbbbb", "cccccc", "bbbbbb"]
+
+
+def test_disk_bound_applies_to_files_from_earlier_runs(tmp_path):
+    cache = CachedSynthesizer(FakeSynthesizer(), cache_dir=str(tmp_path))
+    for text in ("aaaaaa", "bbbbbb", "cccccc"):
+        cache(text)
+    cache = CachedSynthesizer(FakeSynthesizer(), cache_dir=str(tmp_path), max_disk_bytes=50)
+    assert cache.stats()["disk_entries"] == 2
+    assert len(list(tmp_path.iterdir())) == 2
@@ -0,0 +1,46 @@
+import numpy as np
+
+from heddy.io.audio_recorder import AudioRecorder
+from heddy.io.microphone_hub import MicrophoneHub
+from heddy.io.vad import Endpointer
+
+RATE = 16000
+
+
+def tone(seconds, amplitude=0.3):
+    samples = amplitude * np.sin(2 * np.pi * 200 * np.arange(int(RATE * seconds)) / RATE)
+    return (samples * 32767).astype(np.int16).tobytes()
+
+
+def silence(seconds):
+    noise = np.random.default_rng(0).normal(0, 0.0005, int(RATE * seconds))
+    return (noise * 32767).astype(np.int16).tobytes()
+
+
+def test_trailing_silence_after_speech_ends_the_utterance():
+    endpointer = Endpointer(trailing_silence=0.4, min_speech=0.3)
+    assert not endpointer.process(silence(0.2))
+    assert not endpointer.process(tone(0.5))
+    assert endpointer.process(silence(0.5))
+    assert not endpointer.process(silence(0.5))
+
+
+def test_silence_alone_is_not_an_utterance():
+    endpointer = Endpointer(trailing_silence=0.4, min_speech=0.3)
+    assert not endpointer.process(silence(2.0))
+
+
+def test_preroll_is_kept_from_the_endpointer():
+    hub = MicrophoneHub(preroll_seconds=1.0)
+    # The wake word, still in the pre-roll when the recording starts
+    for _ in range(15):
+        hub.publish(tone(1024 / RATE))
+    endpointer = Endpointer(trailing_silence=0.4, min_speech=0.3)
+    endpoints = []
+    recorder = AudioRecorder(hub=hub)
+    recorder.start_recording(on_live_frame=lambda pcm: endpoints.append(endpointer.process(pcm)))
+    hub.publish(silence(0.5))
+    recorder.stop_recording()
+    # The recording keeps the wake word, but no speech was heard since it started
+    assert len(recorder.audio) > len(silence(0.5))
+    assert not any(endpoints)